@@ -0,0 +1,86 @@
+"""
+@文件: bench_array_heap.py
+@描述: 对比调度队列后端在大队列下的内存占用和吞吐量（队列元素为ReminderEvent）
+    - heap:  IndexedMinHeap，元素列表 + 句柄列表 + 句柄->下标字典，比较时调用ReminderEvent.__lt__
+    - array: ArrayMinHeap，触发时间/入堆序号/句柄三个平行数组 + 句柄->元素旁路表
+    - 内存: 只统计队列结构本身（事件对象预先创建，不计入）
+    - 吞吐: 批量入队；调度循环模式（pop_until取出到期事件，push_entries放回下一次事件）；
+      逐个pop全部取出
+@用法: python benchmarks/bench_array_heap.py [最大事件数量]
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.data_structures import IndexedMinHeap, ArrayMinHeap
+from core.events import ReminderEvent, CARE_REMINDER
+
+BACKENDS = {"heap": IndexedMinHeap, "array": ArrayMinHeap}
+FLOWERS = [f"花种{i}" for i in range(50)]
+TICK = 60.0  # 调度循环模式中每轮推进的时间（秒）
+
+
+def build_events(count, base):
+    rng = random.Random(count)
+    return [ReminderEvent(base + rng.random() * 86400, CARE_REMINDER, FLOWERS[i % len(FLOWERS)], 1)
+            for i in range(count)]
+
+
+def measure_memory(factory, events):
+    """返回队列结构本身每个事件平均占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    queue = factory()
+    queue.push_many(events)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del queue
+    return (after - before) / len(events)
+
+
+def measure_throughput(factory, events, base):
+    """返回 (批量入队 事件/秒, 调度循环 事件/秒, 逐个pop 事件/秒)"""
+    queue = factory()
+    start = time.perf_counter()
+    queue.push_many(events)
+    bulk = len(events) / (time.perf_counter() - start)
+
+    # 调度循环：每轮取出TICK秒内到期的事件，并把每个事件推迟一天放回（句柄不变）
+    fired = 0
+    now = base
+    start = time.perf_counter()
+    while now < base + 86400:
+        now += TICK
+        due = queue.pop_until(now)
+        fired += len(due)
+        queue.push_entries((handle, event.replace(event.when + 86400)) for handle, event in due)
+    loop = fired / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    count = 0
+    while queue.pop_entry() is not None:
+        count += 1
+    drain = count / (time.perf_counter() - start)
+    return bulk, loop, drain
+
+
+def main():
+    max_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    sizes = [n for n in (10 ** 4, 10 ** 5, 10 ** 6) if n <= max_count] or [max_count]
+    base = time.time()
+
+    print(f"{'事件数':>9} {'后端':<6} {'内存 字节/事件':>14} {'批量入队/秒':>12} {'调度循环/秒':>12} {'逐个pop/秒':>12}")
+    for count in sizes:
+        events = build_events(count, base)
+        for name, factory in BACKENDS.items():
+            memory = measure_memory(factory, events)
+            bulk, loop, drain = measure_throughput(factory, events, base)
+            print(f"{count:>9} {name:<6} {memory:>14.1f} {bulk:>12,.0f} {loop:>12,.0f} {drain:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+@文件: bench_assets.py
+@描述: 提醒弹窗图标的加载耗时：每次 QPixmap(原图).scaled(100, 100)（旧实现）对比 ui.assets 缓存
+    - 旧实现: 每个弹窗都完整解码全分辨率JPEG再缩小
+    - 缓存首次: QImageReader按100x100解码（JPEG在解码阶段缩小）
+    - 缓存命中: 直接返回已缓存的QPixmap
+@用法: python benchmarks/bench_assets.py [次数]   （需要PyQt6，无显示器时自动使用offscreen平台）
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+if not os.environ.get("DISPLAY"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from PyQt6.QtWidgets import QApplication
+
+from ui import assets
+
+ICON = QSize(100, 100)
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+
+def run():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    app = QApplication(sys.argv)  # QPixmap需要QGuiApplication
+    names = sorted(os.listdir(assets.ASSETS_DIR))
+    print(f"{'图片':<10} {'旧实现':>10} {'缓存首次':>10} {'缓存命中':>10}")
+    for name in names:
+        path = assets.asset_path(name)
+
+        def uncached():
+            QPixmapCache.clear()  # Qt按文件名缓存QPixmap，清空以模拟缓存被更大的背景图挤出
+            QPixmap(path).scaled(100, 100)
+
+        old = timed(uncached, count)
+        start = time.perf_counter()
+        assets.pixmap(name, ICON)
+        first = time.perf_counter() - start
+        hit = timed(lambda: assets.pixmap(name, ICON), count * 100)
+        print(f"{name:<10} {old * 1000:8.2f}ms {first * 1000:8.2f}ms {hit * 1e6:8.2f}µs")
+    print(f"缓存: {assets.cache().stats()}")
+    print(f"reserve_qt_cache: QPixmapCache上限 {QPixmapCache.cacheLimit()} KB -> {assets.reserve_qt_cache()} KB")
+    del app
+
+
+if __name__ == "__main__":
+    run()
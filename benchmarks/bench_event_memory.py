@@ -0,0 +1,68 @@
+"""
+@文件: bench_event_memory.py
+@描述: 对比每个排队事件占用的内存
+    - 旧格式: (时间戳, dict) 元组，dict中含datetime和预先格式化的提醒文本
+    - 新格式: ReminderEvent __slots__ 记录，文本在触发时才生成
+@用法: python benchmarks/bench_event_memory.py [事件数量]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.events import ReminderEvent, CARE_REMINDER
+from core.recurrence import RecurrenceRule
+
+FLOWERS = ["玫瑰", "百合", "郁金香", "康乃馨", "向日葵"]
+
+
+def build_legacy(count):
+    """旧格式：每个事件一个元组 + 字典 + datetime + 文本"""
+    start = datetime.now()
+    events = []
+    for i in range(count):
+        flower = FLOWERS[i % len(FLOWERS)]
+        next_time = start + timedelta(minutes=i)
+        events.append((next_time.timestamp(), {
+            "type": "care_reminder",
+            "flower": flower,
+            "trigger_time": next_time,
+            "interval_days": 7,
+            "message": f"[养护提醒] 请养护{flower} - 下次养护时间: {next_time.strftime('%Y-%m-%d %H:%M:%S')}"
+        }))
+    return events
+
+
+def build_compact(count):
+    """新格式：每个事件一个 ReminderEvent，同一花种共享一条重复规则"""
+    start = datetime.now()
+    rules = {flower: RecurrenceRule(start, timedelta(days=7)) for flower in FLOWERS}
+    base = start.timestamp()
+    events = []
+    for i in range(count):
+        flower = FLOWERS[i % len(FLOWERS)]
+        events.append(ReminderEvent(base + i * 60, CARE_REMINDER, flower, 7, rule=rules[flower], occurrence=i))
+    return events
+
+
+def measure(builder, count):
+    """返回每个事件平均占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = builder(count)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # 列表本身的指针数组两种格式相同，不计入
+    return (after - before - sys.getsizeof(events)) / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    legacy = measure(build_legacy, count)
+    compact = measure(build_compact, count)
+    print(f"=== 每个排队事件的内存占用（{count} 个事件）===")
+    print(f"旧格式 (时间戳, dict): {legacy:8.1f} 字节/事件")
+    print(f"新格式 ReminderEvent : {compact:8.1f} 字节/事件")
+    print(f"节省: {(1 - compact / legacy) * 100:.1f}%")
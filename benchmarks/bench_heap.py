@@ -0,0 +1,339 @@
+"""
+@文件: bench_heap.py
+@描述: 事件队列实现的微基准测试套件，结果保存为JSON以便在版本之间对比
+@对比对象:
+    - ThreadSafeMinHeap / IndexedMinHeap / ArrayMinHeap / HierarchicalTimingWheel（core.data_structures）
+    - heapq+锁: 基于C实现heapq的最小加锁封装（基线）
+    - heapq裸用: 不加锁的heapq，单线程性能上限
+    - 单消费者: 生产者写入无Python锁的queue.SimpleQueue，唯一的消费者在pop/peek前
+      把收件箱并入私有heapq（只允许一个线程pop）
+@测试项:
+    - push / pop / peek / heapify / mixed（push与pop交替），规模10 ~ 10^6
+    - contention: 1~16个生产者线程push，一个消费者线程pop全部元素
+@用法:
+    python benchmarks/bench_heap.py                      # 全部测试，结果写入 benchmarks/results/
+    python benchmarks/bench_heap.py --quick              # 规模最大10^4，线程最多4，快速检查
+    python benchmarks/bench_heap.py --output a.json --compare b.json   # 与旧结果对比
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import queue
+import random
+import argparse
+import platform
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.data_structures import ThreadSafeMinHeap, IndexedMinHeap, ArrayMinHeap, HierarchicalTimingWheel
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+SIZES = (10, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6)
+THREADS = (1, 2, 4, 8, 16)
+OPS_CAP = 100000  # 每次测量最多执行的操作数（大规模时在预填充的堆上执行）
+PEEK_OPS = 10000
+KEY_SPAN = 86400.0  # 元素键值为未来一天内的时间戳，时间轮也能正常放置
+
+
+class LockedHeapq:
+    """heapq + 一把锁：与ThreadSafeMinHeap接口一致的最小实现"""
+
+    def __init__(self):
+        self._heap = []
+        self._lock = threading.Lock()
+
+    def push(self, item):
+        with self._lock:
+            heapq.heappush(self._heap, item)
+
+    def pop(self):
+        with self._lock:
+            return heapq.heappop(self._heap) if self._heap else None
+
+    def peek(self):
+        with self._lock:
+            return self._heap[0] if self._heap else None
+
+    def heapify(self, items):
+        with self._lock:
+            self._heap = list(items)
+            heapq.heapify(self._heap)
+
+
+class RawHeapq:
+    """不加锁的heapq（仅单线程测试）"""
+
+    def __init__(self):
+        self._heap = []
+
+    def push(self, item):
+        heapq.heappush(self._heap, item)
+
+    def pop(self):
+        return heapq.heappop(self._heap) if self._heap else None
+
+    def peek(self):
+        return self._heap[0] if self._heap else None
+
+    def heapify(self, items):
+        self._heap = list(items)
+        heapq.heapify(self._heap)
+
+
+class SingleConsumerHeap:
+    """单消费者设计：push只写入C实现的SimpleQueue（不获取Python锁），pop/peek只能由一个线程调用"""
+
+    def __init__(self):
+        self._inbox = queue.SimpleQueue()
+        self._heap = []
+
+    def push(self, item):
+        self._inbox.put(item)
+
+    def _drain(self):
+        inbox, heap = self._inbox, self._heap
+        while True:
+            try:
+                heapq.heappush(heap, inbox.get_nowait())
+            except queue.Empty:
+                return
+
+    def pop(self):
+        self._drain()
+        return heapq.heappop(self._heap) if self._heap else None
+
+    def peek(self):
+        self._drain()
+        return self._heap[0] if self._heap else None
+
+    def heapify(self, items):
+        self._heap = list(items)
+        heapq.heapify(self._heap)
+
+
+IMPLEMENTATIONS = {
+    "ThreadSafeMinHeap": ThreadSafeMinHeap,
+    "IndexedMinHeap": IndexedMinHeap,
+    "ArrayMinHeap": ArrayMinHeap,
+    "HierarchicalTimingWheel": HierarchicalTimingWheel,
+    "heapq+锁": LockedHeapq,
+    "heapq裸用": RawHeapq,
+    "单消费者": SingleConsumerHeap,
+}
+# 不能被多个线程同时调用的实现
+SINGLE_THREAD_ONLY = {"heapq裸用"}
+
+
+def _keys(rng, count, base):
+    return [base + rng.random() * KEY_SPAN for _ in range(count)]
+
+
+def _prefilled(factory, rng, size, base):
+    heap = factory()
+    heap.heapify(_keys(rng, size, base))
+    return heap
+
+
+def bench_push(factory, rng, size, base):
+    ops = min(size, OPS_CAP)
+    heap = _prefilled(factory, rng, size - ops, base)
+    keys = _keys(rng, ops, base)
+    start = time.perf_counter()
+    for key in keys:
+        heap.push(key)
+    return ops, time.perf_counter() - start
+
+
+def bench_pop(factory, rng, size, base):
+    ops = min(size, OPS_CAP)
+    heap = _prefilled(factory, rng, size, base)
+    start = time.perf_counter()
+    for _ in range(ops):
+        heap.pop()
+    return ops, time.perf_counter() - start
+
+
+def bench_peek(factory, rng, size, base):
+    heap = _prefilled(factory, rng, size, base)
+    start = time.perf_counter()
+    for _ in range(PEEK_OPS):
+        heap.peek()
+    return PEEK_OPS, time.perf_counter() - start
+
+
+def bench_heapify(factory, rng, size, base):
+    heap = factory()
+    keys = _keys(rng, size, base)
+    start = time.perf_counter()
+    heap.heapify(keys)
+    return size, time.perf_counter() - start
+
+
+def bench_mixed(factory, rng, size, base):
+    """稳定规模下交替push与pop（模拟调度循环：弹出到期事件、加入下一次事件）"""
+    ops = min(size, OPS_CAP)
+    heap = _prefilled(factory, rng, size, base)
+    keys = _keys(rng, ops, base)
+    start = time.perf_counter()
+    for key in keys:
+        heap.push(key)
+        heap.pop()
+    return 2 * ops, time.perf_counter() - start
+
+
+WORKLOADS = {
+    "push": bench_push,
+    "pop": bench_pop,
+    "peek": bench_peek,
+    "heapify": bench_heapify,
+    "mixed": bench_mixed,
+}
+
+
+def bench_contention(factory, rng, size, base, threads):
+    """threads个生产者各push size/threads个元素，同时一个消费者线程pop出全部元素"""
+    per_thread = max(1, size // threads)
+    total = per_thread * threads
+    heap = factory()
+    batches = [_keys(rng, per_thread, base) for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def produce(keys):
+        barrier.wait()
+        for key in keys:
+            heap.push(key)
+
+    def consume():
+        barrier.wait()
+        consumed = 0
+        while consumed < total:
+            if heap.pop() is None:
+                time.sleep(0)  # 暂时为空，让出GIL给生产者
+            else:
+                consumed += 1
+
+    workers = [threading.Thread(target=produce, args=(keys,)) for keys in batches]
+    consumer = threading.Thread(target=consume)
+    for thread in workers + [consumer]:
+        thread.start()
+    start = time.perf_counter()
+    for thread in workers + [consumer]:
+        thread.join()
+    return 2 * total, time.perf_counter() - start
+
+
+def measure(fn, repeat, *args):
+    """重复repeat次取最短耗时，返回 (操作数, 秒)"""
+    best = None
+    for _ in range(repeat):
+        ops, seconds = fn(*args)
+        if best is None or seconds < best[1]:
+            best = (ops, seconds)
+    return best
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_suite(impls, sizes, threads, repeat, seed):
+    results = []
+    base = time.time()
+
+    def record(impl, workload, size, thread_count, ops, seconds):
+        results.append({"impl": impl, "workload": workload, "size": size, "threads": thread_count,
+                        "ops": ops, "seconds": seconds, "ops_per_sec": ops / seconds if seconds else None})
+        print(f"  {impl:<24} {workload:<10} n={size:<8} t={thread_count:<3} {ops / seconds:>14,.0f} ops/s")
+
+    for impl in impls:
+        factory = IMPLEMENTATIONS[impl]
+        for size in sizes:
+            # 大规模测量很慢，只重复一次
+            rounds = repeat if size < 10 ** 5 else 1
+            for workload, fn in WORKLOADS.items():
+                rng = random.Random(seed)
+                ops, seconds = measure(fn, rounds, factory, rng, size, base)
+                record(impl, workload, size, 1, ops, seconds)
+        if impl in SINGLE_THREAD_ONLY:
+            continue
+        contention_size = min(max(sizes), OPS_CAP)
+        for thread_count in threads:
+            rng = random.Random(seed)
+            ops, seconds = measure(bench_contention, repeat, factory, rng, contention_size, base, thread_count)
+            record(impl, "contention", contention_size, thread_count, ops, seconds)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    """与旧结果对比，列出吞吐量下降超过threshold的项"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["impl"], r["workload"], r["size"], r["threads"]): r["ops_per_sec"]
+                    for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["impl"], r["workload"], r["size"], r["threads"]))
+        if old and r["ops_per_sec"] and r["ops_per_sec"] < old * (1 - threshold):
+            regressions.append((r, old))
+    print(f"\n与 {baseline_path} 对比（下降超过 {threshold:.0%} 视为退化）:")
+    if not regressions:
+        print("  没有发现退化")
+    for r, old in regressions:
+        print(f"  {r['impl']:<24} {r['workload']:<10} n={r['size']:<8} t={r['threads']:<3} "
+              f"{old:>12,.0f} -> {r['ops_per_sec']:>12,.0f} ops/s ({r['ops_per_sec'] / old - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件队列实现的微基准测试")
+    parser.add_argument("--impls", nargs="+", choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--threads", nargs="+", type=int, default=list(THREADS))
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数（取最快一次）")
+    parser.add_argument("--seed", type=int, default=20240601)
+    parser.add_argument("--quick", action="store_true", help="规模最大10^4、线程最多4")
+    parser.add_argument("--output", help="结果JSON路径，默认 benchmarks/results/heap-<时间>.json")
+    parser.add_argument("--compare", help="与之对比的旧结果JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="判定退化的吞吐量下降比例")
+    args = parser.parse_args()
+
+    sizes, threads = args.sizes, args.threads
+    if args.quick:
+        sizes = [s for s in sizes if s <= 10 ** 4]
+        threads = [t for t in threads if t <= 4]
+
+    results = run_suite(args.impls, sizes, threads, args.repeat, args.seed)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"heap-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+
+    if args.compare:
+        compare(results, args.compare, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
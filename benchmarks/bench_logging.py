@@ -0,0 +1,81 @@
+"""
+@文件: bench_logging.py
+@描述: 对比调度热路径中逐事件日志的开销（输出重定向到os.devnull，终端输出只会更慢）
+    - print:  旧实现，每个事件print一行，并为打印做两次datetime转换
+    - 关闭:    logging默认级别，未开启追踪，热路径不做字符串格式化
+    - 追踪1种: 只追踪50个花种中的1个
+    - DEBUG:  core.scheduler开启DEBUG，每个事件都输出
+@用法: python benchmarks/bench_logging.py [事件数量]
+"""
+import os
+import sys
+import time
+import logging
+import contextlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.scheduler import ReminderScheduler
+from core.events import ReminderEvent, CARE_REMINDER
+from core import tracing
+
+FLOWERS = [f"花种{i}" for i in range(50)]
+
+
+class _NullManager:
+    def notify_batch(self, batch):
+        pass
+
+
+class _PrintScheduler(ReminderScheduler):
+    """模拟旧实现：检查和通知每个事件时都print"""
+
+    def _dispatch(self, events_to_trigger):
+        for event in events_to_trigger:
+            print(f"检查事件: {datetime.fromtimestamp(event.when)} <= {datetime.fromtimestamp(time.time())}")
+            print(f"提醒调度器-通知管理器: {event.to_dict()['message']}")
+        super()._dispatch(events_to_trigger)
+
+
+def run_once(scheduler_class, count):
+    """把count个已到期事件放入队列，测量取出并投递的耗时（秒）"""
+    scheduler = scheduler_class(_NullManager(), catchup_policy="all")
+    now = time.time()
+    scheduler.event_heap.push_many(
+        ReminderEvent(now - 1 - i * 1e-6, CARE_REMINDER, FLOWERS[i % len(FLOWERS)], 7) for i in range(count))
+    start = time.perf_counter()
+    scheduler._dispatch(scheduler._pop_due_events(now))
+    return time.perf_counter() - start
+
+
+def measure(scheduler_class, count, repeat=3):
+    return min(run_once(scheduler_class, count) for _ in range(repeat))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    handler = logging.StreamHandler(devnull)
+    for name in ("core.scheduler", "core.trace"):
+        logging.getLogger(name).addHandler(handler)
+        logging.getLogger(name).propagate = False
+    logging.getLogger("core.trace").setLevel(logging.INFO)
+
+    results = []
+    with contextlib.redirect_stdout(devnull):
+        results.append(("print（旧实现）", measure(_PrintScheduler, count)))
+        results.append(("logging 关闭", measure(ReminderScheduler, count)))
+        tracing.set_trace(FLOWERS[0])
+        results.append(("追踪 1/50 个花种", measure(ReminderScheduler, count)))
+        tracing.set_trace(FLOWERS[0], enabled=False)
+        logging.getLogger("core.scheduler").setLevel(logging.DEBUG)
+        results.append(("DEBUG 全部输出", measure(ReminderScheduler, count)))
+
+    print(f"{count} 个到期事件的取出+投递耗时（输出到os.devnull）:")
+    for label, seconds in results:
+        print(f"  {label:<16} {seconds * 1000:8.1f} ms  {seconds / count * 1e6:6.2f} µs/事件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+@文件: bench_navigation.py
+@描述: 窗口导航耗时与窗口数量：选择窗口 -> 设置/智能提醒窗口 -> 返回，往返多次
+    - 第一次进入某个窗口需要导入模块并创建窗口，之后只是显示/隐藏，耗时应保持不变
+    - 顶层窗口数量在第一次往返之后不应再增长
+@用法: python benchmarks/bench_navigation.py [往返次数]   （需要PyQt6，无显示器时自动使用offscreen平台）
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+if not os.environ.get("DISPLAY"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["FLOWER_CARE_DATA_DIR"] = tempfile.mkdtemp(prefix="flower_care_bench_")
+
+from PyQt6.QtWidgets import QApplication
+
+import main
+
+
+def round_trip(flower_app, name):
+    """进入name窗口再返回选择窗口，处理完界面事件后返回耗时（秒）"""
+    start = time.perf_counter()
+    flower_app.show_window(name)
+    QApplication.processEvents()
+    flower_app.windows[name].go_back()
+    QApplication.processEvents()
+    return time.perf_counter() - start
+
+
+def run():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    flower_app = main.FlowerCareApp()
+    flower_app.window.show()
+    QApplication.processEvents()
+    try:
+        for name in ("user_set", "smart"):
+            times = [round_trip(flower_app, name) for _ in range(rounds)]
+            rest = sorted(times[1:])
+            print(f"{name:<10} 第一次 {times[0] * 1000:8.2f} ms  "
+                  f"之后中位数 {rest[len(rest) // 2] * 1000:6.2f} ms  最慢 {rest[-1] * 1000:6.2f} ms")
+        print(f"{rounds} 次往返后: 已创建窗口 {len(flower_app.windows)} 个，"
+              f"顶层窗口 {len(QApplication.topLevelWidgets())} 个")
+    finally:
+        flower_app.reminder_manager.cleanup()
+
+
+if __name__ == "__main__":
+    run()
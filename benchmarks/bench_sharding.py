@@ -0,0 +1,67 @@
+"""
+@文件: bench_sharding.py
+@描述: 测量分片数量对触发吞吐量的影响
+    - 每个花种一条每秒触发一次的重复提醒，总需求 = 花种数 事件/秒
+    - 需求超过单进程处理能力时，父进程实际收到的事件数即为系统吞吐量
+    - 依次使用 1, 2, 4, ... 个分片（不超过CPU核数）运行相同负载
+@用法: python benchmarks/bench_sharding.py [花种数量] [每轮秒数] [最大分片数]
+"""
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from core.sharding import ShardedReminderManager
+from core.dispatchers import InlineDispatcher
+
+ONE_SECOND_DAYS = 1 / 86400
+
+
+def run(shards, flowers, duration):
+    manager = ShardedReminderManager(shards, dispatcher=InlineDispatcher())
+    received = [0]
+    lock = threading.Lock()
+
+    def _count(event_data):
+        with lock:
+            received[0] += 1
+
+    manager.register_callback(_count)
+    # 从2秒后开始，所有分片同时进入稳定负载
+    start = datetime.now() + timedelta(seconds=2)
+    manager.add_reminders_bulk((f"花种{i}", start, ONE_SECOND_DAYS) for i in range(flowers))
+
+    time.sleep(max(0.0, (start - datetime.now()).total_seconds()) + 1.0)  # 预热1秒
+    with lock:
+        begin = received[0]
+    time.sleep(duration)
+    with lock:
+        count = received[0] - begin
+    manager.cleanup()
+    return count / duration
+
+
+def main():
+    flowers = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    max_shards = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+
+    shard_counts = []
+    shards = 1
+    while shards <= max_shards:
+        shard_counts.append(shards)
+        shards *= 2
+
+    results = [(shards, run(shards, flowers, duration)) for shards in shard_counts]
+
+    print(f"\n负载: {flowers} 个花种，每个每秒触发一次（需求 {flowers} 事件/秒），CPU核数 {os.cpu_count()}")
+    baseline = results[0][1]
+    for shards, throughput in results:
+        print(f"  {shards:>3} 个分片: {throughput:>10.0f} 事件/秒  加速比 {throughput / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
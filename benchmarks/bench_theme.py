@@ -0,0 +1,140 @@
+"""
+@文件: bench_theme.py
+@描述: 对比逐控件setStyleSheet（旧实现）与应用级主题（ui.theme）的界面开销
+    - 窗口创建: 与用户设置窗口相同的控件组合，创建 + 显示 + 处理完polish事件
+        旧实现: 每个控件各自setStyleSheet（样式与主题中对应role的规则相同）
+        主题:   应用级样式表只设置一次，控件只设置role属性
+    - 状态切换: 状态标签在成功/错误之间切换
+        旧实现: 每次重新设置整段样式表；主题: theme.set_state切换error属性
+    - 弹窗闪烁: 旧实现每步替换对话框的样式表（重新polish整个子树）；主题: 切换主框架的flash属性
+@用法: python benchmarks/bench_theme.py [次数]   （需要PyQt6，无显示器时自动使用offscreen平台）
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+if not os.environ.get("DISPLAY"):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtWidgets
+from PyQt6.QtWidgets import QApplication, QFrame, QMainWindow
+
+from ui import theme
+
+# 与UserSetWindow相同的控件组合: (控件类型, role)
+FORM = [("QPushButton", "back"), ("QLabel", "title"), ("QLabel", "field"), ("QComboBox", "input"),
+        ("QPushButton", "add"), ("QLineEdit", "input"), ("QLabel", "field"), ("QDateTimeEdit", "input"),
+        ("QLabel", "field"), ("QComboBox", "input"), ("QPushButton", "primary"), ("QLabel", "status")]
+
+_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+
+def inline_sheets(stylesheet):
+    """把主题中 QType[role="x"] 的规则改写成旧实现那样的逐控件样式表: role -> 样式表文本"""
+    sheets = {}
+    for selectors, body in _RULE.findall(re.sub(r"/\*.*?\*/", "", stylesheet, flags=re.S)):
+        for selector in selectors.split(","):
+            match = re.search(r'(\w+)\[role="(\w+)"\](\S*)\s*$', selector.strip())
+            if match and "[error" not in selector:
+                widget_type, role, pseudo = match.groups()
+                sheets.setdefault(role, []).append(f"{widget_type}{pseudo} {{{body}}}")
+    return {role: "\n".join(rules) for role, rules in sheets.items()}
+
+
+def build_window(sheets=None):
+    """创建表单窗口；sheets不为None时按旧实现逐控件设置样式表"""
+    window = QMainWindow()
+    window.setObjectName("userSetWindow")
+    central = QFrame()
+    central.setObjectName("centralwidget")
+    window.setCentralWidget(central)
+    status = None
+    for i, (widget_type, role) in enumerate(FORM):
+        widget = getattr(QtWidgets, widget_type)(central)
+        widget.setGeometry(50, 20 + i * 35, 200, 30)
+        if sheets is None:
+            widget.setProperty("role", role)
+        else:
+            widget.setStyleSheet(sheets[role])
+        status = widget
+    return window, status
+
+
+def timed(fn, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count
+
+
+def run():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = QApplication(sys.argv)
+    stylesheet = theme.build_stylesheet()
+    sheets = inline_sheets(stylesheet)
+    ok_sheet = sheets["status"]
+    error_sheet = ok_sheet.replace(theme.SUCCESS, theme.ERROR)
+
+    def create(inline):
+        window, _ = build_window(sheets if inline else None)
+        window.show()
+        QApplication.processEvents()
+        window.close()
+        window.deleteLater()
+
+    app.setStyleSheet("")
+    old_create = timed(lambda: create(True), count // 4)
+    window, status = build_window(sheets)
+    window.show()
+    QApplication.processEvents()
+    flag = [False]
+
+    def old_status():
+        flag[0] = not flag[0]
+        status.setStyleSheet(error_sheet if flag[0] else ok_sheet)
+        QApplication.processEvents()
+
+    old_toggle = timed(old_status, count)
+
+    def old_flash():
+        flag[0] = not flag[0]
+        window.setStyleSheet(f"QFrame {{ border: 3px solid {theme.FLASH if flag[0] else theme.BLUE}; }}")
+        QApplication.processEvents()
+
+    old_flash_step = timed(old_flash, count)
+    window.close()
+
+    app.setStyleSheet(stylesheet)
+    new_create = timed(lambda: create(False), count // 4)
+    window, status = build_window()
+    window.show()
+    QApplication.processEvents()
+
+    def new_status():
+        flag[0] = not flag[0]
+        theme.set_state(status, "error", flag[0])
+        QApplication.processEvents()
+
+    new_toggle = timed(new_status, count)
+    frame = window.centralWidget()
+
+    def new_flash():
+        flag[0] = not flag[0]
+        theme.set_state(frame, "flash", flag[0])
+        QApplication.processEvents()
+
+    new_flash_step = timed(new_flash, count)
+    window.close()
+
+    results = [("窗口创建+显示", old_create, new_create), ("状态切换", old_toggle, new_toggle),
+               ("弹窗闪烁一步", old_flash_step, new_flash_step)]
+    print(f"{'':<14} {'逐控件样式表':>12} {'应用级主题':>12}")
+    for label, old, new in results:
+        print(f"{label:<14} {old * 1000:10.3f}ms {new * 1000:10.3f}ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,180 @@
+"""
+@文件: startup_report.py
+@描述: 启动耗时报告：导入耗时（python -X importtime）和首帧绘制耗时（time-to-first-paint）
+@测试项:
+    - 导入: 在子进程中 import main，按累计导入耗时列出最慢的模块，
+      并检查延迟加载的模块（其它窗口、弹窗、数据分析器、http.server）没有在启动时导入
+    - 首帧: 在子进程中计时 import main -> 创建FlowerCareApp -> 选择窗口第一次Paint事件，
+      数据目录使用临时目录，不读写用户的提醒日志
+@用法:
+    python benchmarks/startup_report.py                    # 各测5次取中位数
+    python benchmarks/startup_report.py --runs 10 --offscreen --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# 启动时不应导入的模块（第一次使用时才导入）
+DEFERRED_MODULES = (
+    "ui.user_set_ui",
+    "ui.smart_reminder_ui",
+    "ui.data_analysis_ui",
+    "ui.reminder_ui",
+    "core.data_analysis",
+    "http.server",
+)
+
+# 在子进程中执行：计时各阶段，第一次绘制选择窗口后退出，结果以JSON写到标准输出最后一行
+_PAINT_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from PyQt6.QtCore import QObject, QEvent
+from PyQt6.QtWidgets import QApplication
+
+flower_app = main.FlowerCareApp()
+constructed = time.perf_counter()
+timings = {"import": imported - start, "construct": constructed - imported}
+
+class _FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "first_paint" not in timings:
+            timings["first_paint"] = time.perf_counter() - start
+            QApplication.quit()
+            if flower_app.bridge:
+                flower_app.bridge.loop.call_soon(flower_app.bridge.loop.stop)
+        return False
+
+probe = _FirstPaint()
+flower_app.window.installEventFilter(probe)
+flower_app.window.show()
+flower_app.bridge.exec() if flower_app.bridge else flower_app.app.exec()
+flower_app.reminder_manager.cleanup()
+print(json.dumps(timings))
+"""
+
+
+def _run(args, env=None, timeout=120):
+    return subprocess.run([sys.executable] + args, cwd=ROOT, env=env, capture_output=True,
+                          text=True, encoding="utf-8", errors="replace", timeout=timeout)
+
+
+def _parse_importtime(stderr):
+    """解析 -X importtime 输出: "import time: self [us] | cumulative | imported package" """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # 表头
+        name = parts[2].strip()
+        modules[name] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def import_report(runs, target):
+    """多次测量import target，返回 {模块: (自身中位数us, 累计中位数us)} 和顶层总耗时"""
+    samples = {}
+    for _ in range(runs):
+        result = _run(["-X", "importtime", "-c", f"import {target}"])
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+        for name, timing in _parse_importtime(result.stderr).items():
+            samples.setdefault(name, []).append(timing)
+    modules = {name: (statistics.median(t[0] for t in values), statistics.median(t[1] for t in values))
+               for name, values in samples.items()}
+    return modules, modules.get(target, (0, 0))[1]
+
+
+def paint_report(runs, offscreen):
+    """多次测量首帧绘制，返回各阶段耗时（秒）的中位数"""
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = dict(os.environ, FLOWER_CARE_DATA_DIR=data_dir)
+            if offscreen:
+                env["QT_QPA_PLATFORM"] = "offscreen"
+            result = _run(["-c", _PAINT_PROBE], env=env)
+        lines = result.stdout.strip().splitlines()
+        if result.returncode != 0 or not lines:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "子进程失败")
+        samples.append(json.loads(lines[-1]))
+    return {key: statistics.median(s[key] for s in samples if key in s) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动导入耗时与首帧绘制耗时报告")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量次数（取中位数）")
+    parser.add_argument("--top", type=int, default=15, help="列出累计导入耗时最多的模块数")
+    parser.add_argument("--offscreen", action="store_true", help="使用Qt的offscreen平台（无显示器的环境）")
+    parser.add_argument("--output", help="结果JSON路径（不指定则只打印）")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+    }
+
+    target = "main"
+    try:
+        modules, total = import_report(args.runs, target)
+    except RuntimeError as e:
+        # 没有安装PyQt6时无法导入界面，退而测量不依赖界面的提醒核心
+        print(f"无法导入main（{e}），改为测量 core.reminder_manager")
+        target = "core.reminder_manager"
+        modules, total = import_report(args.runs, target)
+    top = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    loaded_deferred = [name for name in DEFERRED_MODULES if name in modules]
+    report["import"] = {
+        "target": target,
+        "total_ms": total / 1000,
+        "modules": len(modules),
+        "top": [{"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000} for name, (s, c) in top],
+        "deferred_loaded_at_startup": loaded_deferred,
+    }
+    print(f"import {target}: {total / 1000:.1f} ms，共导入 {len(modules)} 个模块（{args.runs} 次中位数）")
+    print(f"  {'模块':<40} {'自身ms':>8} {'累计ms':>8}")
+    for name, (s, c) in top:
+        print(f"  {name:<40} {s / 1000:8.1f} {c / 1000:8.1f}")
+    if loaded_deferred:
+        print(f"  启动时导入了应延迟加载的模块: {', '.join(loaded_deferred)}")
+    else:
+        print(f"  延迟加载的模块均未在启动时导入: {', '.join(DEFERRED_MODULES)}")
+
+    if target == "main":
+        try:
+            paint = paint_report(args.runs, args.offscreen)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"\n首帧绘制测量失败: {e}")
+        else:
+            report["first_paint"] = {key: value * 1000 for key, value in paint.items()}
+            print(f"\n首帧绘制（{args.runs} 次中位数）:")
+            print(f"  import main          {paint['import'] * 1000:8.1f} ms")
+            print(f"  创建FlowerCareApp    {paint['construct'] * 1000:8.1f} ms")
+            if "first_paint" in paint:
+                print(f"  启动到第一次绘制      {paint['first_paint'] * 1000:8.1f} ms")
+    else:
+        print("\n未安装PyQt6，跳过首帧绘制测量")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+@文件: async_scheduler.py
+@描述: 基于asyncio事件循环的提醒调度器，与ReminderScheduler语义一致
+@核心设计:
+    1. 复用ReminderScheduler的事件队列、句柄、日志和惰性展开逻辑，只替换"等待与唤醒"
+    2. 不创建任何线程：整个队列只对应事件循环上的一个 loop.call_at 定时器，
+       定时器总是指向队首事件，上万条提醒也只占用一个定时器
+    3. 队首变化时（可能来自任意线程）通过 call_soon_threadsafe 重新设置定时器，
+       连续多次变化只合并为一次重设
+"""
+import logging
+from core.scheduler import ReminderScheduler
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncioReminderScheduler(ReminderScheduler):
+    def __init__(self, manager, loop, queue_backend="heap", queue_options=None,
+                 catchup_policy="latest", catchup_grace=60.0, batch_window=0.0, quiet_hours=None,
+                 upcoming_index=False):
+        """
+        初始化调度器:
+        - loop: 运行调度的asyncio事件循环（可以尚未开始运行）
+        - _timer: 指向队首事件的唯一定时器（asyncio.TimerHandle）
+        - _arm_pending: 是否已有一次待执行的定时器重设
+        """
+        super().__init__(manager, queue_backend, queue_options, catchup_policy, catchup_grace,
+                         batch_window, quiet_hours, upcoming_index)
+        self.loop = loop
+        self._timer = None
+        self._arm_pending = False
+
+    def _notify_head_changed(self):
+        """队首变化后请求事件循环重设定时器（调用方需持有lock，可在任意线程调用）"""
+        if not self._arm_pending and not self.loop.is_closed():
+            self._arm_pending = True
+            self.loop.call_soon_threadsafe(self._arm)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self._notify_head_changed()
+        logger.info("事件循环定时器已启用")
+
+    def stop(self):
+        with self.lock:
+            self.running = False
+            if not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self._disarm)
+        logger.info("事件循环定时器已停止")
+
+    def _disarm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _arm(self):
+        """（事件循环中执行）按当前队首事件重新设置唯一的定时器"""
+        self._disarm()
+        with self.lock:
+            self._arm_pending = False
+            if not self.running:
+                return
+            wait = self._calculate_wait_time(self.clock.now())
+        self._timer = self.loop.call_at(self.loop.time() + wait, self._on_timer)
+
+    def _on_timer(self):
+        """（事件循环中执行）触发所有到期事件，然后指向新的队首"""
+        self._timer = None
+        try:
+            with self.lock:
+                if not self.running:
+                    return
+                self.metrics.wakes.add()
+                events_to_trigger = self._pop_due_events(self._check_clock())
+            self._dispatch(events_to_trigger)
+        except Exception:
+            logger.exception("处理事件时出现异常")
+        self._arm()
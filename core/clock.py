@@ -0,0 +1,74 @@
+"""
+@文件: clock.py
+@描述: 调度器使用的单调时间线与免打扰时段
+@核心设计:
+    1. now() = time.monotonic() + offset，两次校准之间不受墙上时钟调整影响
+    2. 每次调度器被唤醒时调用check()，与time.time()比较并重新校准offset：
+       - 偏差小于阈值（NTP微调等）时静默吸收
+       - 偏差超过阈值视为时钟跳变（休眠唤醒、手动改时间、NTP跳变），返回跳变秒数
+    3. 休眠期间单调时钟不前进，因此等待时间需要设上限，保证唤醒后能及时发现跳变
+    4. QuietHours: 每天的免打扰时段，缓存最近一次计算出的时段时间戳，
+       调度循环中的查询通常只是两次浮点比较
+"""
+import time
+from datetime import datetime, timedelta, time as dtime
+from typing import Optional, Tuple
+
+# 调度线程单次等待的最长时间（秒），休眠唤醒后最迟这么久能检测到时钟跳变
+CLOCK_CHECK_INTERVAL = 30.0
+
+
+class MonotonicClock:
+    def __init__(self, jump_threshold: float = 2.0):
+        """
+        - jump_threshold: 墙上时钟与单调时间线的偏差超过多少秒视为跳变
+        - jumps: 已检测到的跳变次数
+        """
+        self.jump_threshold = jump_threshold
+        self.offset = time.time() - time.monotonic()
+        self.jumps = 0
+
+    def now(self) -> float:
+        """单调时间线上的当前时间（与time.time()同一刻度的时间戳）"""
+        return time.monotonic() + self.offset
+
+    def check(self) -> float:
+        """按墙上时钟重新校准，返回跳变秒数（正数为向前跳，未跳变返回0.0）"""
+        drift = time.time() - self.now()
+        self.offset += drift
+        if abs(drift) < self.jump_threshold:
+            return 0.0
+        self.jumps += 1
+        return drift
+
+
+class QuietHours:
+    """每天的免打扰时段 [start, end)，可以跨午夜（如 22:00 - 07:00）"""
+
+    def __init__(self, start: dtime, end: dtime):
+        if start == end:
+            raise ValueError("免打扰时段的开始和结束时间不能相同")
+        self.start = start
+        self.end = end
+        self._cached = (float("inf"), float("-inf"), None)  # 在 [lo, hi) 内查询结果为 span
+
+    def span_at(self, timestamp: float) -> Optional[Tuple[float, float]]:
+        """包含timestamp的免打扰时段 (开始, 结束) 时间戳，不在时段内返回None"""
+        lo, hi, span = self._cached
+        if lo <= timestamp < hi:
+            return span
+        day = datetime.fromtimestamp(timestamp).date()
+        for offset in (-1, 0, 1):
+            date = day + timedelta(days=offset)
+            start = datetime.combine(date, self.start).timestamp()
+            end_date = date if self.start < self.end else date + timedelta(days=1)
+            end = datetime.combine(end_date, self.end).timestamp()
+            if end <= timestamp:
+                continue
+            if start <= timestamp:
+                self._cached = (start, end, (start, end))
+                return self._cached[2]
+            # 位于下一个时段之前：直到该时段开始，查询结果都是None
+            self._cached = (timestamp, start, None)
+            return None
+        return None
@@ -1,7 +1,16 @@
+import heapq
+import itertools
+from array import array
 import threading
+import time
 
 class ThreadSafeMinHeap:
-    """线程安全的最小堆实现（完全底层实现）"""
+    """
+    线程安全的最小堆（内部委托给C实现的heapq）
+    
+    - 每个公开方法只加一次锁，组合操作（pushpop/replace/pop_until/merge）在锁内原子完成
+    - 元素之间直接用 < 比较；pop_until 用 _default_key 取触发时间与阈值比较
+    """
     
     def __init__(self):
         """初始化堆"""
@@ -11,28 +20,50 @@ class ThreadSafeMinHeap:
     def push(self, item):
         """添加元素到堆中"""
         with self._lock:
-            # 1. 将新元素添加到数组末尾
-            self._heap.append(item)
-            # 2. 执行上浮操作恢复堆性质
-            self._sift_up(len(self._heap) - 1)
+            heapq.heappush(self._heap, item)
+    
+    def push_many(self, items):
+        """批量添加元素（一次加锁）"""
+        with self._lock:
+            self._extend(list(items))
+    
+    def merge(self, iterable):
+        """
+        合并一批元素或另一个堆（一次加锁），返回合并的元素数量:
+        - 传入ThreadSafeMinHeap时先在对方的锁内取快照，对方保持不变
+        - 新元素较多时追加后整体堆化，O(n + k)；较少时逐个上浮，O(k log n)
+        """
+        items = iterable.items() if isinstance(iterable, ThreadSafeMinHeap) else list(iterable)
+        with self._lock:
+            self._extend(items)
+        return len(items)
     
     def pop(self):
         """弹出最小元素"""
+        with self._lock:
+            return heapq.heappop(self._heap) if self._heap else None
+    
+    def pushpop(self, item):
+        """先放入item再弹出最小元素（原子操作，一次调整）；item不小于堆顶时直接返回item"""
+        with self._lock:
+            return heapq.heappushpop(self._heap, item)
+    
+    def replace(self, item):
+        """先弹出最小元素再放入item（原子操作，一次调整），返回弹出的元素；堆为空时只放入并返回None"""
         with self._lock:
             if not self._heap:
+                self._heap.append(item)
                 return None
-            
-            # 1. 保存堆顶元素（最小值）
-            min_val = self._heap[0]
-            
-            # 2. 将最后一个元素移到堆顶
-            last = self._heap.pop()
-            if self._heap:
-                self._heap[0] = last
-                # 3. 执行下沉操作恢复堆性质
-                self._sift_down(0)
-            
-            return min_val
+            return heapq.heapreplace(self._heap, item)
+    
+    def pop_until(self, threshold):
+        """一次加锁弹出所有触发时间 <= threshold 的元素，按顺序返回列表"""
+        with self._lock:
+            heap = self._heap
+            items = []
+            while heap and _default_key(heap[0]) <= threshold:
+                items.append(heapq.heappop(heap))
+            return items
     
     def peek(self):
         """查看最小元素但不弹出"""
@@ -49,62 +80,36 @@ class ThreadSafeMinHeap:
         with self._lock:
             return len(self._heap)
     
-    def _sift_up(self, index):
-        """上浮操作：将元素向上调整到正确位置"""
-        # 当元素不是根节点且小于其父节点时，持续上浮
-        while index > 0:
-            parent_index = (index - 1) // 2
-            
-            # 如果当前节点大于等于父节点，堆性质已满足
-            if self._heap[index] >= self._heap[parent_index]:
-                break
-            
-            # 交换当前节点与父节点
-            self._heap[index], self._heap[parent_index] = \
-                self._heap[parent_index], self._heap[index]
-            
-            # 更新索引为父节点位置
-            index = parent_index
-    
-    def _sift_down(self, index):
-        """下沉操作：将元素向下调整到正确位置"""
-        size = len(self._heap)
-        
-        # 循环直到没有子节点
-        while True:
-            smallest = index
-            left_child = 2 * index + 1
-            right_child = 2 * index + 2
-            
-            # 检查左子节点是否存在且小于当前节点
-            if left_child < size and self._heap[left_child] < self._heap[smallest]:
-                smallest = left_child
-            
-            # 检查右子节点是否存在且小于当前节点
-            if right_child < size and self._heap[right_child] < self._heap[smallest]:
-                smallest = right_child
-            
-            # 如果当前节点小于等于子节点，堆性质已满足
-            if smallest == index:
-                break
-            
-            # 交换当前节点与最小子节点
-            self._heap[index], self._heap[smallest] = \
-                self._heap[smallest], self._heap[index]
-            
-            # 更新索引为子节点位置
-            index = smallest
+    def items(self):
+        """所有元素的快照（无序）"""
+        with self._lock:
+            return list(self._heap)
     
     def heapify(self, items):
         """堆化操作：将无序列表转换为最小堆"""
         with self._lock:
-            self._heap = items.copy()
-            # 从最后一个非叶子节点开始向前执行下沉操作
-            # 最后一个非叶子节点的索引 = 最后一个元素的父节点索引
-            start_index = (len(self._heap) - 2) // 2
-            for i in range(start_index, -1, -1):
-                self._sift_down(i)
+            self._heap = list(items)
+            heapq.heapify(self._heap)
+
+    def remove_if(self, predicate):
+        """删除所有满足条件的元素，返回删除数量（过滤后整体重新堆化，O(n)）"""
+        with self._lock:
+            kept = [item for item in self._heap if not predicate(item)]
+            removed = len(self._heap) - len(kept)
+            if removed:
+                heapq.heapify(kept)
+                self._heap = kept
+            return removed
     
+    def _extend(self, items):
+        """追加多个元素后恢复堆序（调用方需持有锁）"""
+        if len(items) > len(self._heap):
+            self._heap.extend(items)
+            heapq.heapify(self._heap)
+        else:
+            for item in items:
+                heapq.heappush(self._heap, item)
+
     def __str__(self):
         """可视化堆结构"""
         with self._lock:
@@ -137,6 +142,916 @@ class ThreadSafeMinHeap:
             return "\n".join(result)
 
 
+class IndexedMinHeap(ThreadSafeMinHeap):
+    """
+    带位置索引的线程安全最小堆（ThreadSafeMinHeap的后继实现）
+    
+    - push 返回稳定的整数句柄，元素在堆中移动时句柄不变
+    - _positions 维护 句柄 -> 数组下标，每次交换时同步更新
+    - remove(句柄)/update(句柄, 新元素) 都是原地堆操作，O(log n)
+    - heapq无法在移动元素时回报下标，因此上浮/下沉仍由本类自己实现；
+      基类中直接调用heapq的方法在这里都被重写
+    """
+    
+    def __init__(self):
+        """初始化堆和位置索引"""
+        super().__init__()
+        self._handles = []  # 与_heap平行，记录每个位置上元素的句柄
+        self._positions = {}  # 句柄 -> 在_heap中的下标
+        self._handle_seq = itertools.count(1)
+    
+    def push(self, item):
+        """添加元素到堆中，返回句柄"""
+        with self._lock:
+            return self._push(item)
+    
+    def pop(self):
+        """弹出最小元素"""
+        entry = self.pop_entry()
+        return entry[1] if entry else None
+    
+    def push_many(self, items):
+        """批量添加元素（一次加锁），返回与输入顺序一致的句柄列表"""
+        with self._lock:
+            items = list(items)
+            handles = [next(self._handle_seq) for _ in items]
+            self._extend(items, handles)
+            return handles
+    
+    def push_entries(self, entries):
+        """批量放回 (句柄, 元素)（如pop_until取出后重新入队的元素），沿用原句柄"""
+        with self._lock:
+            entries = list(entries)
+            self._extend([item for _, item in entries], [handle for handle, _ in entries])
+    
+    def merge(self, iterable):
+        """合并一批元素或另一个堆（一次加锁），返回新分配的句柄列表（句柄只在本堆内有效，不沿用对方的句柄）"""
+        items = iterable.items() if isinstance(iterable, ThreadSafeMinHeap) else list(iterable)
+        return self.push_many(items)
+    
+    def pushpop(self, item):
+        """
+        放入item后弹出最小元素（原子操作），返回 (句柄, 元素):
+        - item为新元素分配句柄；item不大于堆顶时堆不变，直接返回 (新句柄, item)
+        """
+        with self._lock:
+            handle = next(self._handle_seq)
+            if not self._heap or not self._heap[0] < item:
+                return handle, item
+            popped = self._handles[0], self._heap[0]
+            del self._positions[popped[0]]
+            self._heap[0] = item
+            self._handles[0] = handle
+            self._positions[handle] = 0
+            self._sift_down(0)
+            return popped
+    
+    def replace(self, item):
+        """
+        用item原地替换堆顶元素（原子操作），返回被替换的 (句柄, 元素):
+        - item沿用堆顶的句柄，适合"取出到期事件、放回同一提醒的下一次事件"
+        - 堆为空时只放入item并返回None
+        """
+        with self._lock:
+            if not self._heap:
+                self._push(item)
+                return None
+            entry = self._handles[0], self._heap[0]
+            self._heap[0] = item
+            self._sift_down(0)
+            return entry
+    
+    def pop_until(self, threshold):
+        """一次加锁弹出所有触发时间 <= threshold 的元素，按顺序返回 [(句柄, 元素)]"""
+        with self._lock:
+            entries = []
+            heap = self._heap
+            while heap and _default_key(heap[0]) <= threshold:
+                entries.append((self._handles[0], self._remove_at(0)))
+            return entries
+    
+    def pop_entry(self):
+        """弹出最小元素，返回 (句柄, 元素)"""
+        with self._lock:
+            if not self._heap:
+                return None
+            handle = self._handles[0]
+            return handle, self._remove_at(0)
+    
+    def peek_handle(self):
+        """查看堆顶元素的句柄"""
+        with self._lock:
+            return self._handles[0] if self._heap else None
+    
+    def get(self, handle):
+        """按句柄查看元素，不存在时返回None"""
+        with self._lock:
+            index = self._positions.get(handle)
+            return None if index is None else self._heap[index]
+    
+    def remove(self, handle):
+        """按句柄删除元素并返回它，句柄不存在（已弹出或已删除）时返回None"""
+        with self._lock:
+            index = self._positions.get(handle)
+            if index is None:
+                return None
+            return self._remove_at(index)
+    
+    def update(self, handle, item):
+        """按句柄原地替换元素（可增大或减小键值），句柄保持不变"""
+        with self._lock:
+            index = self._positions.get(handle)
+            if index is None:
+                return False
+            old = self._heap[index]
+            self._heap[index] = item
+            if item < old:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+            return True
+    
+    def __contains__(self, handle):
+        """句柄是否仍在堆中"""
+        with self._lock:
+            return handle in self._positions
+    
+    def entries(self):
+        """所有 (句柄, 元素) 的快照（无序）"""
+        with self._lock:
+            return list(zip(self._handles, self._heap))
+    
+    def heapify(self, items):
+        """堆化操作：为每个元素分配新句柄后整体堆化，返回句柄列表"""
+        with self._lock:
+            self._heap = list(items)
+            self._handles = [next(self._handle_seq) for _ in self._heap]
+            self._rebuild()
+            return list(self._handles)
+    
+    def remove_if(self, predicate):
+        """删除所有满足条件的元素，返回删除数量"""
+        with self._lock:
+            kept = [(item, handle) for item, handle in zip(self._heap, self._handles)
+                    if not predicate(item)]
+            removed = len(self._heap) - len(kept)
+            if removed:
+                self._heap = [item for item, _ in kept]
+                self._handles = [handle for _, handle in kept]
+                self._rebuild()
+            return removed
+    
+    def _extend(self, items, handles):
+        """追加多个元素及其句柄后恢复堆序（调用方需持有锁）"""
+        start = len(self._heap)
+        self._heap.extend(items)
+        self._handles.extend(handles)
+        if len(items) > start:
+            # 新元素较多：追加后整体重建，O(n + k)
+            self._rebuild()
+        else:
+            # 新元素较少：逐个上浮，O(k log n)
+            for i in range(start, len(self._heap)):
+                self._positions[self._handles[i]] = i
+            for i in range(start, len(self._heap)):
+                self._sift_up(i)
+    
+    def _push(self, item):
+        """添加元素（调用方需持有锁）"""
+        handle = next(self._handle_seq)
+        self._heap.append(item)
+        self._handles.append(handle)
+        self._positions[handle] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+        return handle
+    
+    def _remove_at(self, index):
+        """删除指定下标的元素（调用方需持有锁）"""
+        item = self._heap[index]
+        del self._positions[self._handles[index]]
+        
+        # 用最后一个元素填补空位，再向上或向下调整
+        last_item = self._heap.pop()
+        last_handle = self._handles.pop()
+        if index < len(self._heap):
+            self._heap[index] = last_item
+            self._handles[index] = last_handle
+            self._positions[last_handle] = index
+            if last_item < item:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+        return item
+    
+    def _rebuild(self):
+        """重建位置索引并整体堆化（调用方需持有锁）"""
+        self._positions = {handle: i for i, handle in enumerate(self._handles)}
+        start_index = (len(self._heap) - 2) // 2
+        for i in range(start_index, -1, -1):
+            self._sift_down(i)
+    
+    def _swap(self, i, j):
+        """交换两个位置的元素，同时更新位置索引"""
+        heap, handles = self._heap, self._handles
+        heap[i], heap[j] = heap[j], heap[i]
+        handles[i], handles[j] = handles[j], handles[i]
+        self._positions[handles[i]] = i
+        self._positions[handles[j]] = j
+    
+    def _sift_up(self, index):
+        """上浮操作（维护位置索引）"""
+        while index > 0:
+            parent_index = (index - 1) // 2
+            if self._heap[index] >= self._heap[parent_index]:
+                break
+            self._swap(index, parent_index)
+            index = parent_index
+    
+    def _sift_down(self, index):
+        """下沉操作（维护位置索引）"""
+        size = len(self._heap)
+        while True:
+            smallest = index
+            left_child = 2 * index + 1
+            right_child = 2 * index + 2
+            if left_child < size and self._heap[left_child] < self._heap[smallest]:
+                smallest = left_child
+            if right_child < size and self._heap[right_child] < self._heap[smallest]:
+                smallest = right_child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
+
+
+class ArrayMinHeap(ThreadSafeMinHeap):
+    """
+    结构数组（struct-of-arrays）形式的线程安全最小堆，适合百万级的大队列
+    
+    - 触发时间存放在 array('d') 中，入堆序号和句柄存放在平行的 array('q') 中，
+      元素本身只放在 句柄 -> 元素 的旁路表里；上浮/下沉只读写连续的定长数组，
+      比较的是浮点数，不再逐次调用元素的 __lt__，也不维护逐元素的位置索引
+    - 触发时间相同时按入堆序号先进先出
+    - remove/update 采用惰性删除：旧槽位留在数组中，到达堆顶时才丢弃，失效槽位超过一半时整体压缩；
+      只有存在失效槽位的句柄才在 _versions 中记录当前有效的入堆序号，
+      常见情况（只入队和出队）下每个事件只占旁路表中的一项
+    - 接口与IndexedMinHeap一致（push返回句柄，支持remove/update/pop_until等）
+    """
+    
+    # 失效槽位少于该数量时不压缩，避免小堆频繁重建
+    COMPACT_MIN_STALE = 64
+    
+    def __init__(self):
+        """初始化三个平行数组和旁路表"""
+        super().__init__()
+        self._keys = array('d')  # 触发时间
+        self._seqs = array('q')  # 入堆序号（时间相同时的第二排序键）
+        self._ids = array('q')  # 句柄
+        self._payloads = {}  # 句柄 -> 元素
+        self._versions = {}  # 句柄 -> 当前有效的入堆序号（只记录存在失效槽位的句柄，-1表示已删除）
+        self._stale = 0  # 数组中失效槽位的数量
+        self._handle_seq = itertools.count(1)
+        self._entry_seq = itertools.count()
+    
+    def push(self, item):
+        """添加元素到堆中，返回句柄"""
+        with self._lock:
+            handle = next(self._handle_seq)
+            self._append(_default_key(item), handle, item)
+            self._sift_up(len(self._keys) - 1)
+            return handle
+    
+    def pop(self):
+        """弹出最小元素"""
+        entry = self.pop_entry()
+        return entry[1] if entry else None
+    
+    def push_many(self, items):
+        """批量添加元素（一次加锁），返回与输入顺序一致的句柄列表"""
+        with self._lock:
+            entries = [(next(self._handle_seq), item) for item in items]
+            self._extend(entries)
+            return [handle for handle, _ in entries]
+    
+    def push_entries(self, entries):
+        """批量放回 (句柄, 元素)（如pop_until取出后重新入队的元素），沿用原句柄"""
+        with self._lock:
+            self._extend(list(entries))
+    
+    def merge(self, iterable):
+        """合并一批元素或另一个堆（一次加锁），返回新分配的句柄列表"""
+        items = iterable.items() if isinstance(iterable, ThreadSafeMinHeap) else list(iterable)
+        return self.push_many(items)
+    
+    def pop_entry(self):
+        """弹出最小元素，返回 (句柄, 元素)"""
+        with self._lock:
+            self._prune()
+            if not self._keys:
+                return None
+            handle = self._pop_slot()[2]
+            return handle, self._payloads.pop(handle)
+    
+    def pop_until(self, threshold):
+        """一次加锁弹出所有触发时间 <= threshold 的元素，按顺序返回 [(句柄, 元素)]"""
+        with self._lock:
+            entries = []
+            keys, payloads, versions = self._keys, self._payloads, self._versions
+            while keys and keys[0] <= threshold:
+                _, seq, handle = self._pop_slot()
+                if handle in payloads and versions.get(handle, seq) == seq:
+                    entries.append((handle, payloads.pop(handle)))
+                else:
+                    self._discard_stale()
+            return entries
+    
+    def pushpop(self, item):
+        """放入item后弹出最小元素（原子操作），返回 (句柄, 元素)；item不大于堆顶时堆不变，直接返回 (新句柄, item)"""
+        with self._lock:
+            handle = next(self._handle_seq)
+            key = _default_key(item)
+            self._prune()
+            if not self._keys or key < self._keys[0]:
+                return handle, item
+            popped = self._ids[0]
+            entry = popped, self._payloads.pop(popped)
+            self._payloads[handle] = item
+            self._keys[0] = key
+            self._seqs[0] = next(self._entry_seq)
+            self._ids[0] = handle
+            self._sift_down(0)
+            return entry
+    
+    def replace(self, item):
+        """用item原地替换堆顶元素（原子操作，item沿用堆顶句柄和槽位），返回被替换的 (句柄, 元素)；堆为空时只放入并返回None"""
+        with self._lock:
+            self._prune()
+            if not self._keys:
+                self._append(_default_key(item), next(self._handle_seq), item)
+                return None
+            handle = self._ids[0]
+            entry = handle, self._payloads[handle]
+            self._payloads[handle] = item
+            self._keys[0] = _default_key(item)
+            self._sift_down(0)
+            return entry
+    
+    def peek(self):
+        """查看最小元素但不弹出"""
+        with self._lock:
+            self._prune()
+            return self._payloads[self._ids[0]] if self._keys else None
+    
+    def peek_handle(self):
+        """查看堆顶元素的句柄"""
+        with self._lock:
+            self._prune()
+            return self._ids[0] if self._keys else None
+    
+    def get(self, handle):
+        """按句柄查看元素，不存在时返回None"""
+        with self._lock:
+            return self._payloads.get(handle)
+    
+    def remove(self, handle):
+        """按句柄删除元素并返回它，句柄不存在时返回None（数组槽位惰性删除）"""
+        with self._lock:
+            item = self._payloads.pop(handle, None)
+            if item is None:
+                return None
+            self._versions[handle] = -1
+            self._stale += 1
+            self._maybe_compact()
+            return item
+    
+    def update(self, handle, item):
+        """按句柄替换元素，句柄保持不变；触发时间改变时旧槽位失效并追加新槽位"""
+        with self._lock:
+            old = self._payloads.get(handle)
+            if old is None:
+                return False
+            key = _default_key(item)
+            if key == _default_key(old):
+                self._payloads[handle] = item
+            else:
+                self._append(key, handle, item)
+                self._sift_up(len(self._keys) - 1)
+                self._maybe_compact()
+            return True
+    
+    def __contains__(self, handle):
+        """句柄是否仍在堆中"""
+        with self._lock:
+            return handle in self._payloads
+    
+    def items(self):
+        """所有元素的快照（无序）"""
+        with self._lock:
+            return list(self._payloads.values())
+    
+    def entries(self):
+        """所有 (句柄, 元素) 的快照（无序）"""
+        with self._lock:
+            return list(self._payloads.items())
+    
+    def is_empty(self):
+        """检查堆是否为空"""
+        with self._lock:
+            return not self._payloads
+    
+    def __len__(self):
+        """有效元素数量（不含失效槽位）"""
+        with self._lock:
+            return len(self._payloads)
+    
+    def heapify(self, items):
+        """堆化操作：清空后为每个元素分配新句柄并整体堆化，返回句柄列表"""
+        with self._lock:
+            self._clear()
+            entries = [(next(self._handle_seq), item) for item in items]
+            self._extend(entries)
+            return [handle for handle, _ in entries]
+    
+    def remove_if(self, predicate):
+        """删除所有满足条件的元素，返回删除数量（删除后整体压缩）"""
+        with self._lock:
+            doomed = [handle for handle, item in self._payloads.items() if predicate(item)]
+            for handle in doomed:
+                del self._payloads[handle]
+            if doomed:
+                self._stale += len(doomed)
+                self._compact()
+            return len(doomed)
+    
+    def memory_bytes(self):
+        """三个平行数组占用的字节数（不含旁路表和元素本身）"""
+        with self._lock:
+            return sum(a.buffer_info()[1] * a.itemsize for a in (self._keys, self._seqs, self._ids))
+    
+    def _append(self, key, handle, item):
+        """在数组末尾追加一个槽位作为句柄的有效槽位，不调整堆序（调用方需持有锁）"""
+        seq = next(self._entry_seq)
+        self._keys.append(key)
+        self._seqs.append(seq)
+        self._ids.append(handle)
+        self._register(handle, seq, item)
+    
+    def _register(self, handle, seq, item):
+        """登记句柄的元素；句柄已有槽位（仍有效或已失效）时记录新的有效序号（调用方需持有锁）"""
+        if handle in self._payloads:
+            self._stale += 1  # 同一句柄重复放入时旧槽位失效
+            self._versions[handle] = seq
+        elif handle in self._versions:
+            self._versions[handle] = seq
+        self._payloads[handle] = item
+    
+    def _extend(self, entries):
+        """追加多个 (句柄, 元素) 后恢复堆序（调用方需持有锁）"""
+        start = len(self._keys)
+        first_seq = next(self._entry_seq)
+        seqs = range(first_seq, first_seq + len(entries))
+        self._entry_seq = itertools.count(first_seq + len(entries))
+        self._keys.extend([_default_key(item) for _, item in entries])
+        self._seqs.extend(seqs)
+        self._ids.extend([handle for handle, _ in entries])
+        if self._payloads or self._versions:
+            for (handle, item), seq in zip(entries, seqs):
+                self._register(handle, seq, item)
+        else:
+            self._payloads.update(entries)
+        if len(entries) > start:
+            self._rebuild()
+        else:
+            for i in range(start, len(self._keys)):
+                self._sift_up(i)
+    
+    def _pop_slot(self):
+        """弹出堆顶槽位，返回 (时间, 序号, 句柄)（调用方需持有锁）"""
+        keys, seqs, ids = self._keys, self._seqs, self._ids
+        slot = keys[0], seqs[0], ids[0]
+        last = len(keys) - 1
+        if last:
+            keys[0], seqs[0], ids[0] = keys[last], seqs[last], ids[last]
+        del keys[last], seqs[last], ids[last]
+        if last:
+            self._sift_down(0)
+        return slot
+    
+    def _prune(self):
+        """丢弃堆顶的失效槽位（调用方需持有锁）"""
+        keys, seqs, ids = self._keys, self._seqs, self._ids
+        payloads, versions = self._payloads, self._versions
+        while keys and (ids[0] not in payloads or versions.get(ids[0], seqs[0]) != seqs[0]):
+            self._pop_slot()
+            self._discard_stale()
+    
+    def _discard_stale(self):
+        """丢弃了一个失效槽位；失效槽位全部清除后版本表也不再需要（调用方需持有锁）"""
+        self._stale -= 1
+        if not self._stale:
+            self._versions.clear()
+    
+    def _maybe_compact(self):
+        """失效槽位超过一半时压缩（调用方需持有锁）"""
+        if self._stale > self.COMPACT_MIN_STALE and self._stale * 2 > len(self._keys):
+            self._compact()
+    
+    def _compact(self):
+        """只保留有效槽位并重新堆化（调用方需持有锁）"""
+        payloads, versions = self._payloads, self._versions
+        valid = [i for i, (seq, handle) in enumerate(zip(self._seqs, self._ids))
+                 if handle in payloads and versions.get(handle, seq) == seq]
+        self._keys = array('d', [self._keys[i] for i in valid])
+        self._seqs = array('q', [self._seqs[i] for i in valid])
+        self._ids = array('q', [self._ids[i] for i in valid])
+        self._stale = 0
+        self._versions.clear()
+        self._rebuild()
+    
+    def _clear(self):
+        """清空所有数组和旁路表（调用方需持有锁）"""
+        self._keys = array('d')
+        self._seqs = array('q')
+        self._ids = array('q')
+        self._payloads = {}
+        self._versions = {}
+        self._stale = 0
+    
+    def _rebuild(self):
+        """整体堆化（调用方需持有锁）"""
+        for i in range(len(self._keys) // 2 - 1, -1, -1):
+            self._sift_down(i)
+    
+    def _sift_up(self, index):
+        """上浮操作：把槽位留空向上移动，最后一次写入（只读写三个数组）"""
+        keys, seqs, ids = self._keys, self._seqs, self._ids
+        key, seq, handle = keys[index], seqs[index], ids[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            parent_key = keys[parent]
+            if parent_key < key or (parent_key == key and seqs[parent] < seq):
+                break
+            keys[index], seqs[index], ids[index] = parent_key, seqs[parent], ids[parent]
+            index = parent
+        keys[index], seqs[index], ids[index] = key, seq, handle
+    
+    def _sift_down(self, index):
+        """下沉操作：把槽位留空向下移动，最后一次写入（只读写三个数组）"""
+        keys, seqs, ids = self._keys, self._seqs, self._ids
+        size = len(keys)
+        key, seq, handle = keys[index], seqs[index], ids[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            child_key = keys[child]
+            right = child + 1
+            if right < size:
+                right_key = keys[right]
+                if right_key < child_key or (right_key == child_key and seqs[right] < seqs[child]):
+                    child, child_key = right, right_key
+            if key < child_key or (key == child_key and seq < seqs[child]):
+                break
+            keys[index], seqs[index], ids[index] = child_key, seqs[child], ids[child]
+            index = child
+        keys[index], seqs[index], ids[index] = key, seq, handle
+    
+    def __str__(self):
+        """概要信息"""
+        with self._lock:
+            return (f"ArrayMinHeap(size={len(self._payloads)}, slots={len(self._keys)}, "
+                    f"stale={self._stale})")
+
+
+class _WheelEntry:
+    """时间轮中的元素包装：记录句柄和是否已被删除（惰性删除）"""
+    
+    __slots__ = ("item", "handle", "alive")
+    
+    def __init__(self, item, handle):
+        self.item = item
+        self.handle = handle
+        self.alive = True
+    
+    def __lt__(self, other):
+        return self.item < other.item
+
+
+class HierarchicalTimingWheel:
+    """
+    分层时间轮事件存储（秒/分/时/天四级时间轮），与IndexedMinHeap接口一致
+    
+    - 插入: 按触发时间与游标的距离直接放入对应层级的槽位，O(1)
+    - 到期: 游标只在需要时前移，高层槽位整体下沉（级联）到低层，均摊O(1)
+    - 同一秒内的元素放入一个很小的就绪堆中，保证弹出顺序与最小堆完全一致
+    - 超出天级时间轮范围（512天）的元素暂存在溢出堆中
+    - 删除/修改按句柄惰性进行：旧元素只做标记，在级联或弹出时丢弃，O(1)
+    """
+    
+    SECOND_SLOTS = 60
+    MINUTE_SLOTS = 60
+    HOUR_SLOTS = 24
+    DAY_SLOTS = 512
+    
+    def __init__(self, key=None, start_time=None):
+        """
+        初始化时间轮:
+        - key: 从元素中取出触发时间戳的函数，默认取元组第一个字段或事件记录的when
+        - start_time: 游标初始时间（秒），默认取当前时间
+        """
+        self._key = key or _default_key
+        self._lock = threading.Lock()
+        self._cursor = int(time.time() if start_time is None else start_time)
+        self._entries = {}   # 句柄 -> 存活的元素包装
+        self._handle_seq = itertools.count(1)
+        self._ready = []     # 触发时间 <= 游标的元素（小顶堆）
+        self._overflow = []  # 超出天级时间轮范围的元素（小顶堆）
+        self._seconds = [[] for _ in range(self.SECOND_SLOTS)]
+        self._minutes = [[] for _ in range(self.MINUTE_SLOTS)]
+        self._hours = [[] for _ in range(self.HOUR_SLOTS)]
+        self._days = [[] for _ in range(self.DAY_SLOTS)]
+    
+    def push(self, item):
+        """添加元素到时间轮中，返回句柄"""
+        with self._lock:
+            return self._push(item, next(self._handle_seq))
+    
+    def pop(self):
+        """弹出触发时间最早的元素"""
+        entry = self.pop_entry()
+        return entry[1] if entry else None
+    
+    def push_many(self, items):
+        """批量添加元素（一次加锁，每个O(1)），返回句柄列表"""
+        with self._lock:
+            return [self._push(item, next(self._handle_seq)) for item in items]
+    
+    def push_entries(self, entries):
+        """批量放回 (句柄, 元素)，沿用原句柄"""
+        with self._lock:
+            for handle, item in entries:
+                self._push(item, handle)
+    
+    def merge(self, iterable):
+        """合并一批元素或另一个堆（一次加锁），返回新分配的句柄列表（句柄只在本堆内有效，不沿用对方的句柄）"""
+        items = iterable.items() if isinstance(iterable, ThreadSafeMinHeap) else list(iterable)
+        return self.push_many(items)
+    
+    def pushpop(self, item):
+        """
+        放入item后弹出最早的元素（原子操作），返回 (句柄, 元素):
+        - item为新元素分配句柄；item不大于最早元素时时间轮不变，直接返回 (新句柄, item)
+        """
+        with self._lock:
+            handle = next(self._handle_seq)
+            entry = self._head()
+            if entry is None or not entry.item < item:
+                return handle, item
+            heapq.heappop(self._ready)
+            del self._entries[entry.handle]
+            self._push(item, handle)
+            return entry.handle, entry.item
+    
+    def replace(self, item):
+        """
+        用item替换最早的元素（原子操作），返回被替换的 (句柄, 元素):
+        - item沿用被替换元素的句柄，按自己的触发时间放入槽位
+        - 时间轮为空时只放入item并返回None
+        """
+        with self._lock:
+            entry = self._head()
+            if entry is None:
+                self._push(item, next(self._handle_seq))
+                return None
+            heapq.heappop(self._ready)
+            del self._entries[entry.handle]
+            self._push(item, entry.handle)
+            return entry.handle, entry.item
+    
+    def pop_until(self, threshold):
+        """一次加锁弹出所有触发时间 <= threshold 的元素，按顺序返回 [(句柄, 元素)]"""
+        with self._lock:
+            entries = []
+            while True:
+                entry = self._head()
+                if entry is None or self._key(entry.item) > threshold:
+                    return entries
+                heapq.heappop(self._ready)
+                del self._entries[entry.handle]
+                entries.append((entry.handle, entry.item))
+    
+    def pop_entry(self):
+        """弹出触发时间最早的元素，返回 (句柄, 元素)"""
+        with self._lock:
+            entry = self._head()
+            if entry is None:
+                return None
+            heapq.heappop(self._ready)
+            del self._entries[entry.handle]
+            return entry.handle, entry.item
+    
+    def peek(self):
+        """查看触发时间最早的元素但不弹出"""
+        with self._lock:
+            entry = self._head()
+            return entry.item if entry else None
+    
+    def peek_handle(self):
+        """查看触发时间最早的元素的句柄"""
+        with self._lock:
+            entry = self._head()
+            return entry.handle if entry else None
+    
+    def get(self, handle):
+        """按句柄查看元素，不存在时返回None"""
+        with self._lock:
+            entry = self._entries.get(handle)
+            return entry.item if entry else None
+    
+    def remove(self, handle):
+        """按句柄删除元素并返回它（惰性删除，O(1)）"""
+        with self._lock:
+            entry = self._entries.pop(handle, None)
+            if entry is None:
+                return None
+            entry.alive = False
+            return entry.item
+    
+    def update(self, handle, item):
+        """按句柄替换元素：旧元素标记删除，新元素以同一句柄重新放入槽位"""
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return False
+            entry.alive = False
+            self._push(item, handle)
+            return True
+    
+    def __contains__(self, handle):
+        """句柄是否仍在时间轮中"""
+        with self._lock:
+            return handle in self._entries
+    
+    def items(self):
+        """所有存活元素的快照（无序）"""
+        with self._lock:
+            return [entry.item for entry in self._entries.values()]
+    
+    def entries(self):
+        """所有存活的 (句柄, 元素) 的快照（无序）"""
+        with self._lock:
+            return [(handle, entry.item) for handle, entry in self._entries.items()]
+    
+    def is_empty(self):
+        """检查时间轮是否为空"""
+        with self._lock:
+            return not self._entries
+    
+    def __len__(self):
+        """获取时间轮中元素数量"""
+        with self._lock:
+            return len(self._entries)
+    
+    def heapify(self, items):
+        """批量重建：清空后逐个放入槽位，O(n)，返回句柄列表"""
+        with self._lock:
+            self._clear()
+            return [self._push(item, next(self._handle_seq)) for item in items]
+    
+    def remove_if(self, predicate):
+        """删除所有满足条件的元素，返回删除数量"""
+        with self._lock:
+            doomed = [entry for entry in self._entries.values() if predicate(entry.item)]
+            for entry in doomed:
+                entry.alive = False
+                del self._entries[entry.handle]
+            return len(doomed)
+    
+    def _push(self, item, handle):
+        """包装元素并放入槽位（调用方需持有锁）"""
+        entry = _WheelEntry(item, handle)
+        self._entries[handle] = entry
+        self._place(entry)
+        return handle
+    
+    def _head(self):
+        """丢弃就绪堆顶的已删除元素，返回最早的存活元素（调用方需持有锁）"""
+        while True:
+            while self._ready and not self._ready[0].alive:
+                heapq.heappop(self._ready)
+            if self._ready:
+                return self._ready[0]
+            if not self._advance():
+                return None
+    
+    def _clear(self):
+        """清空所有槽位（调用方需持有锁）"""
+        self._entries = {}
+        self._ready = []
+        self._overflow = []
+        for wheel in (self._seconds, self._minutes, self._hours, self._days):
+            for slot in wheel:
+                slot.clear()
+    
+    def _place(self, entry):
+        """根据触发时间与游标的距离选择层级和槽位（调用方需持有锁）"""
+        tick = int(self._key(entry.item))
+        cursor = self._cursor
+        
+        if tick <= cursor:
+            # 已到期（或与游标同一秒）：直接进入就绪堆
+            heapq.heappush(self._ready, entry)
+        elif tick // 60 == cursor // 60:
+            self._seconds[tick % 60].append(entry)
+        elif tick // 3600 == cursor // 3600:
+            self._minutes[tick // 60 % 60].append(entry)
+        elif tick // 86400 == cursor // 86400:
+            self._hours[tick // 3600 % 24].append(entry)
+        elif tick // 86400 - cursor // 86400 < self.DAY_SLOTS:
+            self._days[tick // 86400 % self.DAY_SLOTS].append(entry)
+        else:
+            heapq.heappush(self._overflow, (tick, entry))
+    
+    def _cascade(self, wheel, index, new_cursor):
+        """游标前移到new_cursor，并把高层槽位中的存活元素重新分配到低层（调用方需持有锁）"""
+        self._cursor = new_cursor
+        entries, wheel[index] = wheel[index], []
+        for entry in entries:
+            if entry.alive:
+                self._place(entry)
+    
+    def _drain_overflow(self, today):
+        """把进入天级时间轮范围的溢出元素重新放入槽位（调用方需持有锁）"""
+        limit = today + self.DAY_SLOTS
+        while self._overflow and self._overflow[0][0] // 86400 < limit:
+            entry = heapq.heappop(self._overflow)[1]
+            if entry.alive:
+                self._place(entry)
+    
+    def _advance(self):
+        """
+        游标前移到下一个非空槽位，直到就绪堆中有元素（调用方需持有锁）
+        每一层最多扫描一圈槽位，因此单次前移的代价有常数上界
+        """
+        while not self._ready:
+            if not self._entries:
+                return False
+            cursor = self._cursor
+            
+            # 1. 当前分钟内剩余的秒级槽位
+            second = cursor % 60
+            for s in range(second + 1, 60):
+                if self._seconds[s]:
+                    self._cursor = cursor - second + s
+                    self._ready = [entry for entry in self._seconds[s] if entry.alive]
+                    self._seconds[s] = []
+                    heapq.heapify(self._ready)
+                    break
+            else:
+                # 2. 当前小时内剩余的分钟级槽位
+                minute = cursor // 60 % 60
+                for m in range(minute + 1, 60):
+                    if self._minutes[m]:
+                        self._cascade(self._minutes, m, cursor // 3600 * 3600 + m * 60)
+                        break
+                else:
+                    # 3. 当天剩余的小时级槽位
+                    hour = cursor // 3600 % 24
+                    for h in range(hour + 1, 24):
+                        if self._hours[h]:
+                            self._cascade(self._hours, h, cursor // 86400 * 86400 + h * 3600)
+                            break
+                    else:
+                        # 4. 之后的天级槽位（先把已进入范围的溢出元素移入天级时间轮）
+                        today = cursor // 86400
+                        self._drain_overflow(today)
+                        for d in range(today + 1, today + self.DAY_SLOTS):
+                            index = d % self.DAY_SLOTS
+                            if self._days[index]:
+                                self._cascade(self._days, index, d * 86400)
+                                break
+                        else:
+                            # 5. 溢出堆：游标跳到最早溢出元素所在的那一天
+                            if not self._overflow:
+                                return False
+                            self._cursor = self._overflow[0][0] // 86400 * 86400
+                            self._drain_overflow(self._cursor // 86400)
+        return True
+    
+    def __str__(self):
+        """概要信息"""
+        with self._lock:
+            return (f"HierarchicalTimingWheel(size={len(self._entries)}, cursor={self._cursor}, "
+                    f"ready={len(self._ready)}, overflow={len(self._overflow)})")
+
+
+def _default_key(item):
+    """默认的时间戳提取函数：元组取第一个字段，事件记录取when，其它直接比较"""
+    if isinstance(item, tuple):
+        return item[0]
+    return getattr(item, "when", item)
+
+
 # 测试最小堆功能
 if __name__ == "__main__":
     print("=== 最小堆功能测试 ===")
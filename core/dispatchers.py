@@ -0,0 +1,141 @@
+"""
+@文件: dispatchers.py
+@描述: 回调分发器，决定ReminderManager在哪个执行上下文中运行回调
+@核心设计:
+    1. 调度线程只负责把"执行全部回调"这个函数交给分发器，不关心界面框架
+    2. ThreadDispatcher: 单独的回调线程，适合无界面的后台服务
+    3. AsyncioDispatcher: 投递到asyncio事件循环
+    4. QtDispatcher: 通过跨线程信号投递到Qt主线程；PyQt6只在创建时才导入，
+       因此core包本身不依赖Qt
+    5. InlineDispatcher: 直接在调度线程中执行，用于分片工作进程等自行转发事件的场景
+    6. 协程回调（asyncio通知通道）由run_coroutine运行：AsyncioDispatcher在自己的循环中创建任务，
+       其他分发器提交到一个专用的后台事件循环线程，不阻塞调度线程或Qt主线程；
+       asyncio只在第一次遇到协程回调时才导入，无界面启动时不付出导入开销
+"""
+import queue
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Dispatcher:
+    """分发器接口"""
+
+    def dispatch(self, fn: Callable[[], None]) -> None:
+        """把fn交给目标执行上下文运行（可在任意线程调用）"""
+        raise NotImplementedError
+
+    def run_coroutine(self, coro) -> None:
+        """运行回调返回的协程（在dispatch执行的上下文中调用）：提交到后台事件循环，立即返回"""
+        import asyncio
+        future = asyncio.run_coroutine_threadsafe(coro, _coroutine_loop())
+        future.add_done_callback(_log_coroutine_error)
+
+    def close(self) -> None:
+        """释放分发器资源"""
+
+
+class ThreadDispatcher(Dispatcher):
+    """在单独的回调线程中按顺序执行回调"""
+
+    def __init__(self, name: str = "ReminderDispatcher"):
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def dispatch(self, fn: Callable[[], None]) -> None:
+        self._queue.put(fn)
+
+    def _run(self) -> None:
+        while True:
+            fn = self._queue.get()
+            if fn is None:
+                break
+            try:
+                fn()
+            except Exception:
+                logger.exception("回调执行出错")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+
+class InlineDispatcher(Dispatcher):
+    """直接在调用线程（调度线程）中执行回调，回调必须足够快"""
+
+    def dispatch(self, fn: Callable[[], None]) -> None:
+        fn()
+
+
+class AsyncioDispatcher(Dispatcher):
+    """把回调投递到指定的asyncio事件循环中执行"""
+
+    def __init__(self, loop):
+        self.loop = loop
+
+    def dispatch(self, fn: Callable[[], None]) -> None:
+        self.loop.call_soon_threadsafe(fn)
+
+    def run_coroutine(self, coro) -> None:
+        self.loop.create_task(coro).add_done_callback(_log_coroutine_error)
+
+
+class QtDispatcher(Dispatcher):
+    """通过排队连接的信号，把回调投递到Qt主线程（需在主线程、QApplication创建后构造）"""
+
+    def __init__(self):
+        from PyQt6.QtCore import Qt
+        from PyQt6.QtWidgets import QApplication
+        if not QApplication.instance():
+            raise RuntimeError("QApplication未初始化")
+        self._invoker = _qt_invoker_class()()
+        self._invoker.invoke.connect(_call, Qt.ConnectionType.QueuedConnection)
+
+    def dispatch(self, fn: Callable[[], None]) -> None:
+        self._invoker.invoke.emit(fn)
+
+
+def _call(fn: Callable[[], None]) -> None:
+    fn()
+
+
+_coroutine_loop_instance = None
+_coroutine_loop_lock = threading.Lock()
+
+
+def _coroutine_loop():
+    """首次使用时才创建运行协程回调的后台事件循环线程（所有非asyncio分发器共用）"""
+    global _coroutine_loop_instance
+    with _coroutine_loop_lock:
+        if _coroutine_loop_instance is None:
+            import asyncio
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ReminderCoroutines", daemon=True).start()
+            _coroutine_loop_instance = loop
+    return _coroutine_loop_instance
+
+
+def _log_coroutine_error(future) -> None:
+    """协程回调结束时记录未处理的异常"""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("协程回调执行出错", exc_info=future.exception())
+
+
+_invoker_class = None
+
+
+def _qt_invoker_class():
+    """首次使用时才定义带信号的QObject子类（延迟导入PyQt6）"""
+    global _invoker_class
+    if _invoker_class is None:
+        from PyQt6.QtCore import QObject, pyqtSignal
+
+        class _Invoker(QObject):
+            invoke = pyqtSignal(object)
+
+        _invoker_class = _Invoker
+    return _invoker_class
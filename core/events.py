@@ -0,0 +1,102 @@
+"""
+@文件: events.py
+@描述: 调度队列中的紧凑事件记录
+@核心设计:
+    1. __slots__ 记录代替 (时间戳, dict) 元组，不再为每个事件保存字典和datetime
+    2. 全局单调递增序号作为第二排序键，时间戳相同时也能稳定比较
+    3. 花种名称做字符串驻留，同一花种的所有事件共享同一个字符串对象
+    4. 提醒文本只在事件真正触发时才生成
+"""
+import sys
+import itertools
+from datetime import datetime
+from core.recurrence import RecurrenceRule
+
+# 事件类型（字符串字面量本身已驻留）
+CARE_REMINDER = "care_reminder"
+IMMEDIATE_REMINDER = "immediate_reminder"
+SNOOZE_REMINDER = "snooze_reminder"
+
+_sequence = itertools.count()
+
+
+class ReminderEvent:
+    """
+    调度事件记录:
+    - when: 触发时间戳（秒）
+    - seq: 全局递增序号，时间戳相同时保证先登记的先触发
+    - kind/flower: 事件类型与花种（驻留字符串）
+    - interval_days: 养护间隔天数
+    - rule/occurrence: 所属的重复规则及第几次触发
+    - owner: 所属的FlowerCareReminderSystem（稍后提醒等一次性事件为None）
+    - message: 预设提醒文本，None表示触发时按类型生成
+    """
+
+    __slots__ = ("when", "seq", "kind", "flower", "interval_days",
+                 "rule", "occurrence", "owner", "message")
+
+    def __init__(self, when, kind, flower, interval_days=0.0, rule=None,
+                 occurrence=0, owner=None, message=None):
+        self.when = when
+        self.seq = next(_sequence)
+        self.kind = kind
+        self.flower = sys.intern(flower)
+        self.interval_days = interval_days
+        self.rule = rule
+        self.occurrence = occurrence
+        self.owner = owner
+        self.message = message
+
+    def __lt__(self, other):
+        return self.when < other.when or (self.when == other.when and self.seq < other.seq)
+
+    def __ge__(self, other):
+        return not self.__lt__(other)
+
+    def replace(self, when):
+        """复制一份新触发时间的记录（分配新序号）"""
+        return ReminderEvent(when, self.kind, self.flower, self.interval_days, self.rule,
+                             self.occurrence, self.owner, self.message)
+
+    def render_message(self):
+        """生成提醒文本（仅在触发时调用）"""
+        if self.message is not None:
+            return self.message
+        if self.kind == IMMEDIATE_REMINDER:
+            return f"[设置确认] {self.flower}提醒设置成功！今日将再次提醒: {self.rule.start.strftime('%H:%M')}"
+
+        label = "提醒时间" if self.occurrence == 0 else "下次养护时间"
+        trigger_time = datetime.fromtimestamp(self.when)
+        return f"[养护提醒] 请养护{self.flower} - {label}: {trigger_time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+    def to_dict(self):
+        """转换为回调使用的事件字典（仅在触发时调用）"""
+        return {
+            "type": self.kind,
+            "flower": self.flower,
+            "trigger_time": datetime.fromtimestamp(self.when),
+            "interval_days": self.interval_days,
+            "message": self.render_message()
+        }
+
+    def to_record(self):
+        """序列化为可写入日志的字典（不含owner，恢复时重新关联）"""
+        return {
+            "when": self.when,
+            "kind": self.kind,
+            "flower": self.flower,
+            "interval_days": self.interval_days,
+            "rule": self.rule.to_record() if self.rule is not None else None,
+            "occurrence": self.occurrence,
+            "message": self.message
+        }
+
+    @classmethod
+    def from_record(cls, record, owner=None):
+        """从日志字典还原事件记录"""
+        rule = RecurrenceRule.from_record(record["rule"]) if record["rule"] is not None else None
+        return cls(record["when"], record["kind"], record["flower"], record["interval_days"],
+                   rule, record["occurrence"], owner, record["message"])
+
+    def __repr__(self):
+        return f"ReminderEvent({self.kind}, {self.flower}, when={self.when:.0f}, seq={self.seq})"
@@ -0,0 +1,222 @@
+"""
+@文件: journal.py
+@描述: 提醒事件的追加写日志（WAL）与快照压缩
+@核心设计:
+    1. 每次增删改只向内存缓冲区追加一条记录，热路径不做磁盘I/O
+    2. 后台线程按固定间隔批量写入并fsync（间隔为0时每条记录同步落盘）
+    3. 内存中维护存活事件的镜像，记录数达到阈值时写快照并截断日志
+    4. 每条记录带递增序号(lsn)，快照记录最后的lsn，回放时跳过已包含的记录，
+       因此即使在写快照和截断日志之间崩溃也能正确恢复
+    5. 两把锁：_lock只保护缓冲区、镜像和lsn，持有时间极短（record_*在调度器锁内调用）；
+       _io_lock串行化文件写入。落盘时在_lock下换出缓冲区（需要压缩时同时复制镜像），
+       写入、fsync和写快照都在_lock之外进行，不阻塞增删改
+@记录格式（每行一个JSON）:
+    add/snooze: {"lsn", "op", "id", "event"}  新增事件
+    cancel:     {"lsn", "op", "id"}           取消事件
+    fire:       {"lsn", "op", "id", "next"}   事件触发，next为下一次事件（一次性事件为null）
+    reschedule: {"lsn", "op", "id", "when"}   修改触发时间
+"""
+import os
+import json
+import logging
+import threading
+from typing import Dict, Optional
+
+JOURNAL_FILE = "reminders.journal"
+SNAPSHOT_FILE = "reminders.snapshot"
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderJournal:
+    def __init__(self, directory: str, fsync_interval: float = 1.0, compact_every: int = 10000):
+        """
+        初始化日志:
+        - directory: 日志和快照所在目录
+        - fsync_interval: 批量落盘间隔（秒），0 表示每条记录立即落盘
+        - compact_every: 自上次快照以来累计多少条记录后触发压缩
+        """
+        self.directory = directory
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._buffer = []  # 尚未写入磁盘的记录行
+        self._live = {}  # type: Dict[int, dict]  事件id -> 事件记录（存活事件镜像）
+        self._lsn = 0
+        self._since_snapshot = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._file = open(self.journal_path, "a", encoding="utf-8")
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if fsync_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="ReminderJournal", daemon=True)
+            self._flusher.start()
+
+    # ---------- 写入（热路径，只追加到缓冲区） ----------
+
+    def record_add(self, event_id: int, event: dict) -> None:
+        self._append({"op": "add", "id": event_id, "event": event})
+
+    def record_snooze(self, event_id: int, event: dict) -> None:
+        self._append({"op": "snooze", "id": event_id, "event": event})
+
+    def record_cancel(self, event_id: int) -> None:
+        self._append({"op": "cancel", "id": event_id})
+
+    def record_fire(self, event_id: int, next_event: Optional[dict]) -> None:
+        self._append({"op": "fire", "id": event_id, "next": next_event})
+
+    def record_reschedule(self, event_id: int, when: float) -> None:
+        self._append({"op": "reschedule", "id": event_id, "when": when})
+
+    def _append(self, record: dict) -> None:
+        with self._lock:
+            self._lsn += 1
+            record["lsn"] = self._lsn
+            self._apply(record)
+            self._buffer.append(json.dumps(record, ensure_ascii=False))
+            self._since_snapshot += 1
+        if self.fsync_interval <= 0:
+            self._write_pending()
+
+    # ---------- 恢复 ----------
+
+    def live_events(self) -> Dict[int, dict]:
+        """返回当前存活事件的副本 {事件id: 事件记录}"""
+        with self._lock:
+            return dict(self._live)
+
+    def compact(self, live: Optional[Dict[int, dict]] = None) -> None:
+        """
+        写快照并截断日志:
+        - live 为None时使用内存镜像
+        - 启动恢复后传入按新句柄编号的事件，重置id映射
+        """
+        with self._io_lock:
+            with self._lock:
+                if live is not None:
+                    self._live = dict(live)
+                lines, snapshot = self._take_pending(compact=True)
+            self._write_lines(lines)
+            self._write_snapshot(*snapshot)
+
+    def _load(self) -> None:
+        """读取快照，再按lsn回放日志尾部"""
+        snapshot_lsn = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            snapshot_lsn = snapshot["lsn"]
+            self._live = {int(event_id): event for event_id, event in snapshot["events"].items()}
+        self._lsn = snapshot_lsn
+
+        if os.path.exists(self.journal_path):
+            valid_size = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # 崩溃时写了一半的最后一行
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_size += len(line)
+                    if record["lsn"] <= snapshot_lsn:
+                        continue
+                    self._apply(record)
+                    self._lsn = record["lsn"]
+                    self._since_snapshot += 1
+            # 截掉不完整的尾部，否则之后追加的记录会接在半行后面，下次恢复时一起丢失
+            if valid_size < os.path.getsize(self.journal_path):
+                logger.warning("日志末尾有不完整的记录，已截断")
+                os.truncate(self.journal_path, valid_size)
+
+    def _apply(self, record: dict) -> None:
+        """把一条记录应用到存活事件镜像（所有操作都是幂等的）"""
+        op = record["op"]
+        event_id = record["id"]
+        if op in ("add", "snooze"):
+            self._live[event_id] = record["event"]
+        elif op == "cancel":
+            self._live.pop(event_id, None)
+        elif op == "fire":
+            if record["next"] is None:
+                self._live.pop(event_id, None)
+            else:
+                self._live[event_id] = record["next"]
+        elif op == "reschedule":
+            event = self._live.get(event_id)
+            if event is not None:
+                self._live[event_id] = dict(event, when=record["when"])
+
+    # ---------- 落盘与压缩 ----------
+
+    def flush(self) -> None:
+        """立即把缓冲区写入磁盘并fsync（达到阈值时顺带压缩）"""
+        self._write_pending()
+
+    def _take_pending(self, compact: bool = False) -> tuple:
+        """
+        在_lock下调用：换出待写入的记录行；需要压缩时同时取出 (lsn, 镜像副本)。
+        镜像中的事件记录只会被整体替换、不会原地修改，浅拷贝即可
+        """
+        lines, self._buffer = self._buffer, []
+        snapshot = None
+        if compact or self._since_snapshot >= self.compact_every:
+            snapshot = (self._lsn, dict(self._live))
+            self._since_snapshot = 0
+        return lines, snapshot
+
+    def _write_pending(self) -> None:
+        """换出缓冲区后在_lock之外写入；_io_lock保证快照之后的记录不会被截断掉"""
+        with self._io_lock:
+            if self._file.closed:
+                return
+            with self._lock:
+                lines, snapshot = self._take_pending()
+            self._write_lines(lines)
+            if snapshot is not None:
+                self._write_snapshot(*snapshot)
+
+    def _write_lines(self, lines: list) -> None:
+        if not lines:
+            return
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write_snapshot(self, lsn: int, live: Dict[int, dict]) -> None:
+        """写入新快照（先写临时文件再原子替换），然后截断日志"""
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"lsn": lsn, "events": live}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            try:
+                self._write_pending()
+            except Exception:
+                logger.exception("写入日志出错")
+
+    def close(self) -> None:
+        """停止后台线程，把剩余记录落盘"""
+        self._closed.set()
+        if self._flusher and self._flusher.is_alive():
+            self._flusher.join(timeout=1.0)
+        self._write_pending()
+        with self._io_lock:
+            if not self._file.closed:
+                self._file.close()
@@ -0,0 +1,243 @@
+"""
+@文件: metrics.py
+@描述: 调度器运行指标（延迟直方图、队列深度、回调耗时、唤醒次数）及Prometheus文本导出
+@核心设计:
+    1. 直方图使用固定桶边界 + bisect，每次记录只是一次二分查找和两次加法，可以常开
+    2. 每个直方图只有一个写入线程（触发延迟由调度线程写，回调耗时由回调线程写），
+       写入不加锁；读取快照时可能与写入交错，误差最多一个样本
+    3. 队列深度由调度器在入队/出队时按花种计数（一次字典加减），读取快照只复制计数，
+       不扫描队列，抓取指标不会在队列锁内做O(n)的复制
+    4. 唤醒次数按分钟分桶，快照给出最近一个完整分钟的唤醒次数
+    5. 导出: render_prometheus 生成文本格式；MetricsExporter 定时写文件（原子替换）
+       和/或在本机端口提供 /metrics（http.server 导入较慢，只在启用HTTP端点时才导入）
+"""
+import os
+import time
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 触发延迟的桶边界（秒）：从1毫秒到1小时
+LATENESS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0, 60.0, 300.0, 3600.0)
+# 回调耗时的桶边界（秒）：从0.1毫秒到5秒
+DURATION_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+METRIC_PREFIX = "flower_reminder"
+
+
+class Histogram:
+    """固定桶边界的直方图（单写者）"""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个桶为 +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        """返回 {"buckets": [(上界, 累计数量)], "sum", "count"}，上界最后一项为inf"""
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float("inf"),), list(self.counts)):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {"buckets": buckets, "sum": self.total, "count": self.count}
+
+
+class WakeCounter:
+    """按分钟分桶的唤醒计数"""
+
+    __slots__ = ("total", "_minute", "_current", "_previous")
+
+    def __init__(self):
+        self.total = 0
+        self._minute = int(time.monotonic() // 60)
+        self._current = 0
+        self._previous = 0
+
+    def add(self) -> None:
+        minute = int(time.monotonic() // 60)
+        if minute != self._minute:
+            self._previous = self._current if minute == self._minute + 1 else 0
+            self._minute = minute
+            self._current = 0
+        self._current += 1
+        self.total += 1
+
+    def last_minute(self) -> int:
+        """最近一个完整分钟内的唤醒次数"""
+        minute = int(time.monotonic() // 60)
+        if minute == self._minute:
+            return self._previous
+        return self._current if minute == self._minute + 1 else 0
+
+
+class SchedulerMetrics:
+    """调度器持有的指标集合"""
+
+    def __init__(self):
+        self.fired_total = 0
+        self.lateness = Histogram(LATENESS_BUCKETS)
+        self.wakes = WakeCounter()
+        self._callback_durations = {}  # type: Dict[str, Histogram]
+
+    def callback_histogram(self, name: str) -> Histogram:
+        """
+        回调耗时直方图，按标签区分：注册回调时给出的label，未给出时为提醒类型（批量回调为"batch"）。
+        不使用回调的__qualname__，否则所有lambda、functools.partial回调都会混在同一个序列里
+        """
+        histogram = self._callback_durations.get(name)
+        if histogram is None:
+            histogram = self._callback_durations.setdefault(name, Histogram(DURATION_BUCKETS))
+        return histogram
+
+    def snapshot(self, queue_depth: Dict[str, int]) -> dict:
+        return {
+            "fired_total": self.fired_total,
+            "fire_lateness_seconds": self.lateness.snapshot(),
+            "queue_size": sum(queue_depth.values()),
+            "queue_depth": dict(queue_depth),
+            "callback_duration_seconds": {name: histogram.snapshot()
+                                          for name, histogram in list(self._callback_durations.items())},
+            "scheduler_wakes_total": self.wakes.total,
+            "scheduler_wakes_per_minute": self.wakes.last_minute(),
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def _render_histogram(lines, name, snapshot, labels=""):
+    for bound, cumulative in snapshot["buckets"]:
+        le = f'le="{_format_bound(bound)}"'
+        lines.append(f"{name}_bucket{{{labels + ',' if labels else ''}{le}}} {cumulative}")
+    suffix = f"{{{labels}}}" if labels else ""
+    lines.append(f"{name}_sum{suffix} {snapshot['sum']}")
+    lines.append(f"{name}_count{suffix} {snapshot['count']}")
+
+
+def render_prometheus(metrics: dict) -> str:
+    """把get_metrics()的快照转换为Prometheus文本格式"""
+    p = METRIC_PREFIX
+    lines = [
+        f"# HELP {p}_fired_total 已投递的提醒总数",
+        f"# TYPE {p}_fired_total counter",
+        f"{p}_fired_total {metrics['fired_total']}",
+        f"# HELP {p}_fire_lateness_seconds 实际投递时间与计划触发时间之差",
+        f"# TYPE {p}_fire_lateness_seconds histogram",
+    ]
+    _render_histogram(lines, f"{p}_fire_lateness_seconds", metrics["fire_lateness_seconds"])
+    lines += [
+        f"# HELP {p}_queue_size 调度队列中的事件总数",
+        f"# TYPE {p}_queue_size gauge",
+        f"{p}_queue_size {metrics['queue_size']}",
+        f"# HELP {p}_queue_depth 各花种在调度队列中的事件数",
+        f"# TYPE {p}_queue_depth gauge",
+    ]
+    for flower, depth in sorted(metrics["queue_depth"].items()):
+        lines.append(f'{p}_queue_depth{{flower="{_escape(flower)}"}} {depth}')
+    lines += [
+        f"# HELP {p}_callback_duration_seconds 回调执行耗时（按注册时的标签或提醒类型区分）",
+        f"# TYPE {p}_callback_duration_seconds histogram",
+    ]
+    for name, snapshot in sorted(metrics["callback_duration_seconds"].items()):
+        _render_histogram(lines, f"{p}_callback_duration_seconds", snapshot, f'callback="{_escape(name)}"')
+    lines += [
+        f"# HELP {p}_scheduler_wakes_total 调度器被唤醒的总次数",
+        f"# TYPE {p}_scheduler_wakes_total counter",
+        f"{p}_scheduler_wakes_total {metrics['scheduler_wakes_total']}",
+        f"# HELP {p}_scheduler_wakes_per_minute 最近一个完整分钟内的唤醒次数",
+        f"# TYPE {p}_scheduler_wakes_per_minute gauge",
+        f"{p}_scheduler_wakes_per_minute {metrics['scheduler_wakes_per_minute']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """定时把指标写入Prometheus文本文件（node_exporter textfile方式），和/或提供本机HTTP端点"""
+
+    def __init__(self, collect: Callable[[], dict], path: Optional[str] = None,
+                 port: Optional[int] = None, host: str = "127.0.0.1", interval: float = 15.0):
+        """
+        - collect: 返回指标快照的函数（通常是ReminderManager.get_metrics）
+        - path: 文本文件路径，None表示不写文件
+        - port: HTTP端口，None表示不启动HTTP服务（0表示随机端口，实际端口见self.port）
+        - interval: 写文件间隔（秒）
+        """
+        self.collect = collect
+        self.path = path
+        self.interval = interval
+        self.port = None
+        self._closed = threading.Event()
+        self._writer = None
+        self._server = None
+
+        if path:
+            self._writer = threading.Thread(target=self._write_loop, name="MetricsWriter", daemon=True)
+            self._writer.start()
+        if port is not None:
+            from http.server import ThreadingHTTPServer
+            self._server = ThreadingHTTPServer((host, port), self._handler_class())
+            self.port = self._server.server_address[1]
+            threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+            logger.info("指标HTTP端点: http://%s:%d/metrics", host, self.port)
+
+    def write(self) -> None:
+        """立即写一次文件（先写临时文件再原子替换，读取方不会读到半个文件）"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_prometheus(self.collect()))
+        os.replace(tmp_path, self.path)
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                self.write()
+            except Exception:
+                logger.exception("写入指标文件出错")
+            if self._closed.wait(self.interval):
+                break
+
+    def _handler_class(self):
+        from http.server import BaseHTTPRequestHandler
+        exporter = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_prometheus(exporter.collect()).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("指标请求: " + format, *args)
+
+        return _MetricsHandler
+
+    def close(self) -> None:
+        self._closed.set()
+        if self._writer and self._writer.is_alive():
+            self._writer.join(timeout=1.0)
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,60 @@
+"""
+@文件: recurrence.py
+@描述: 重复提醒规则
+@核心设计:
+    1. 一条规则只保存 起始时间 + 间隔 + 次数（None表示无限重复）
+    2. 按需计算第index次的触发时间，不预先展开所有事件
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class RecurrenceRule:
+    """重复规则：第index次触发时间 = start + index * interval"""
+
+    __slots__ = ("start", "interval", "count")
+
+    def __init__(self, start: datetime, interval: timedelta, count: Optional[int] = None):
+        if interval <= timedelta(0):
+            raise ValueError("重复间隔必须大于0")
+        if count is not None and count < 0:
+            raise ValueError("重复次数不能为负数")
+        self.start = start
+        self.interval = interval
+        self.count = count
+
+    @property
+    def infinite(self) -> bool:
+        """是否无限重复"""
+        return self.count is None
+
+    def occurrence(self, index: int) -> Optional[datetime]:
+        """第index次（从0开始）的触发时间，超出次数时返回None"""
+        if index < 0 or (self.count is not None and index >= self.count):
+            return None
+        return self.start + self.interval * index
+
+    def index_after(self, timestamp: float) -> int:
+        """第一个触发时间晚于timestamp的序号（用于跳过错过的触发，超出次数时由occurrence返回None）"""
+        start = self.start.timestamp()
+        step = self.interval.total_seconds()
+        index = max(0, int((timestamp - start) // step) + 1)
+        # 按秒数估算在夏令时切换前后可能差一个间隔，用实际触发时间校正
+        while index > 0 and (self.start + self.interval * (index - 1)).timestamp() > timestamp:
+            index -= 1
+        while (self.start + self.interval * index).timestamp() <= timestamp:
+            index += 1
+        return index
+
+    def to_record(self) -> dict:
+        """序列化为可写入日志的字典"""
+        return {"start": self.start.timestamp(), "interval": self.interval.total_seconds(), "count": self.count}
+
+    @classmethod
+    def from_record(cls, record: dict) -> "RecurrenceRule":
+        """从日志字典还原规则"""
+        return cls(datetime.fromtimestamp(record["start"]), timedelta(seconds=record["interval"]), record["count"])
+
+    def __repr__(self):
+        count = "∞" if self.count is None else self.count
+        return f"RecurrenceRule(start={self.start}, interval={self.interval}, count={count})"
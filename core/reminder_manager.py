@@ -5,27 +5,99 @@
     1. 二级嵌套的defaultdict(list)实现分类存储
     2. 线程安全的回调函数列表
     3. 基于锁的原子操作保护
+    4. 所有花种共享的全局调度器（单线程 + 单事件队列）
+    5. 可选的追加写日志，重启后恢复全部提醒和稍后提醒
+    6. 可插拔的回调分发器（Qt / 独立线程 / asyncio），core包不依赖任何界面框架
+    7. 可选的asyncio调度引擎：所有提醒只占用事件循环上的一个定时器，不创建线程
+    8. 合并投递：同一窗口（或免打扰时段）内到期的提醒作为一批，只切换一次线程
+    9. 运行指标：get_metrics() 快照，可选导出为Prometheus文本文件或本机HTTP端点
+    10. 即将触发的提醒查询（upcoming/next_reminders）：启用有序索引时读取索引快照，不阻塞调度线程；
+        SQLite队列直接查询数据库的时间索引
 """
+import time
+import logging
 import threading
-from collections import defaultdict
-from typing import List, Dict, Callable, Any
-from PyQt6.QtCore import QTimer
-from PyQt6.QtWidgets import QApplication
+from collections.abc import Awaitable
+from datetime import datetime, timedelta, time as dtime
+from typing import List, Dict, Callable, Any, Iterable, Optional, Tuple
+from core.scheduler import ReminderScheduler
+from core.async_scheduler import AsyncioReminderScheduler
+from core.journal import ReminderJournal
+from core.sqlite_store import SQLiteEventStore
+from core.data_structures import IndexedMinHeap
+from core.events import ReminderEvent, SNOOZE_REMINDER
+from core.clock import QuietHours
+from core import tracing
+from core.metrics import MetricsExporter
+from core.upcoming import entries_to_dicts
+from core.dispatchers import Dispatcher, ThreadDispatcher, AsyncioDispatcher
+
+logger = logging.getLogger(__name__)
+
 
 class ReminderManager:
-    def __init__(self):
+    def __init__(self, queue_backend: str = "heap", journal_dir: str = None,
+                 fsync_interval: float = 1.0, sqlite_path: str = ":memory:",
+                 dispatcher: Dispatcher = None, engine: str = "thread", loop=None,
+                 catchup_policy: str = "latest", catchup_grace: float = 60.0,
+                 batch_window: float = 0.0, quiet_hours: Optional[Tuple[dtime, dtime]] = None,
+                 upcoming_index: bool = False):
         """
         初始化数据结构:
         - reminders: 二级嵌套字典，外层为defaultdict(list)，内层为普通list
         - lock: 可重入锁保护数据结构完整性
         - callbacks: 线程安全回调列表
+        - scheduler: 全局调度器，所有花种的事件共用一个线程和一个事件队列，
+          queue_backend 可选 "heap"（默认）、"array"（结构数组最小堆）、"wheel"（分层时间轮）或
+          "sqlite"（SQLite持久化存储，数据库文件为 sqlite_path）
+        - journal: journal_dir 不为空时启用追加写日志，fsync_interval 为批量落盘间隔（秒）
+        - dispatcher: 回调分发器，界面程序传入QtDispatcher，默认在独立回调线程中执行
+        - engine: "thread"（默认，一个后台调度线程）或 "asyncio"（在 loop 上用单个定时器调度，
+          此时默认的分发器也在该事件循环中执行回调）
+        - catchup_policy: 休眠/关机/时钟跳变后错过超过 catchup_grace 秒的提醒如何补发，
+          "all"（全部）、"latest"（默认，每个花种只补最近一次）或 "skip"（不补发）
+        - batch_window: 合并投递窗口（秒），如0.25；窗口内到期的提醒一起投递
+        - quiet_hours: 免打扰时段 (开始时间, 结束时间)，如 (time(22), time(7))，
+          时段内到期的提醒在时段结束时一起投递
+        - upcoming_index: 为内存队列维护即将触发提醒的有序索引（频繁调用upcoming等查询时启用），
+          每次修改队列多一次O(log n)的索引更新；未启用时查询临时扫描队列，SQLite队列总是直接查询数据库
+        - batch_callbacks: 按批接收提醒的回调列表，每次收到一个事件字典列表
         """
         # 等效于 defaultdict(list) 的纯手工实现
         self._reminders = {}  # type: Dict[str, List[object]]
         self._default_factory = list
         self._lock = threading.RLock()  # 可重入锁
         self._callbacks = []  # type: List[Callable[[dict], None]]
+        self._batch_callbacks = []  # type: List[Callable[[List[dict]], None]]
+        self._callback_labels = {}  # type: Dict[Callable, str]  回调 -> 耗时指标的标签
         self._callback_lock = threading.Lock()
+        queue_options = None
+        if queue_backend == "sqlite":
+            queue_options = {"path": sqlite_path, "owner_resolver": self._resolve_owner}
+        scheduler_options = {
+            "catchup_policy": catchup_policy,
+            "catchup_grace": catchup_grace,
+            "batch_window": batch_window,
+            "quiet_hours": QuietHours(*quiet_hours) if quiet_hours else None,
+            "upcoming_index": upcoming_index,
+        }
+        if engine == "asyncio":
+            if loop is None:
+                raise ValueError("asyncio调度引擎需要传入事件循环 loop")
+            self.scheduler = AsyncioReminderScheduler(self, loop, queue_backend, queue_options,
+                                                      **scheduler_options)
+            if dispatcher is None:
+                dispatcher = AsyncioDispatcher(loop)
+        elif engine == "thread":
+            self.scheduler = ReminderScheduler(self, queue_backend, queue_options, **scheduler_options)
+        else:
+            raise ValueError(f"未知的调度引擎: {engine}")
+        self.dispatcher = dispatcher if dispatcher is not None else ThreadDispatcher()
+        self.metrics_exporter = None
+        self.journal = None
+        if journal_dir:
+            self.journal = ReminderJournal(journal_dir, fsync_interval)
+            self.scheduler.journal = self.journal
 
     def _get_reminder_list(self, flower_type: str) -> List[object]:
         """线程安全的字典访问方法"""
@@ -34,12 +106,23 @@ class ReminderManager:
                 self._reminders[flower_type] = self._default_factory()
             return self._reminders[flower_type]
 
+    def _resolve_owner(self, flower_type: str):
+        """
+        SQLite存储读回事件时，找到该花种当前的提醒系统
+        （在调度器持锁时被调用，不能再获取self._lock，否则会与add_reminder交叉加锁而死锁）
+        """
+        reminders = self._reminders.get(flower_type)
+        try:
+            return reminders[-1] if reminders else None
+        except IndexError:
+            return None
+
     def add_reminder(self, flower_type: str, reminder_system: object) -> None:
         """
         添加提醒系统的底层逻辑:
         1. 获取flower_type对应的提醒列表
-        2. 清空现有提醒（如果存在）
-        3. 添加新提醒并启动
+        2. 清空现有提醒（如果存在），按句柄取消旧事件，O(k log n)
+        3. 添加新提醒并启动（登记到共享调度器，不创建线程）
         """
         with self._lock:
             reminders = self._get_reminder_list(flower_type)
@@ -53,8 +136,104 @@ class ReminderManager:
             reminders.append(reminder_system)
             reminder_system.start()
             
-            # 调试用打印，实际项目应使用logging
-            print(f"[ReminderManager] 已为 {flower_type} 添加提醒系统")
+            logger.debug("已为 %s 添加提醒系统", flower_type)
+
+    def add_reminders_bulk(self, schedules: Iterable[tuple]) -> List[List[int]]:
+        """
+        批量添加提醒（如导入苗圃目录）:
+        1. schedules 中每项为 (flower_type, start_time, interval_days[, repeat_count])
+        2. 同一花种出现多次时以最后一项为准
+        3. 所有事件一次性合并进调度器队列（单次加锁，O(n + k)）
+        返回与输入顺序一致的句柄列表，被覆盖的项为空列表
+        """
+        # 延迟导入，避免与 reminder_system 循环依赖
+        from core.reminder_system import FlowerCareReminderSystem
+
+        systems = []
+        latest = {}
+        for flower_type, start_time, interval_days, *rest in schedules:
+            system = FlowerCareReminderSystem(self, flower_type)
+            system.add_flower_reminder(start_time, interval_days, *rest)
+            systems.append(system)
+            latest[flower_type] = system
+
+        with self._lock:
+            batches = []
+            for flower_type, system in latest.items():
+                reminders = self._get_reminder_list(flower_type)
+                while reminders:
+                    reminders.pop().stop()
+                reminders.append(system)
+                batches.append((system, system.activate()))
+
+            handles = self.scheduler.schedule_many(
+                event for _, pending in batches for event in pending)
+
+            # 按各系统的事件数量把句柄分回去
+            result = {}
+            offset = 0
+            for system, pending in batches:
+                system_handles = handles[offset:offset + len(pending)]
+                offset += len(pending)
+                system.attach_handles(system_handles)
+                result[id(system)] = system_handles
+
+        logger.info("已批量添加 %d 个花种的提醒，共 %d 个事件", len(latest), len(handles))
+        return [result.get(id(system), []) for system in systems]
+
+    def restore(self) -> List[str]:
+        """
+        从日志恢复提醒（应在注册回调之后调用）:
+        1. 读取快照 + 日志尾部得到存活事件，耗时只与存活事件数量有关
+        2. 按花种重建提醒系统，稍后提醒作为独立的一次性事件
+        3. 一次性合并进调度器队列并重写快照
+        返回恢复出的花种列表
+        """
+        # 延迟导入，避免与 reminder_system 循环依赖
+        from core.reminder_system import FlowerCareReminderSystem
+
+        if not self.journal:
+            return self._restore_from_store(FlowerCareReminderSystem)
+
+        records = self.journal.live_events().values()
+        with self._lock:
+            systems = {}
+            events = []
+            for record in records:
+                owner = None
+                if record["kind"] != SNOOZE_REMINDER:
+                    flower_type = record["flower"]
+                    if flower_type not in systems:
+                        systems[flower_type] = FlowerCareReminderSystem(self, flower_type)
+                        systems[flower_type].activate()
+                    owner = systems[flower_type]
+                events.append(ReminderEvent.from_record(record, owner))
+
+            for flower_type, system in systems.items():
+                self._get_reminder_list(flower_type).append(system)
+            handles = self.scheduler.restore(events)
+            for handle, event in zip(handles, events):
+                if event.owner is not None:
+                    event.owner.attach_handles([handle])
+
+        logger.info("已从日志恢复 %d 个事件，%d 个花种", len(events), len(systems))
+        return list(systems)
+
+    def _restore_from_store(self, system_factory) -> List[str]:
+        """未启用日志时，从持久化的SQLite队列中重建各花种的提醒系统"""
+        store = self.scheduler.event_heap
+        if not isinstance(store, SQLiteEventStore) or store.is_empty():
+            return []
+        with self._lock:
+            by_flower = store.handles_by_flower()
+            for flower_type, handles in by_flower.items():
+                system = system_factory(self, flower_type)
+                system.activate()
+                system.attach_handles(handles)
+                self._get_reminder_list(flower_type).append(system)
+        self.scheduler.start()
+        logger.info("已从SQLite队列恢复 %d 个花种", len(by_flower))
+        return list(by_flower)
 
     def remove_reminder(self, flower_type: str) -> None:
         """完全移除某类花的提醒"""
@@ -65,37 +244,116 @@ class ReminderManager:
                 for sys in reminders:
                     sys.stop()
                 del self._reminders[flower_type]
-                print(f"[ReminderManager] 已移除 {flower_type} 的所有提醒")
+                logger.debug("已移除 %s 的所有提醒", flower_type)
 
-    def register_callback(self, callback: Callable[[dict], None]) -> None:
-        """线程安全的回调注册"""
+    def cancel(self, handle: int) -> bool:
+        """按句柄取消单个事件，O(log n)"""
+        return self.scheduler.cancel(handle)
+
+    def reschedule(self, handle: int, trigger_time: datetime) -> bool:
+        """按句柄修改单个事件的触发时间，O(log n)"""
+        return self.scheduler.reschedule(handle, trigger_time.timestamp())
+
+    def snooze(self, event_data: dict, delay: timedelta) -> int:
+        """安排一次稍后提醒，返回事件句柄（可用cancel取消）"""
+        return self.scheduler.snooze(event_data, delay.total_seconds())
+
+    def upcoming(self, within: timedelta = timedelta(hours=24), flower_type: str = None,
+                 limit: int = None) -> List[dict]:
+        """
+        从现在起within时间内将要触发的提醒，按触发时间排序（不弹出队列，有索引时O(log n + k)）
+        返回 [{"handle", "type", "flower", "trigger_time"}]，可只查一个花种、最多limit个
+        """
+        now = time.time()
+        view = self.scheduler.upcoming_view()
+        return entries_to_dicts(view.between(now, now + within.total_seconds(), flower_type, limit))
+
+    def next_reminders(self, count: int = 5, flower_type: str = None) -> List[dict]:
+        """最近将要触发的count个提醒（可只查一个花种），格式同upcoming"""
+        return entries_to_dicts(self.scheduler.upcoming_view().next(count, time.time(), flower_type))
+
+    def next_reminders_per_flower(self, count: int = 5) -> Dict[str, List[dict]]:
+        """每个花种最近将要触发的count个提醒 {花种: [...]}，格式同upcoming"""
+        per_flower = self.scheduler.upcoming_view().next_per_flower(count, time.time())
+        return {flower: entries_to_dicts(entries) for flower, entries in per_flower.items()}
+
+    def register_callback(self, callback: Callable[[dict], Any], label: str = None) -> None:
+        """
+        线程安全的回调注册（回调可以是协程函数，返回的协程交给分发器运行）
+        - label: 回调耗时指标的标签，不给出时按提醒类型统计
+        """
         with self._callback_lock:
             if callback not in self._callbacks:
                 self._callbacks.append(callback)
+            if label:
+                self._callback_labels[callback] = label
+
+    def set_trace(self, flower_type: str, enabled: bool = True) -> None:
+        """开启/关闭某个花种的逐事件追踪（输出到 "core.trace" 日志器）"""
+        tracing.set_trace(flower_type, enabled)
+
+    def register_batch_callback(self, callback: Callable[[List[dict]], Any], label: str = None) -> None:
+        """
+        注册按批接收提醒的回调（同一批到期的提醒只调用一次，便于界面合并显示）
+        - label: 回调耗时指标的标签，不给出时为"batch"
+        """
+        with self._callback_lock:
+            if callback not in self._batch_callbacks:
+                self._batch_callbacks.append(callback)
+            if label:
+                self._callback_labels[callback] = label
 
     def notify(self, event_data: dict) -> None:
+        """通知单个事件（等同于只有一个事件的批次）"""
+        self.notify_batch([event_data])
+
+    def notify_batch(self, batch: List[dict]) -> None:
         """
         事件通知的完整处理流程:
-        1. 打包事件数据
-        2. 切换到主线程执行回调
+        1. 调度器把同一批到期的事件打包成列表
+        2. 交给分发器，在其执行上下文（如Qt主线程）中执行回调，每批只切换一次
+        3. 批量回调每批调用一次，单事件回调对批中每个事件各调用一次
         """
-        if not QApplication.instance():
-            print("[ERROR] QApplication未初始化")
-            return
-
         # 获取回调的快照（避免长时间持有锁）
         with self._callback_lock:
             callbacks = self._callbacks.copy()
+            batch_callbacks = self._batch_callbacks.copy()
+            labels = self._callback_labels.copy()
+
+        metrics = self.scheduler.metrics
 
-        # 通过Qt信号槽切换到主线程
         def _execute_callbacks():
-            for cb in callbacks:
+            calls = [(cb, batch, labels.get(cb, "batch")) for cb in batch_callbacks]
+            calls.extend((cb, event_data, labels.get(cb) or event_data.get("type", "event"))
+                         for event_data in batch for cb in callbacks)
+            for cb, payload, label in calls:
+                start = time.perf_counter()
                 try:
-                    cb(event_data)
-                except Exception as e:
-                    print(f"[Callback Error] {str(e)}")
+                    result = cb(payload)
+                    if isinstance(result, Awaitable):
+                        self.dispatcher.run_coroutine(result)
+                except Exception:
+                    logger.exception("回调执行出错: %r", cb)
+                metrics.callback_histogram(label).observe(time.perf_counter() - start)
 
-        QTimer.singleShot(0, _execute_callbacks)
+        self.dispatcher.dispatch(_execute_callbacks)
+
+    def get_metrics(self) -> dict:
+        """
+        运行指标快照:
+        - fired_total / fire_lateness_seconds: 已投递数量与触发延迟直方图
+        - queue_size / queue_depth: 队列中的事件总数与各花种事件数
+        - callback_duration_seconds: 回调执行耗时直方图（按注册时的label或提醒类型区分）
+        - scheduler_wakes_total / scheduler_wakes_per_minute: 调度器唤醒次数
+        """
+        return self.scheduler.metrics.snapshot(self.scheduler.queue_depth())
+
+    def expose_metrics(self, path: str = None, port: int = None, interval: float = 15.0) -> MetricsExporter:
+        """开始导出指标: path 为Prometheus文本文件路径（每interval秒重写），port 为本机HTTP端口"""
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+        self.metrics_exporter = MetricsExporter(self.get_metrics, path, port, interval=interval)
+        return self.metrics_exporter
 
     def _atomic_dict_operation(self, key: str, operation: Callable[[List], None]) -> None:
         """字典原子操作模板方法"""
@@ -114,8 +372,27 @@ class ReminderManager:
             return len(self._reminders)
 
     def cleanup(self) -> None:
-        """清理所有资源"""
+        """
+        清理所有资源（退出时调用）:
+        1. 先停止调度，退出过程中不再触发提醒
+        2. 先关闭日志、把SQLite队列换成空的内存队列并关闭数据库连接，
+           之后停止提醒只注销内存中的事件，不会被记录为取消，也不会删除数据库中的记录，重启后可以恢复
+        """
+        if self.metrics_exporter:
+            self.metrics_exporter.close()
+            self.metrics_exporter = None
+        self.scheduler.stop()
+        if self.journal:
+            self.scheduler.journal = None
+            self.journal.close()
+            self.journal = None
+        with self.scheduler.lock:
+            store = self.scheduler.event_heap
+            if isinstance(store, SQLiteEventStore):
+                self.scheduler.event_heap = IndexedMinHeap()
+                store.close()
         with self._lock:
             for flower_type in list(self._reminders.keys()):
                 self.remove_reminder(flower_type)
-            self._reminders.clear()
\ No newline at end of file
+            self._reminders.clear()
+        self.dispatcher.close()
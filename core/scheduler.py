@@ -0,0 +1,399 @@
+"""
+@文件: scheduler.py
+@描述: 由ReminderManager持有的全局提醒调度服务
+@核心设计:
+    1. 所有花种共享同一个事件队列（默认带索引的最小堆，可选结构数组堆、分层时间轮或SQLite存储）
+    2. 只有一个后台线程负责检查并触发到期事件
+    3. 各花种的FlowerCareReminderSystem只负责登记/注销自己的事件
+       重复提醒在触发时才由所属系统生成下一次事件（惰性展开）
+    4. 基于条件变量的事件驱动唤醒：精确休眠到堆顶事件到期，
+       有更早的事件加入或调用stop()时立即唤醒
+    5. 每个事件有稳定句柄：取消、改期、稍后提醒都是O(log n)的原地堆操作
+    6. 可选的追加写日志（ReminderJournal）：所有队列变更在持锁时按顺序记录
+    7. 单调时间线（MonotonicClock）：检测休眠/改时间造成的墙上时钟跳变；
+       到期事件用pop_until一次取出，错过太久的事件按补发策略整体处理，循环中不做datetime转换
+    8. 日志使用logging延迟格式化；逐事件日志只对被追踪的花种（或DEBUG级别）输出
+    9. 合并投递：队首到期后再等待batch_window秒（免打扰时段内则等到时段结束），
+       窗口内到期的事件一次取出，作为一批交给管理器，不需要额外的定时线程
+    10. 运行指标（SchedulerMetrics）：触发延迟、唤醒次数在热路径中以常数开销记录，
+        队列深度只在读取快照时统计
+    11. 即将触发的提醒查询（upcoming_view）：可选的有序索引（UpcomingIndex，upcoming_index=True）
+        在修改队列时同一把锁内增量更新，查询时才发布写时复制快照；SQLite后端直接查询数据库的时间索引；
+        未启用索引的内存队列在查询时临时扫描队列
+"""
+import time
+import logging
+import threading
+from collections import Counter
+from core.data_structures import IndexedMinHeap, ArrayMinHeap, HierarchicalTimingWheel
+from core.sqlite_store import SQLiteEventStore
+from core.clock import MonotonicClock, CLOCK_CHECK_INTERVAL
+from core.tracing import trace_logger, traced_flowers
+from core.metrics import SchedulerMetrics
+from core.upcoming import UpcomingIndex, index_entry
+from core.events import ReminderEvent, SNOOZE_REMINDER
+
+logger = logging.getLogger(__name__)
+
+# 可选的事件队列后端，接口一致（push/peek/pop_entry/remove/update，push返回句柄）
+QUEUE_BACKENDS = {
+    "heap": IndexedMinHeap,
+    "array": ArrayMinHeap,
+    "wheel": HierarchicalTimingWheel,
+    "sqlite": SQLiteEventStore,
+}
+
+# 错过补发策略（只作用于延迟超过catchup_grace的事件）:
+#   all    - 全部补发（重复提醒的每一次错过都会触发）
+#   latest - 每个花种只补发最近的一次，重复提醒直接跳到下一次未来的触发
+#   skip   - 不补发，重复提醒直接跳到下一次未来的触发
+CATCHUP_POLICIES = ("all", "latest", "skip")
+
+
+class ReminderScheduler:
+    def __init__(self, manager, queue_backend="heap", queue_options=None,
+                 catchup_policy="latest", catchup_grace=60.0, batch_window=0.0, quiet_hours=None,
+                 upcoming_index=False):
+        """
+        初始化调度器:
+        - event_heap: 全局事件队列，元素为 ReminderEvent 紧凑记录
+          queue_backend 选择实现: "heap"（最小堆，O(log n)）、"array"（结构数组最小堆，百万级队列更省内存）、
+          "wheel"（分层时间轮，O(1)）
+          或 "sqlite"（持久化存储，内存中只保留最近的时间窗口），queue_options 为构造参数
+        - _wakeup: 与lock绑定的条件变量，用于唤醒后台线程
+        - journal: 可选的ReminderJournal，由ReminderManager设置
+        - clock: 单调时间线，检测墙上时钟跳变
+        - catchup_policy/catchup_grace: 延迟超过catchup_grace秒的事件按CATCHUP_POLICIES处理
+        - batch_window: 合并投递窗口（秒），队首到期后再等这么久，期间到期的事件一起投递
+        - quiet_hours: 可选的QuietHours，时段内到期的事件留到时段结束后一起投递
+        - metrics: 运行指标
+        - _depth: 各花种在队列中的事件数，入队/出队时在lock内增减，读取指标时不扫描队列
+        - upcoming: upcoming_index为True时维护的待触发事件有序索引（只用于内存队列后端），否则为None
+        """
+        self.manager = manager
+        if queue_backend not in QUEUE_BACKENDS:
+            raise ValueError(f"未知的事件队列后端: {queue_backend}")
+        if catchup_policy not in CATCHUP_POLICIES:
+            raise ValueError(f"未知的错过补发策略: {catchup_policy}")
+        self.event_heap = QUEUE_BACKENDS[queue_backend](**(queue_options or {}))
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+        self._wakeup = threading.Condition(self.lock)
+        self.journal = None
+        self.clock = MonotonicClock()
+        self.catchup_policy = catchup_policy
+        self.catchup_grace = catchup_grace
+        self.batch_window = batch_window
+        self.quiet_hours = quiet_hours
+        self.metrics = SchedulerMetrics()
+        self._depth = Counter()
+        if isinstance(self.event_heap, SQLiteEventStore):
+            # 数据库中可能已有上次运行留下的事件
+            self._depth.update(self.event_heap.counts_by_flower())
+        # SQLite队列直接查询数据库的时间索引，不在内存中镜像
+        self.upcoming = None
+        if upcoming_index and not isinstance(self.event_heap, SQLiteEventStore):
+            self.upcoming = UpcomingIndex()
+
+    def schedule(self, event):
+        """登记一个事件记录（ReminderEvent），返回事件句柄；必要时启动后台线程"""
+        with self._wakeup:
+            handle = self.event_heap.push(event)
+            self._depth[event.flower] += 1
+            if self.upcoming is not None:
+                self.upcoming.update(added=(index_entry(handle, event),))
+            if self.journal:
+                if event.kind == SNOOZE_REMINDER:
+                    self.journal.record_snooze(handle, event.to_record())
+                else:
+                    self.journal.record_add(handle, event.to_record())
+            # 新事件成为堆顶时，后台线程的等待时间已经过长，需要立即唤醒
+            if self.event_heap.peek_handle() == handle:
+                self._notify_head_changed()
+        self.start()
+        return handle
+
+    def schedule_many(self, events):
+        """批量登记事件：一次加锁，队列内部批量合并，返回与输入顺序一致的句柄列表"""
+        events = list(events)
+        if not events:
+            return []
+        with self._wakeup:
+            head = self.event_heap.peek_handle()
+            handles = self.event_heap.push_many(events)
+            self._depth.update(event.flower for event in events)
+            if self.upcoming is not None:
+                self.upcoming.update(added=map(index_entry, handles, events))
+            if self.journal:
+                for handle, event in zip(handles, events):
+                    self.journal.record_add(handle, event.to_record())
+            if self.event_heap.peek_handle() != head:
+                self._notify_head_changed()
+        self.start()
+        return handles
+
+    def cancel(self, handle):
+        """按句柄取消事件，事件已触发或不存在时返回False"""
+        with self._wakeup:
+            event = self.event_heap.remove(handle)
+            if event is None:
+                return False
+            self._decrease_depth((event,))
+            if self.upcoming is not None:
+                self.upcoming.update(removed=(index_entry(handle, event),))
+            if self.journal:
+                self.journal.record_cancel(handle)
+            return True
+
+    def restore(self, events):
+        """
+        启动时从日志恢复事件:
+        以日志内容替换整个队列，并以新句柄重写快照（不逐条记录日志），返回句柄列表
+        """
+        events = list(events)
+        with self._wakeup:
+            handles = self.event_heap.heapify(events)
+            self._depth = Counter(event.flower for event in events)
+            if self.upcoming is not None:
+                self.upcoming.reset(map(index_entry, handles, events))
+            if self.journal:
+                self.journal.compact({handle: event.to_record() for handle, event in zip(handles, events)})
+            self._notify_head_changed()
+        if events:
+            self.start()
+        return handles
+
+    def reschedule(self, handle, timestamp):
+        """按句柄修改事件的触发时间（原地调整，句柄不变）"""
+        with self._wakeup:
+            event = self.event_heap.get(handle)
+            if event is None:
+                return False
+            updated = event.replace(timestamp)
+            self.event_heap.update(handle, updated)
+            if self.upcoming is not None:
+                self.upcoming.update(added=(index_entry(handle, updated),), removed=(index_entry(handle, event),))
+            if self.journal:
+                self.journal.record_reschedule(handle, timestamp)
+            # 改到更早时间后可能成为新的堆顶
+            if self.event_heap.peek_handle() == handle:
+                self._notify_head_changed()
+            return True
+
+    def snooze(self, event_data, delay_seconds):
+        """为已触发的事件（回调收到的字典）安排一次性的稍后提醒，返回新事件句柄"""
+        event = ReminderEvent(time.time() + delay_seconds, SNOOZE_REMINDER,
+                              event_data.get("flower", "鲜花"),
+                              event_data.get("interval_days", 0.0),
+                              message=event_data.get("message"))
+        return self.schedule(event)
+
+    def _notify_head_changed(self):
+        """队首事件变化后唤醒后台线程重新计算等待时间（调用方需持有lock）"""
+        self._wakeup.notify()
+
+    def start(self):
+        # 检查和设置running都在锁内，并发调用start()时只会创建一个后台线程
+        with self._wakeup:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._process_events, name="ReminderScheduler")
+            self.thread.daemon = True
+            self.thread.start()
+        logger.info("后台线程启动中...")
+
+    def stop(self):
+        with self._wakeup:
+            self.running = False
+            self._wakeup.notify()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+        logger.info("后台线程已停止")
+
+    def _process_events(self):
+        logger.debug("后台线程开始处理事件")
+        while True:
+            try:
+                with self._wakeup:
+                    if not self.running:
+                        break
+                    self.metrics.wakes.add()
+
+                    # 取出所有到期事件；没有到期事件时精确等待到堆顶到期
+                    now = self._check_clock()
+                    events_to_trigger = self._pop_due_events(now)
+                    if not events_to_trigger:
+                        self._wakeup.wait(self._calculate_wait_time(self.clock.now()))
+                        continue
+
+                # 释放锁后处理通知，因为通知可能会执行较长时间的操作
+                self._dispatch(events_to_trigger)
+            except Exception:
+                logger.exception("处理事件时出现异常")
+        logger.debug("后台线程结束")
+
+    def _check_clock(self):
+        """校准单调时间线并返回当前时间，检测到跳变时记录日志（调用方需持有lock）"""
+        jump = self.clock.check()
+        if jump:
+            logger.warning("检测到系统时钟跳变 %+.0f 秒，错过的提醒按 %s 策略处理", jump, self.catchup_policy)
+        return self.clock.now()
+
+    def _release_time(self, when):
+        """触发时间为when的事件实际投递的时间（合并窗口/免打扰时段结束）"""
+        release = when + self.batch_window
+        if self.quiet_hours is not None:
+            span = self.quiet_hours.span_at(when)
+            if span is not None and span[1] > release:
+                release = span[1]
+        return release
+
+    def _pop_due_events(self, now):
+        """
+        弹出所有到期事件并返回需要通知的事件（调用方需持有lock）:
+        1. 队首到达投递时间后，pop_until 一次取出全部到期事件
+        2. 延迟超过catchup_grace的事件按补发策略筛选
+        3. 重复提醒在触发时才生成下一次事件，以原句柄批量放回队列，
+           队列中每条规则只保留一个事件，句柄在整个重复周期内保持不变
+        4. 下一次事件本身也已到期时（如"all"策略下错过的多次重复触发）在本次一起展开，
+           全部错过的触发作为同一批投递，不再每次唤醒只补发一个
+        """
+        head = self.event_heap.peek()
+        if head is None or self._release_time(head.when) > now:
+            return []
+        limit = now
+        if self.quiet_hours is not None:
+            span = self.quiet_hours.span_at(now)
+            if span is not None:
+                # 正处于免打扰时段：只取出时段开始前到期的事件，时段内的留到时段结束
+                limit = min(now, span[0] - 1e-6)
+        entries = self.event_heap.pop_until(limit)
+
+        traced = traced_flowers()
+        late_limit = now - self.catchup_grace
+        if self.quiet_hours is not None:
+            # 刚结束的免打扰时段内暂存的事件不算错过
+            span = self.quiet_hours.span_at(late_limit)
+            if span is not None:
+                late_limit = span[0]
+        catch_up = self.catchup_policy != "all"
+        missed = []
+        events_to_trigger = []
+        successors = []
+        expanded = False
+        pending = entries
+        while pending:
+            due = []
+            for handle, event in pending:
+                skipped = catch_up and event.when < late_limit
+                if skipped:
+                    after = now  # 跳过所有错过的重复触发
+                else:
+                    events_to_trigger.append(event)
+                    after = None
+                successor = event.owner.next_occurrence(event, after) if event.owner is not None else None
+                if skipped:
+                    last = successor.occurrence - 1 if successor is not None else event.occurrence
+                    if last > event.occurrence:
+                        # 跳过了多次触发时，"latest"策略补发的是最近错过的一次而不是最早的一次
+                        latest_missed = event.replace(event.rule.occurrence(last).timestamp())
+                        latest_missed.occurrence = last
+                        missed.append(latest_missed)
+                    else:
+                        missed.append(event)
+                if successor:
+                    if event.when < successor.when <= limit:
+                        due.append((handle, successor))
+                    else:
+                        successors.append((handle, successor))
+                if traced and event.flower in traced:
+                    trace_logger.info("%s 出队 handle=%s when=%.3f 下一次=%s", event.flower, handle, event.when,
+                                      successor.when if successor else None)
+                if self.journal:
+                    self.journal.record_fire(handle, successor.to_record() if successor else None)
+            expanded = expanded or bool(due)
+            pending = due
+        if expanded:
+            # 展开出的触发与其它到期事件交错，按触发时间重新排序
+            events_to_trigger.sort()
+
+        if missed:
+            replayed = []
+            if self.catchup_policy == "latest":
+                latest = {}
+                for event in missed:  # entries已按时间排序，同一花种后出现的更晚
+                    latest[event.flower] = event
+                replayed = sorted(latest.values())
+                events_to_trigger[:0] = replayed
+            logger.info("错过 %d 个提醒，按 %s 策略补发 %d 个", len(missed), self.catchup_policy, len(replayed))
+        self._decrease_depth(event for _, event in entries)
+        if successors:
+            self.event_heap.push_entries(successors)
+            self._depth.update(event.flower for _, event in successors)
+        if self.upcoming is not None:
+            self.upcoming.update(added=[index_entry(handle, event) for handle, event in successors],
+                                 removed=[index_entry(handle, event) for handle, event in entries])
+        return events_to_trigger
+
+    def _dispatch(self, events_to_trigger):
+        """把同一批到期的事件一次性交给管理器（提醒文本在这里才生成）"""
+        traced = traced_flowers()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        observe = self.metrics.lateness.observe
+        now = self.clock.now()
+        batch = []
+        for event in events_to_trigger:
+            observe(now - event.when)
+            try:
+                event_data = event.to_dict()
+            except Exception:
+                logger.exception("生成提醒内容时出错: %r", event)
+                continue
+            batch.append(event_data)
+            if traced and event.flower in traced:
+                trace_logger.info("%s 通知管理器: %s", event.flower, event_data["message"])
+            elif debug:
+                logger.debug("通知管理器: %s", event_data["message"])
+        self.metrics.fired_total += len(batch)
+        if batch:
+            try:
+                self.manager.notify_batch(batch)
+            except Exception:
+                logger.exception("通知管理器时出错")
+
+    def upcoming_view(self):
+        """
+        即将触发事件的只读视图（between/next/next_per_flower，条目为 (触发时间, 句柄, 花种, 类型)）:
+        - 启用有序索引时为索引的当前快照，不获取调度锁
+        - SQLite后端为存储本身，直接查询数据库的时间索引
+        - 其它情况临时扫描队列建立快照，O(n log n)，只适合偶尔查询的小队列
+        """
+        if self.upcoming is not None:
+            return self.upcoming.snapshot()
+        if isinstance(self.event_heap, SQLiteEventStore):
+            return self.event_heap
+        return UpcomingIndex(index_entry(handle, event) for handle, event in self.event_heap.entries()).snapshot()
+
+    def queue_depth(self):
+        """各花种在队列中的事件数量 {花种: 数量}（复制增量维护的计数，与队列长度无关）"""
+        with self.lock:
+            return dict(self._depth)
+
+    def _decrease_depth(self, events):
+        """事件离开队列后减少对应花种的计数，计数为0的花种直接删除（调用方需持有lock）"""
+        depth = self._depth
+        for event in events:
+            count = depth[event.flower] - 1
+            if count > 0:
+                depth[event.flower] = count
+            else:
+                depth.pop(event.flower, None)
+
+    def _calculate_wait_time(self, now):
+        """计算到堆顶事件到期的等待时间，最长CLOCK_CHECK_INTERVAL秒（休眠唤醒后及时发现时钟跳变）"""
+        next_event = self.event_heap.peek()
+        if not next_event:
+            return CLOCK_CHECK_INTERVAL
+        return min(max(0.0, self._release_time(next_event.when) - now), CLOCK_CHECK_INTERVAL)
@@ -0,0 +1,353 @@
+"""
+@文件: sharding.py
+@描述: 多进程分片的提醒管理器，把花种按一致性哈希分配到N个工作进程
+@核心设计:
+    1. HashRing: 一致性哈希环（每个分片多个虚拟节点），分片数变化时只有少量花种迁移；
+       使用md5而不是内置hash()，保证父子进程、多次运行间映射一致
+    2. 每个分片进程运行一个无界面的ReminderManager（自己的事件队列、调度线程、可选日志），
+       展开重复规则、生成提醒文本都在分片进程中完成，不受父进程GIL限制
+    3. 触发的事件由分片进程攒批后通过一个共享的multiprocessing队列发回父进程，
+       父进程的收集线程再交给分发器执行回调（与ReminderManager相同的回调接口）
+    4. 全局句柄 = 分片内句柄 * 分片数 + 分片编号，仍是整数，可直接用于cancel/reschedule
+@注意: 启用日志时每个分片使用 journal_dir/shard-<编号> 子目录，恢复时分片数必须与上次一致
+"""
+import os
+import bisect
+import hashlib
+import queue
+import logging
+import threading
+import multiprocessing
+from collections.abc import Awaitable
+from datetime import datetime, timedelta
+from typing import List, Dict, Callable, Any, Iterable
+
+from core.dispatchers import Dispatcher, ThreadDispatcher, InlineDispatcher
+
+# 分片进程每次最多攒多少个触发事件再发回父进程
+FIRED_BATCH_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """一致性哈希环：键 -> 分片编号"""
+
+    def __init__(self, shard_count: int, replicas: int = 64):
+        if shard_count < 1:
+            raise ValueError("分片数必须大于0")
+        self.shard_count = shard_count
+        points = sorted((self._hash(f"shard-{shard}#{replica}"), shard)
+                        for shard in range(shard_count) for replica in range(replicas))
+        self._points = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+        self._cache = {}  # 花种数量有限，缓存查找结果
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def shard_for(self, key: str) -> int:
+        shard = self._cache.get(key)
+        if shard is None:
+            index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+            shard = self._cache[key] = self._shards[index]
+        return shard
+
+
+def _shard_main(shard_id, commands, replies, fired, manager_options):
+    """分片进程入口：执行父进程发来的命令，把触发的事件攒批发回"""
+    # 在子进程中导入，避免循环依赖
+    from core.reminder_manager import ReminderManager
+    from core.reminder_system import FlowerCareReminderSystem
+
+    manager = ReminderManager(dispatcher=InlineDispatcher(), **manager_options)
+    outbox = queue.SimpleQueue()
+    manager.register_callback(outbox.put)
+
+    def _forward():
+        while True:
+            event_data = outbox.get()
+            if event_data is None:
+                break
+            batch = [event_data]
+            while len(batch) < FIRED_BATCH_SIZE:
+                try:
+                    event_data = outbox.get_nowait()
+                except queue.Empty:
+                    break
+                if event_data is None:
+                    outbox.put(None)
+                    break
+                batch.append(event_data)
+            fired.put((shard_id, batch))
+
+    sender = threading.Thread(target=_forward, name=f"ShardSender-{shard_id}", daemon=True)
+    sender.start()
+
+    def add(flower_type, start_time, interval_days, repeat_count=None):
+        system = FlowerCareReminderSystem(manager, flower_type)
+        system.add_flower_reminder(start_time, interval_days, repeat_count)
+        manager.add_reminder(flower_type, system)
+        return list(system.handles)
+
+    operations = {
+        "add": add,
+        "bulk": manager.add_reminders_bulk,
+        "restore": manager.restore,
+        "remove": manager.remove_reminder,
+        "cancel": manager.cancel,
+        "reschedule": manager.reschedule,
+        "snooze": manager.snooze,
+        "trace": manager.set_trace,
+        "contains": manager.__contains__,
+        "flowers": lambda: len(manager),
+        "pending": lambda: len(manager.scheduler.event_heap),
+        "upcoming": manager.upcoming,
+        "next": manager.next_reminders,
+        "next_per_flower": manager.next_reminders_per_flower,
+    }
+    while True:
+        op, args = commands.get()
+        if op == "stop":
+            break
+        try:
+            replies.put((True, operations[op](*args)))
+        except Exception as e:
+            replies.put((False, f"{type(e).__name__}: {e}"))
+
+    manager.cleanup()
+    outbox.put(None)
+    sender.join(timeout=1.0)
+    replies.put((True, None))
+
+
+class ShardedReminderManager:
+    def __init__(self, shards: int = None, dispatcher: Dispatcher = None,
+                 mp_context: str = "spawn", **manager_options):
+        """
+        初始化分片:
+        - shards: 分片（工作进程）数量，默认等于CPU核数
+        - dispatcher: 父进程中执行回调的分发器，默认在独立回调线程中执行
+        - mp_context: multiprocessing启动方式，默认"spawn"（父进程已有线程时fork不安全）
+        - manager_options: 传给每个分片ReminderManager的参数（queue_backend、journal_dir等）
+        """
+        self.shard_count = shards or os.cpu_count() or 1
+        self.ring = HashRing(self.shard_count)
+        self.dispatcher = dispatcher if dispatcher is not None else ThreadDispatcher()
+        self._callbacks = []  # type: List[Callable[[dict], None]]
+        self._batch_callbacks = []  # type: List[Callable[[List[dict]], None]]
+        self._callback_lock = threading.Lock()
+
+        context = multiprocessing.get_context(mp_context)
+        self._fired = context.Queue()
+        self._commands = []
+        self._replies = []
+        self._shard_locks = []
+        self._processes = []
+        journal_dir = manager_options.pop("journal_dir", None)
+        for shard in range(self.shard_count):
+            options = dict(manager_options)
+            if journal_dir:
+                options["journal_dir"] = os.path.join(journal_dir, f"shard-{shard}")
+            commands, replies = context.Queue(), context.Queue()
+            process = context.Process(target=_shard_main, name=f"ReminderShard-{shard}",
+                                      args=(shard, commands, replies, self._fired, options), daemon=True)
+            process.start()
+            self._commands.append(commands)
+            self._replies.append(replies)
+            self._shard_locks.append(threading.Lock())
+            self._processes.append(process)
+
+        self._collector = threading.Thread(target=self._collect, name="ShardCollector", daemon=True)
+        self._collector.start()
+        logger.info("已启动 %d 个分片进程", self.shard_count)
+
+    # ---------- 与分片进程通信 ----------
+
+    def _send(self, shard: int, op: str, *args) -> None:
+        self._commands[shard].put((op, args))
+
+    def _receive(self, shard: int) -> Any:
+        ok, result = self._replies[shard].get()
+        if not ok:
+            raise RuntimeError(f"分片 {shard} 执行失败: {result}")
+        return result
+
+    def _call(self, shard: int, op: str, *args) -> Any:
+        """向一个分片发送命令并等待结果（同一分片的命令串行执行）"""
+        with self._shard_locks[shard]:
+            self._send(shard, op, *args)
+            return self._receive(shard)
+
+    def _call_all(self, requests: Dict[int, tuple]) -> Dict[int, Any]:
+        """
+        并行向多个分片发送命令 {分片: (op, *args)}，全部发送后再依次收集结果。
+        某个分片失败时仍先收完所有分片的回复（否则未读的回复会被之后的调用当作自己的结果），再抛出异常
+        """
+        shards = sorted(requests)
+        for shard in shards:
+            self._shard_locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._send(shard, *requests[shard])
+            results = {}
+            errors = []
+            for shard in shards:
+                ok, result = self._replies[shard].get()
+                if ok:
+                    results[shard] = result
+                else:
+                    errors.append(f"分片 {shard}: {result}")
+            if errors:
+                raise RuntimeError("分片执行失败: " + "; ".join(errors))
+            return results
+        finally:
+            for shard in shards:
+                self._shard_locks[shard].release()
+
+    def _to_global(self, shard: int, handle: int) -> int:
+        return handle * self.shard_count + shard
+
+    def _to_local(self, handle: int) -> tuple:
+        return handle % self.shard_count, handle // self.shard_count
+
+    # ---------- 与ReminderManager一致的接口 ----------
+
+    def add_reminder(self, flower_type: str, start_time: datetime, interval_days: float,
+                     repeat_count: int = None) -> List[int]:
+        """在花种所属分片中创建提醒系统（替换已有提醒），返回事件句柄列表"""
+        shard = self.ring.shard_for(flower_type)
+        handles = self._call(shard, "add", flower_type, start_time, interval_days, repeat_count)
+        return [self._to_global(shard, handle) for handle in handles]
+
+    def add_reminders_bulk(self, schedules: Iterable[tuple]) -> List[List[int]]:
+        """
+        批量添加提醒: 按分片分组后并行下发，每个分片一次批量合并
+        返回与输入顺序一致的句柄列表（同一花种被后面的项覆盖时为空列表）
+        """
+        groups = {}  # 分片 -> [(输入位置, 计划项)]
+        for index, schedule in enumerate(schedules):
+            groups.setdefault(self.ring.shard_for(schedule[0]), []).append((index, schedule))
+
+        results = self._call_all({shard: ("bulk", [schedule for _, schedule in items])
+                                  for shard, items in groups.items()})
+        handles = [None] * sum(len(items) for items in groups.values())
+        for shard, items in groups.items():
+            for (index, _), local in zip(items, results[shard]):
+                handles[index] = [self._to_global(shard, handle) for handle in local]
+        logger.info("已批量添加 %d 项到 %d 个分片", len(handles), len(groups))
+        return handles
+
+    def restore(self) -> List[str]:
+        """各分片从自己的日志恢复，返回恢复出的花种列表"""
+        results = self._call_all({shard: ("restore",) for shard in range(self.shard_count)})
+        return [flower for shard in sorted(results) for flower in results[shard]]
+
+    def remove_reminder(self, flower_type: str) -> None:
+        self._call(self.ring.shard_for(flower_type), "remove", flower_type)
+
+    def cancel(self, handle: int) -> bool:
+        shard, local = self._to_local(handle)
+        return self._call(shard, "cancel", local)
+
+    def reschedule(self, handle: int, trigger_time: datetime) -> bool:
+        shard, local = self._to_local(handle)
+        return self._call(shard, "reschedule", local, trigger_time)
+
+    def snooze(self, event_data: dict, delay: timedelta) -> int:
+        """稍后提醒与原花种放在同一分片"""
+        shard = self.ring.shard_for(event_data.get("flower", "鲜花"))
+        return self._to_global(shard, self._call(shard, "snooze", event_data, delay))
+
+    def set_trace(self, flower_type: str, enabled: bool = True) -> None:
+        """在花种所属分片中开启/关闭逐事件追踪"""
+        self._call(self.ring.shard_for(flower_type), "trace", flower_type, enabled)
+
+    def pending_events(self) -> int:
+        """所有分片队列中的事件总数"""
+        return sum(self._call_all({shard: ("pending",) for shard in range(self.shard_count)}).values())
+
+    def _merge_upcoming(self, results: Dict[int, List[dict]], limit: int = None) -> List[dict]:
+        """合并各分片按时间排好序的查询结果，句柄换算为全局句柄"""
+        for shard, items in results.items():
+            for item in items:
+                item["handle"] = self._to_global(shard, item["handle"])
+        merged = sorted((item for items in results.values() for item in items),
+                        key=lambda item: item["trigger_time"])
+        return merged[:limit] if limit is not None else merged
+
+    def upcoming(self, within: timedelta = timedelta(hours=24), flower_type: str = None,
+                 limit: int = None) -> List[dict]:
+        """从现在起within时间内将要触发的提醒（各分片各取前limit个后合并）"""
+        shards = [self.ring.shard_for(flower_type)] if flower_type else range(self.shard_count)
+        results = self._call_all({shard: ("upcoming", within, flower_type, limit) for shard in shards})
+        return self._merge_upcoming(results, limit)
+
+    def next_reminders(self, count: int = 5, flower_type: str = None) -> List[dict]:
+        """最近将要触发的count个提醒（可只查一个花种）"""
+        shards = [self.ring.shard_for(flower_type)] if flower_type else range(self.shard_count)
+        results = self._call_all({shard: ("next", count, flower_type) for shard in shards})
+        return self._merge_upcoming(results, count)
+
+    def next_reminders_per_flower(self, count: int = 5) -> Dict[str, List[dict]]:
+        """每个花种最近将要触发的count个提醒（每个花种只属于一个分片，直接合并字典）"""
+        results = self._call_all({shard: ("next_per_flower", count) for shard in range(self.shard_count)})
+        merged = {}
+        for shard, per_flower in results.items():
+            for flower, items in per_flower.items():
+                merged[flower] = self._merge_upcoming({shard: items})
+        return merged
+
+    def register_callback(self, callback: Callable[[dict], None]) -> None:
+        """线程安全的回调注册"""
+        with self._callback_lock:
+            if callback not in self._callbacks:
+                self._callbacks.append(callback)
+
+    def register_batch_callback(self, callback: Callable[[List[dict]], None]) -> None:
+        """注册按批接收提醒的回调（每个分片发回的一批调用一次）"""
+        with self._callback_lock:
+            if callback not in self._batch_callbacks:
+                self._batch_callbacks.append(callback)
+
+    def _collect(self) -> None:
+        """收集线程：接收各分片发回的触发事件批次，交给分发器执行回调"""
+        while True:
+            message = self._fired.get()
+            if message is None:
+                break
+            _, batch = message
+            with self._callback_lock:
+                callbacks = self._callbacks.copy()
+                batch_callbacks = self._batch_callbacks.copy()
+
+            def _execute_callbacks(batch=batch):
+                calls = [(cb, batch) for cb in batch_callbacks]
+                calls.extend((cb, event_data) for event_data in batch for cb in callbacks)
+                for cb, payload in calls:
+                    try:
+                        result = cb(payload)
+                        if isinstance(result, Awaitable):
+                            self.dispatcher.run_coroutine(result)
+                    except Exception:
+                        logger.exception("回调执行出错: %r", cb)
+
+            self.dispatcher.dispatch(_execute_callbacks)
+
+    def __contains__(self, flower_type: str) -> bool:
+        return self._call(self.ring.shard_for(flower_type), "contains", flower_type)
+
+    def __len__(self) -> int:
+        """获取管理的花种类数"""
+        return sum(self._call_all({shard: ("flowers",) for shard in range(self.shard_count)}).values())
+
+    def cleanup(self) -> None:
+        """停止所有分片进程（各分片先关闭日志再停止调度），再停止收集线程"""
+        self._call_all({shard: ("stop",) for shard in range(self.shard_count)})
+        for process in self._processes:
+            process.join(timeout=5.0)
+        self._fired.put(None)
+        self._collector.join(timeout=1.0)
+        self.dispatcher.close()
+        logger.info("所有分片进程已停止")
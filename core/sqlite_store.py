@@ -0,0 +1,355 @@
+"""
+@文件: sqlite_store.py
+@描述: 基于标准库sqlite3的持久化事件队列，与IndexedMinHeap接口一致
+@核心设计:
+    1. 所有事件保存在SQLite表中（WAL模式），按触发时间建立索引
+    2. 内存中只保留"时间窗口"内（默认未来1小时）的事件，组成一个小顶堆
+    3. 窗口内事件取完后，再按索引从数据库分页读入下一个窗口
+    4. 句柄即数据库主键，重启后保持不变
+    5. 即将触发的提醒查询（between/next/next_per_flower，与upcoming.UpcomingSnapshot接口一致）
+       直接按触发时间索引（或花种+触发时间索引）查询数据库，只读取索引列，不在内存中镜像整张表
+@不变式: 所有触发时间 < _horizon 的存活事件都在内存窗口中
+"""
+import json
+import heapq
+import threading
+import sqlite3
+from core.events import ReminderEvent, SNOOZE_REMINDER
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    when_ts REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    flower TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_when ON events (when_ts, seq);
+CREATE INDEX IF NOT EXISTS idx_events_flower ON events (flower, when_ts, seq);
+"""
+
+_INF = float("inf")
+
+
+class SQLiteEventStore:
+    def __init__(self, path=":memory:", window_seconds=3600.0, owner_resolver=None):
+        """
+        初始化存储:
+        - path: 数据库文件路径，默认内存数据库
+        - window_seconds: 每次从数据库读入内存的时间窗口长度（秒）
+        - owner_resolver: 从数据库读回事件时，根据事件记录找到所属提醒系统的函数
+        """
+        self.window_seconds = window_seconds
+        self._owner_resolver = owner_resolver
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._window = {}  # 句柄 -> 窗口内的事件对象
+        self._window_heap = []  # (触发时间, 序号, 句柄)，惰性删除
+        self._horizon = float("-inf")  # 窗口上界，数据库中 >= 该时间的事件尚未读入
+        self._size, max_id = self._conn.execute("SELECT COUNT(*), MAX(id) FROM events").fetchone()
+        self._next_id = (max_id or 0) + 1
+
+    # ---------- 写入 ----------
+
+    def push(self, item):
+        """添加事件，返回句柄（数据库主键）"""
+        with self._lock:
+            handle = self._allocate()
+            self._conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", self._row(handle, item))
+            self._size += 1
+            self._admit(handle, item)
+            return handle
+
+    def push_many(self, items):
+        """批量添加事件（单个事务），返回句柄列表"""
+        with self._lock:
+            items = list(items)
+            handles = [self._allocate() for _ in items]
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                                       [self._row(handle, item) for handle, item in zip(handles, items)])
+            self._size += len(items)
+            for handle, item in zip(handles, items):
+                self._admit(handle, item)
+            return handles
+
+    def push_entries(self, entries):
+        """批量放回 (句柄, 事件)（单个事务），沿用原句柄"""
+        with self._lock:
+            entries = list(entries)
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)",
+                                       [self._row(handle, item) for handle, item in entries])
+            self._size += len(entries)
+            for handle, item in entries:
+                self._admit(handle, item)
+
+    def pushpop(self, item):
+        """
+        放入item后弹出最早的事件（原子操作，单个事务），返回 (句柄, 事件):
+        - item为新事件分配句柄；item不大于最早事件时存储不变，直接返回 (新句柄, item)
+        """
+        with self._lock:
+            handle = self._allocate()
+            head = self._head()
+            if head is None or not self._window[head] < item:
+                return handle, item
+            heapq.heappop(self._window_heap)
+            popped = self._window.pop(head)
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM events WHERE id = ?", (head,))
+                self._conn.execute("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", self._row(handle, item))
+            self._admit(handle, item)
+            return head, popped
+
+    def replace(self, item):
+        """
+        用item替换最早的事件（原子操作），返回被替换的 (句柄, 事件):
+        - item沿用被替换事件的句柄（数据库主键）
+        - 存储为空时只放入item并返回None
+        """
+        with self._lock:
+            head = self._head()
+            if head is None:
+                self.push(item)
+                return None
+            heapq.heappop(self._window_heap)
+            replaced = self._window.pop(head)
+            self._conn.execute(
+                "UPDATE events SET when_ts = ?, seq = ?, flower = ?, kind = ?, record = ? WHERE id = ?",
+                self._row(head, item)[1:] + (head,))
+            self._admit(head, item)
+            return head, replaced
+
+    def remove(self, handle):
+        """按句柄删除事件并返回它，不存在时返回None"""
+        with self._lock:
+            item = self._get(handle)
+            if item is None:
+                return None
+            self._conn.execute("DELETE FROM events WHERE id = ?", (handle,))
+            self._window.pop(handle, None)
+            self._size -= 1
+            return item
+
+    def update(self, handle, item):
+        """按句柄替换事件，句柄不变"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE events SET when_ts = ?, seq = ?, flower = ?, kind = ?, record = ? WHERE id = ?",
+                self._row(handle, item)[1:] + (handle,))
+            if cursor.rowcount == 0:
+                return False
+            self._window.pop(handle, None)
+            self._admit(handle, item)
+            return True
+
+    def heapify(self, items):
+        """清空后批量写入，返回句柄列表"""
+        with self._lock:
+            self._conn.execute("DELETE FROM events")
+            self._window = {}
+            self._window_heap = []
+            self._horizon = float("-inf")
+            self._size = 0
+            return self.push_many(items)
+
+    def remove_if(self, predicate):
+        """删除所有满足条件的事件（需要全表扫描），返回删除数量"""
+        with self._lock:
+            doomed = [handle for handle, record in self._conn.execute("SELECT id, record FROM events")
+                      if predicate(self._load(handle, record))]
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("DELETE FROM events WHERE id = ?", [(h,) for h in doomed])
+            for handle in doomed:
+                self._window.pop(handle, None)
+            self._size -= len(doomed)
+            return len(doomed)
+
+    # ---------- 读取 ----------
+
+    def peek(self):
+        """查看最早的事件"""
+        with self._lock:
+            handle = self._head()
+            return None if handle is None else self._window[handle]
+
+    def peek_handle(self):
+        """查看最早事件的句柄"""
+        with self._lock:
+            return self._head()
+
+    def pop(self):
+        """弹出最早的事件"""
+        entry = self.pop_entry()
+        return entry[1] if entry else None
+
+    def pop_entry(self):
+        """弹出最早的事件，返回 (句柄, 事件)"""
+        with self._lock:
+            handle = self._head()
+            if handle is None:
+                return None
+            heapq.heappop(self._window_heap)
+            item = self._window.pop(handle)
+            self._conn.execute("DELETE FROM events WHERE id = ?", (handle,))
+            self._size -= 1
+            return handle, item
+
+    def pop_until(self, threshold):
+        """弹出所有触发时间 <= threshold 的事件（单个事务删除），按顺序返回 [(句柄, 事件)]"""
+        with self._lock:
+            entries = []
+            while True:
+                handle = self._head()
+                if handle is None or self._window[handle].when > threshold:
+                    break
+                heapq.heappop(self._window_heap)
+                entries.append((handle, self._window.pop(handle)))
+            if entries:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.executemany("DELETE FROM events WHERE id = ?", [(h,) for h, _ in entries])
+                self._size -= len(entries)
+            return entries
+
+    def get(self, handle):
+        """按句柄查看事件"""
+        with self._lock:
+            return self._get(handle)
+
+    def __contains__(self, handle):
+        with self._lock:
+            return self._get(handle) is not None
+
+    def is_empty(self):
+        with self._lock:
+            return self._size == 0
+
+    def __len__(self):
+        with self._lock:
+            return self._size
+
+    def handles_by_flower(self):
+        """按花种列出数据库中已有的提醒事件句柄（不含稍后提醒），用于重启后重建提醒系统"""
+        with self._lock:
+            result = {}
+            for handle, flower in self._conn.execute(
+                    "SELECT id, flower FROM events WHERE kind != ?", (SNOOZE_REMINDER,)):
+                result.setdefault(flower, []).append(handle)
+            return result
+
+    def between(self, start, end, flower=None, limit=None):
+        """按时间顺序返回 start <= 触发时间 < end 的 (触发时间, 句柄, 花种, 类型)，可只查一个花种、最多limit个"""
+        if limit is not None and limit <= 0:
+            return []
+        sql = "SELECT when_ts, id, flower, kind FROM events WHERE when_ts >= ? AND when_ts < ?"
+        params = [start, end]
+        if flower is not None:
+            sql += " AND flower = ?"
+            params.append(flower)
+        sql += " ORDER BY when_ts, seq"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def next(self, count, after=-_INF, flower=None):
+        """触发时间 >= after 的最早count个事件"""
+        return self.between(after, _INF, flower, count)
+
+    def next_per_flower(self, count, after=-_INF):
+        """每个花种触发时间 >= after 的最早count个事件 {花种: [...]}（每个花种一次索引查询）"""
+        with self._lock:
+            flowers = [flower for (flower,) in self._conn.execute("SELECT DISTINCT flower FROM events")]
+            result = {}
+            for flower in flowers:
+                entries = self.between(after, _INF, flower, count)
+                if entries:
+                    result[flower] = entries
+            return result
+
+    def counts_by_flower(self):
+        """按花种统计数据库中的事件数量（用于队列深度指标）"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT flower, COUNT(*) FROM events GROUP BY flower"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 内部实现（调用方需持有锁） ----------
+
+    def _allocate(self):
+        handle = self._next_id
+        self._next_id += 1
+        return handle
+
+    @staticmethod
+    def _row(handle, item):
+        return (handle, item.when, item.seq, item.flower, item.kind,
+                json.dumps(item.to_record(), ensure_ascii=False))
+
+    def _load(self, handle, record):
+        """把数据库记录还原为事件对象，优先复用窗口内的对象"""
+        item = self._window.get(handle)
+        if item is not None:
+            return item
+        record = json.loads(record)
+        owner = None
+        if self._owner_resolver and record["kind"] != SNOOZE_REMINDER:
+            owner = self._owner_resolver(record["flower"])
+        return ReminderEvent.from_record(record, owner)
+
+    def _get(self, handle):
+        item = self._window.get(handle)
+        if item is not None:
+            return item
+        row = self._conn.execute("SELECT record FROM events WHERE id = ?", (handle,)).fetchone()
+        return None if row is None else self._load(handle, row[0])
+
+    def _admit(self, handle, item):
+        """触发时间落在窗口内的事件放入内存堆"""
+        if item.when < self._horizon:
+            self._window[handle] = item
+            heapq.heappush(self._window_heap, (item.when, item.seq, handle))
+
+    def _head(self):
+        """返回最早存活事件的句柄，窗口为空时从数据库读入下一个窗口"""
+        while True:
+            while self._window_heap:
+                when, seq, handle = self._window_heap[0]
+                item = self._window.get(handle)
+                if item is not None and item.seq == seq:
+                    return handle
+                heapq.heappop(self._window_heap)  # 已删除或已修改的旧条目
+            if not self._page_in():
+                return None
+
+    def _page_in(self):
+        """按触发时间索引读入下一个时间窗口内的事件"""
+        if self._size == 0:
+            return False
+        row = self._conn.execute(
+            "SELECT when_ts FROM events WHERE when_ts >= ? ORDER BY when_ts, seq LIMIT 1",
+            (self._horizon,)).fetchone()
+        if row is None:
+            return False
+        start = self._horizon
+        self._horizon = row[0] + self.window_seconds
+        rows = self._conn.execute(
+            "SELECT id, record FROM events WHERE when_ts >= ? AND when_ts < ? ORDER BY when_ts, seq",
+            (start, self._horizon)).fetchall()
+        for handle, record in rows:
+            self._admit(handle, self._load(handle, record))
+        return True
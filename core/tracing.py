@@ -0,0 +1,28 @@
+"""
+@文件: tracing.py
+@描述: 按花种开启的逐事件追踪
+@核心设计:
+    1. 逐事件的日志只对被追踪的花种输出（或core.scheduler开启DEBUG级别时全部输出）
+    2. 被追踪花种集合是不可变的frozenset，热路径先判断集合是否为空，
+       未开启追踪时不做任何字符串格式化
+    3. 追踪日志统一写入 "core.trace" 日志器，级别为INFO
+"""
+import logging
+
+trace_logger = logging.getLogger("core.trace")
+
+_traced = frozenset()
+
+
+def set_trace(flower_type: str, enabled: bool = True) -> None:
+    """开启/关闭某个花种的逐事件追踪"""
+    global _traced
+    if enabled:
+        _traced = _traced | {flower_type}
+    else:
+        _traced = _traced - {flower_type}
+
+
+def traced_flowers() -> frozenset:
+    """当前被追踪的花种集合（为空时调用方应跳过所有追踪逻辑）"""
+    return _traced
@@ -0,0 +1,271 @@
+"""
+@文件: upcoming.py
+@描述: 即将触发的提醒的有序索引，不弹出队列即可做范围查询和前k个查询
+@核心设计:
+    1. 分桶有序列表：条目 (触发时间, 句柄, 花种, 类型) 按元组顺序排列（句柄唯一，前两个字段即可确定顺序），
+       每个桶最多BUCKET_SIZE个条目，另存每个桶的最大条目用于二分定位；
+       插入/删除 O(log n + B)，范围/前k查询 O(log n + k)；一次加入大量条目时整体归并重建
+    2. 全局索引之外，每个花种各有一个同样结构的索引，"每个花种最近k个"不需要扫描其它花种
+    3. 写时复制 + 按需发布：写入方（调度器，持有调度锁）只修改可变的分桶列表，不在每次写入时发布快照；
+       读取方调用snapshot()时才把上次发布以来的修改冻结为新快照（只重新冻结变化过的花种），
+       连续多次写入只在下一次查询时发布一次。快照只复制桶指针（各桶最大条目由读取方首次查询时生成）；
+       之后写入方修改被快照引用的桶前先复制该桶。索引自己的小锁只保护"修改/发布"这一步，
+       拿到快照后的查询不加锁，也不获取调度锁
+    4. 索引是可选的（ReminderScheduler的upcoming_index参数），只用于内存队列后端；
+       SQLite后端直接用数据库的触发时间索引回答同样的查询（SQLiteEventStore.between等），不在内存中镜像
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime
+from heapq import merge
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 每个桶的最大条目数：越大查询越快，写时复制单个桶的开销越大
+BUCKET_SIZE = 1024
+
+_INF = float("inf")
+
+
+def index_entry(handle, event) -> tuple:
+    """由队列中的事件记录生成索引条目"""
+    return event.when, handle, event.flower, event.kind
+
+
+class SortedSnapshot:
+    """分桶有序列表的不可变快照"""
+
+    __slots__ = ("_buckets", "_maxes", "_len")
+
+    def __init__(self, buckets: tuple = (), length: int = 0):
+        self._buckets = buckets
+        self._maxes = None  # 首次查询时生成；多个读取方同时生成的结果相同，不需要加锁
+        self._len = length
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+
+    def range(self, start: float = -_INF, end: float = _INF, limit: Optional[int] = None) -> List[tuple]:
+        """按时间顺序返回 start <= 触发时间 < end 的条目，最多limit个"""
+        buckets = self._buckets
+        result = []
+        if limit is not None and limit <= 0:
+            return result
+        maxes = self._maxes
+        if maxes is None:
+            maxes = self._maxes = [bucket[-1] for bucket in buckets]
+        lower, upper = (start,), (end,)  # 比任何同一时间的条目都小
+        i = bisect_left(maxes, lower)
+        j = bisect_left(buckets[i], lower) if i < len(buckets) else 0
+        while i < len(buckets):
+            bucket = buckets[i]
+            stop = len(bucket)
+            if bucket[-1] >= upper:
+                stop = bisect_left(bucket, upper, j)
+            result.extend(bucket[j:stop])
+            if stop < len(bucket) or (limit is not None and len(result) >= limit):
+                break
+            i, j = i + 1, 0
+        if limit is not None:
+            del result[limit:]
+        return result
+
+
+class SortedBuckets:
+    """写入方持有的可变分桶有序列表（调用方负责串行写入）"""
+
+    def __init__(self, entries: Iterable[tuple] = ()):
+        self._build(sorted(entries))
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+
+    def _build(self, entries: list) -> None:
+        """由有序列表整体建桶（新桶都未被快照引用）"""
+        self._buckets = [entries[i:i + BUCKET_SIZE] for i in range(0, len(entries), BUCKET_SIZE)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(entries)
+        # 上次发布快照之后新建/复制的桶（可直接原地修改），其余桶可能被快照引用
+        self._owned = {id(bucket) for bucket in self._buckets}
+
+    def add_many(self, entries: list) -> None:
+        """加入多个条目：数量较多时与现有条目归并后整体重建 O(n + k log k)，否则逐个插入"""
+        if len(entries) * 8 > self._len:
+            self._build(list(merge(self, sorted(entries))))
+        else:
+            for entry in entries:
+                self.add(entry)
+
+    def add(self, entry: tuple) -> None:
+        buckets, maxes = self._buckets, self._maxes
+        self._len += 1
+        if not buckets:
+            bucket = [entry]
+            buckets.append(bucket)
+            maxes.append(entry)
+            self._owned.add(id(bucket))
+            return
+        i = min(bisect_left(maxes, entry), len(buckets) - 1)
+        bucket = self._own(i)
+        insort(bucket, entry)
+        if len(bucket) > BUCKET_SIZE:
+            # 桶满时对半拆分
+            half = bucket[BUCKET_SIZE // 2:]
+            del bucket[BUCKET_SIZE // 2:]
+            buckets.insert(i + 1, half)
+            maxes.insert(i + 1, half[-1])
+            self._owned.add(id(half))
+        maxes[i] = bucket[-1]
+
+    def discard(self, entry: tuple) -> bool:
+        """删除条目，不存在时返回False"""
+        buckets, maxes = self._buckets, self._maxes
+        i = bisect_left(maxes, entry)
+        if i == len(buckets):
+            return False
+        j = bisect_left(buckets[i], entry)
+        if j == len(buckets[i]) or buckets[i][j] != entry:
+            return False
+        bucket = self._own(i)
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            maxes[i] = bucket[-1]
+        else:
+            del buckets[i], maxes[i]
+        return True
+
+    def freeze(self) -> SortedSnapshot:
+        """发布快照：复制桶指针，此后所有桶都视为被快照引用"""
+        self._owned = set()
+        return SortedSnapshot(tuple(self._buckets), self._len)
+
+    def _own(self, i: int) -> list:
+        """返回可原地修改的第i个桶，被快照引用的桶先复制（写时复制）"""
+        bucket = self._buckets[i]
+        if id(bucket) not in self._owned:
+            bucket = list(bucket)
+            self._buckets[i] = bucket
+            self._owned.add(id(bucket))
+        return bucket
+
+
+class UpcomingSnapshot:
+    """某一时刻全部待触发提醒的不可变视图（读取方使用，无锁）"""
+
+    __slots__ = ("all", "by_flower")
+
+    def __init__(self, all_entries: SortedSnapshot, by_flower: Dict[str, SortedSnapshot]):
+        self.all = all_entries
+        self.by_flower = by_flower
+
+    def __len__(self):
+        return len(self.all)
+
+    def between(self, start: float, end: float, flower: Optional[str] = None,
+                limit: Optional[int] = None) -> List[tuple]:
+        """start <= 触发时间 < end 的条目（可只查一个花种）"""
+        index = self.all if flower is None else self.by_flower.get(flower)
+        return index.range(start, end, limit) if index is not None else []
+
+    def next(self, count: int, after: float = -_INF, flower: Optional[str] = None) -> List[tuple]:
+        """触发时间 >= after 的最早count个条目"""
+        return self.between(after, _INF, flower, count)
+
+    def next_per_flower(self, count: int, after: float = -_INF) -> Dict[str, List[tuple]]:
+        """每个花种触发时间 >= after 的最早count个条目"""
+        result = {}
+        for flower, index in self.by_flower.items():
+            entries = index.range(after, _INF, count)
+            if entries:
+                result[flower] = entries
+        return result
+
+
+class UpcomingIndex:
+    """
+    写入方接口：调度器在持有调度锁时调用update，只修改分桶列表并记录变化过的花种；
+    读取方调用snapshot()拿到当前快照（有未发布的修改时先发布），之后的查询都不涉及写入方的数据
+    """
+
+    def __init__(self, entries: Iterable[tuple] = ()):
+        self._lock = threading.Lock()
+        self._all = SortedBuckets()
+        self._flowers = {}  # type: Dict[str, SortedBuckets]
+        self._snapshot = UpcomingSnapshot(SortedSnapshot(), {})
+        self._dirty = set()  # 上次发布快照之后变化过的花种
+        self.reset(entries)
+
+    def snapshot(self) -> UpcomingSnapshot:
+        with self._lock:
+            if self._dirty:
+                self._publish()
+            return self._snapshot
+
+    def reset(self, entries: Iterable[tuple]) -> None:
+        """以entries替换全部内容（整体重建）"""
+        entries = list(entries)
+        grouped = {}
+        for entry in entries:
+            grouped.setdefault(entry[2], []).append(entry)
+        with self._lock:
+            self._all = SortedBuckets(entries)
+            self._flowers = {flower: SortedBuckets(items) for flower, items in grouped.items()}
+            self._dirty = set()
+            self._snapshot = UpcomingSnapshot(self._all.freeze(),
+                                              {flower: index.freeze() for flower, index in self._flowers.items()})
+
+    def update(self, added: Iterable[tuple] = (), removed: Iterable[tuple] = ()) -> None:
+        """先删除removed再加入added中的条目（不发布快照，只记录变化过的花种）"""
+        added = list(added)
+        with self._lock:
+            dirty = self._dirty
+            for entry in removed:
+                if self._all.discard(entry):
+                    self._flowers[entry[2]].discard(entry)
+                    dirty.add(entry[2])
+            if len(added) == 1:
+                # 单个事件（schedule/reschedule）：直接插入，不分组
+                entry = added[0]
+                self._all.add(entry)
+                self._flower_index(entry[2]).add(entry)
+                dirty.add(entry[2])
+            elif added:
+                self._all.add_many(added)
+                grouped = {}
+                for entry in added:
+                    grouped.setdefault(entry[2], []).append(entry)
+                for flower, entries in grouped.items():
+                    self._flower_index(flower).add_many(entries)
+                dirty.update(grouped)
+
+    def _flower_index(self, flower: str) -> SortedBuckets:
+        index = self._flowers.get(flower)
+        if index is None:
+            index = self._flowers[flower] = SortedBuckets()
+        return index
+
+    def _publish(self) -> None:
+        """把上次发布以来的修改冻结为新快照，只重新冻结变化过的花种（调用方需持有_lock）"""
+        by_flower = dict(self._snapshot.by_flower)
+        for flower in self._dirty:
+            index = self._flowers.get(flower)
+            if index is not None and len(index):
+                by_flower[flower] = index.freeze()
+            else:
+                self._flowers.pop(flower, None)
+                by_flower.pop(flower, None)
+        self._dirty = set()
+        self._snapshot = UpcomingSnapshot(self._all.freeze(), by_flower)
+
+
+def entries_to_dicts(entries: Iterable[Tuple[float, int, str, str]]) -> List[dict]:
+    """把索引条目转换为界面使用的字典（不生成提醒文本）"""
+    return [{"handle": handle, "type": kind, "flower": flower, "trigger_time": datetime.fromtimestamp(when)}
+            for when, handle, flower, kind in entries]
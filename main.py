@@ -1,33 +1,79 @@
+import os
 import sys
+import logging
+import tempfile
+import importlib
 import threading
 from datetime import datetime, timedelta
 from PyQt6.QtWidgets import QMainWindow, QFrame, QCheckBox, QLabel, QPushButton
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt, QTimer
 from core.reminder_manager import ReminderManager
-from core.data_analysis import FlowerDataAnalyzer
-from ui.reminder_choice_ui import ReminderChoiceWindow
-from ui.reminder_ui import ReminderPopup
+from core.dispatchers import QtDispatcher
+from ui.async_bridge import QtAsyncioBridge, HAVE_QASYNC
+from ui.assets import load_bundle, reserve_qt_cache
+from ui import theme
+# 其它窗口、提醒弹窗和数据分析器在第一次使用时才导入/创建，启动时只加载选择窗口
+
+# 窗口注册表: 名称 -> (模块, 类名)。每个窗口只创建一次，导航时显示/隐藏
+WINDOW_CLASSES = {
+    "choice": ("ui.reminder_choice_ui", "ReminderChoiceWindow"),
+    "user_set": ("ui.user_set_ui", "UserSetWindow"),
+    "smart": ("ui.smart_reminder_ui", "SmartReminderWindow"),
+    "analysis": ("ui.data_analysis_ui", "DataAnalysisWindow"),
+}
+
+# 提醒日志和快照的保存目录（可用环境变量FLOWER_CARE_DATA_DIR覆盖，如启动测量时使用临时目录）
+DATA_DIR = os.environ.get("FLOWER_CARE_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".flower_care")
 
 class FlowerCareApp:
-    def __init__(self):
+    def __init__(self, data_dir=DATA_DIR):
         self.app = QApplication(sys.argv)
-        self.reminder_manager = ReminderManager()
-        self.analyzer = FlowerDataAnalyzer()
-        self.reminder_manager.register_callback(self.show_reminder_popup)
+        # 优先使用构建生成的资源包（按使用位置预缩放的背景图）；没有时使用原图，
+        # 样式表中的原图经QPixmapCache缓存，上限放大到能容纳全部背景图，每张只解码一次
+        if not load_bundle():
+            reserve_qt_cache()
+        # 全部界面样式由应用级主题统一设置（只解析一次），控件只设置objectName/role属性
+        theme.apply(self.app)
+        # 250毫秒内同时到期的提醒合并为一个弹窗
+        manager_options = {"journal_dir": data_dir, "batch_window": 0.25}
+        if HAVE_QASYNC:
+            # 安装了qasync时界面与提醒调度共用同一个asyncio事件循环，回调在主线程执行
+            self.bridge = QtAsyncioBridge(self.app)
+            self.reminder_manager = ReminderManager(engine="asyncio", loop=self.bridge.loop, **manager_options)
+        else:
+            # 否则使用后台调度线程，回调经QtDispatcher投递到主线程，空闲时不需要定时泵送
+            self.bridge = None
+            self.reminder_manager = ReminderManager(dispatcher=QtDispatcher(), **manager_options)
+        self._analyzer = None
+        self.reminder_manager.register_batch_callback(self.show_reminder_batch)
+        # 退出前停止调度并把日志落盘
+        self.app.aboutToQuit.connect(self.quit)
         
         self.flower_types = ["玫瑰", "百合", "郁金香", "康乃馨", "向日葵"]
-        self.windows = []
-        self.window = ReminderChoiceWindow(self)
-        self.add_window(self.window)
+        
+        # 从日志恢复上次运行时的提醒和稍后提醒
+        for flower_type in self.reminder_manager.restore():
+            if flower_type not in self.flower_types:
+                self.flower_types.append(flower_type)
+        self.windows = {}  # 已创建的窗口: 名称 -> 窗口
+        self.window = self.get_window("choice")
         self.active_popups = []  # 跟踪活动的弹窗
-        self.snooze_timers = {}  # 跟踪稍后提醒的计时器
+        self.snooze_handles = {}  # 跟踪稍后提醒的事件句柄
         
         # 添加测试按钮
         self.window.test_button = QPushButton("测试弹窗", self.window)
         self.window.test_button.setGeometry(300, 300, 100, 30)
         self.window.test_button.clicked.connect(self.test_popup_display)
     
+    @property
+    def analyzer(self):
+        """数据分析器（生成样本数据较慢，第一次使用时才创建）"""
+        if self._analyzer is None:
+            from core.data_analysis import FlowerDataAnalyzer
+            self._analyzer = FlowerDataAnalyzer()
+        return self._analyzer
+    
     def test_popup_display(self):
         """测试弹窗显示功能"""
         test_data = {
@@ -36,11 +82,33 @@ class FlowerCareApp:
         }
         self.show_reminder_popup(test_data)
     
-    def add_window(self, window):
-        self.windows.append(window)
+    def get_window(self, name):
+        """返回名称为name的窗口，第一次使用时导入模块并创建"""
+        window = self.windows.get(name)
+        if window is None:
+            module_name, class_name = WINDOW_CLASSES[name]
+            window_class = getattr(importlib.import_module(module_name), class_name)
+            window = self.windows[name] = window_class(self)
+        return window
+    
+    def show_window(self, name, **state):
+        """
+        导航到name窗口：刷新其状态（窗口的refresh方法，state原样传入）后显示，并隐藏其它窗口。
+        窗口不会重新创建，样式表和背景图片不会重复解析
+        """
+        window = self.get_window(name)
+        if hasattr(window, 'refresh'):
+            window.refresh(**state)
+        for other in self.windows.values():
+            if other is not window:
+                other.hide()
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
     
     def update_flower_types(self):
-        for window in self.windows:
+        for window in self.windows.values():
             if hasattr(window, 'update_flower_list'):
                 window.update_flower_list()
     
@@ -53,29 +121,29 @@ class FlowerCareApp:
     
     def run(self):
         self.window.show()
-        sys.exit(self.app.exec())
+        sys.exit(self.bridge.exec() if self.bridge else self.app.exec())
     
     def quit(self):
+        """退出前清理（QApplication.aboutToQuit时调用）"""
         # 关闭所有弹窗
         for popup in self.active_popups:
             popup.close()
         self.active_popups.clear()
         
-        # 停止所有提醒
-        for flower_type in list(self.reminder_manager.reminders.keys()):
-            self.reminder_manager.remove_reminder(flower_type)
-        
-        # 停止所有稍后提醒计时器
-        for timer in self.snooze_timers.values():
-            timer.cancel()
-        self.snooze_timers.clear()
+        # 停止调度、把日志落盘并关闭；提醒和稍后提醒不取消，下次启动时从日志恢复
+        self.reminder_manager.cleanup()
+        self.snooze_handles.clear()
     
     def show_reminder_popup(self, event_data):
-        print(f"尝试显示弹窗: {event_data['message']}")
+        self.show_reminder_batch([event_data])
+    
+    def show_reminder_batch(self, batch):
+        """同一批到期的提醒只显示一个弹窗（批量回调，每批在主线程调用一次）"""
+        print(f"尝试显示弹窗: {len(batch)} 个提醒")
         # 使用QTimer.singleShot确保在主线程中执行
-        QTimer.singleShot(0, lambda: self._create_popup(event_data))
+        QTimer.singleShot(0, lambda: self._create_popup(batch))
     
-    def _create_popup(self, event_data):
+    def _create_popup(self, batch):
         print(f"当前线程: {threading.current_thread().name}")
         try:
             app = QApplication.instance()
@@ -83,16 +151,24 @@ class FlowerCareApp:
                 print("错误: 没有活动的QApplication实例")
                 return
                 
-            print(f"创建提醒弹窗: {event_data['message']}")
-            
             # 提取鲜花类型
-            flower_type = event_data.get('flower', '鲜花')
+            flowers = list(dict.fromkeys(event_data.get('flower', '鲜花') for event_data in batch))
+            if len(batch) == 1:
+                flower_type = flowers[0]
+                message = batch[0]['message']
+            else:
+                # 多个提醒合并显示：标题显示花种数量，正文列出花种
+                flower_type = f"{len(flowers)}种鲜花" if len(flowers) > 1 else flowers[0]
+                names = "、".join(flowers[:6]) + (" 等" if len(flowers) > 6 else "")
+                message = f"[养护提醒] {len(batch)} 个提醒同时到期，请养护: {names}"
+            print(f"创建提醒弹窗: {message}")
             
-            # 创建弹窗
-            popup = ReminderPopup(event_data['message'], flower_type)
+            # 创建弹窗（弹窗模块在第一次提醒时才导入）
+            from ui.reminder_ui import ReminderPopup
+            popup = ReminderPopup(message, flower_type)
             
-            # 连接取消信号（稍后提醒）
-            popup.rejected.connect(lambda: self.handle_snooze(event_data))
+            # 连接取消信号（稍后提醒，批中每个提醒各自稍后）
+            popup.rejected.connect(lambda: self.handle_snooze_batch(batch))
             
             # 添加到活动弹窗列表
             self.active_popups.append(popup)
@@ -109,39 +185,27 @@ class FlowerCareApp:
         except Exception as e:
             print(f"显示弹窗时出错: {e}")
 
+    def handle_snooze_batch(self, batch):
+        """合并弹窗的稍后提醒：批中每个提醒各自安排稍后提醒"""
+        for event_data in batch:
+            self.handle_snooze(event_data)
+    
     def handle_snooze(self, event_data):
         """处理稍后提醒请求"""
         flower_type = event_data.get('flower', '鲜花')
         print(f"稍后提醒: {flower_type}")
         
-        # 取消现有的稍后提醒计时器
-        if flower_type in self.snooze_timers:
-            self.snooze_timers[flower_type].cancel()
+        # 取消现有的稍后提醒（按句柄原地删除）
+        if flower_type in self.snooze_handles:
+            self.reminder_manager.cancel(self.snooze_handles[flower_type])
         
-        # 创建新的稍后提醒
-        snooze_time = timedelta(minutes=10)
-        snooze_time_sec = snooze_time.total_seconds()
+        # 稍后提醒作为一次性事件加入调度器，到期后走正常的回调流程
+        handle = self.reminder_manager.snooze(event_data, timedelta(minutes=10))
         
-        # 创建定时器
-        timer = threading.Timer(snooze_time_sec, self.trigger_snooze, [event_data])
-        timer.start()
-        
-        # 存储计时器
-        self.snooze_timers[flower_type] = timer
+        # 存储句柄
+        self.snooze_handles[flower_type] = handle
         print(f"已设置10分钟后提醒: {flower_type}")
     
-    def trigger_snooze(self, event_data):
-        """触发稍后提醒"""
-        flower_type = event_data.get('flower', '鲜花')
-        print(f"触发稍后提醒: {flower_type}")
-        
-        # 移除计时器
-        if flower_type in self.snooze_timers:
-            del self.snooze_timers[flower_type]
-        
-        # 重新显示弹窗
-        self.show_reminder_popup(event_data)
-    
     def test_reminder_system(self):
         """测试提醒系统功能"""
         print("测试-开始测试提醒系统")
@@ -166,6 +230,12 @@ class FlowerCareApp:
         print(f"测试-{name}提醒已添加")
 
 if __name__ == "__main__":
-    flower_app = FlowerCareApp()
-    flower_app.test_reminder_system()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s: %(message)s")
+    # 自测提醒只在带 --self-test 参数启动时添加，并写入临时目录，不会混入用户的提醒日志
+    if "--self-test" in sys.argv:
+        sys.argv.remove("--self-test")
+        flower_app = FlowerCareApp(data_dir=tempfile.mkdtemp(prefix="flower_care_selftest_"))
+        flower_app.test_reminder_system()
+    else:
+        flower_app = FlowerCareApp()
     flower_app.run()
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+@文件: test_assets.py
+@描述: 资源包测试（tools/build_assets.py），需要PyQt6，构建测试另外需要Pillow，缺少时跳过
+    - write_rcc写出的二进制资源文件能被QResource注册，每个文件按 :/ 路径读回的内容不变
+    - 由原图构建的资源包能被注册，AssetCache能从 :/backgrounds/... 解码出各版本
+@用法: python -m pytest -q test_assets.py   或   python test_assets.py
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+QtCore = pytest.importorskip("PyQt6.QtCore")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools"))
+import build_assets
+
+
+def test_write_rcc_round_trip():
+    """多个文件（含中文名、空文件、较大文件）写入资源包后按名称哈希二分查找都能读回"""
+    files = {f"file{i}.bin": bytes([i]) * (i * 37) for i in range(40)}
+    files["玫瑰.txt"] = "养护提醒".encode("utf-8")
+    files["big.bin"] = os.urandom(300000)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "test.rcc")
+        assert build_assets.write_rcc(path, files, "rcc_test") == os.path.getsize(path)
+        assert QtCore.QResource.registerResource(path)
+        try:
+            assert sorted(QtCore.QDir(":/rcc_test").entryList()) == sorted(files)
+            for name, data in files.items():
+                resource = QtCore.QFile(f":/rcc_test/{name}")
+                assert resource.open(QtCore.QIODevice.OpenModeFlag.ReadOnly), name
+                assert bytes(resource.readAll()) == data, name
+                resource.close()
+            assert not QtCore.QFile.exists(":/rcc_test/missing.bin")
+        finally:
+            QtCore.QResource.unregisterResource(path)
+
+
+def test_build_bundle_loads():
+    """由backgrounds原图构建资源包，Qt注册成功，AssetCache能按 :/ 路径加载每个版本且尺寸正确"""
+    if build_assets.Image is None:
+        pytest.skip("构建资源包需要Pillow")
+    with tempfile.TemporaryDirectory() as directory:
+        bundle_path = build_assets.build(build_assets.SOURCE_DIR, directory, 85, build_assets.SCALES, False)
+        names = build_assets.verify(bundle_path)
+    assert "choice_frame.jpg" in names and "choice_frame@2x.jpg" in names
+    assert {name.partition("@")[0].replace(".jpg", "") for name in names} == set(build_assets.VARIANTS)
+
+
+if __name__ == "__main__":
+    for test in (test_write_rcc_round_trip, test_build_bundle_loads):
+        test()
+        print(f"{test.__name__} 通过")
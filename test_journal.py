@@ -0,0 +1,112 @@
+"""
+@文件: test_journal.py
+@描述: ReminderJournal测试
+    - 回放：最后一行写了一半（崩溃）时丢弃并截掉该行，之前的记录正常恢复
+    - 压缩：达到阈值后写快照并截断日志，快照之后的记录按lsn继续回放
+    - 锁：落盘（fsync）期间record_*不被阻塞
+@用法: python -m pytest -q test_journal.py   或   python test_journal.py
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+
+from core import journal as journal_module
+from core.journal import ReminderJournal
+
+
+def event(when, flower="玫瑰"):
+    return {"when": when, "flower": flower}
+
+
+def read_lines(journal):
+    with open(journal.journal_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_torn_last_line():
+    """最后一行不完整时回放到前一行为止，lsn从最后一条完整记录继续"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ReminderJournal(directory, fsync_interval=0)
+        journal.record_add(1, event(100))
+        journal.record_add(2, event(200))
+        journal.record_snooze(3, event(300, "百合"))
+        journal.record_reschedule(1, 150)
+        journal.record_fire(2, None)
+        journal.close()
+        with open(journal.journal_path, "a", encoding="utf-8") as f:
+            f.write('{"op": "cancel", "id": 1, "l')
+
+        journal = ReminderJournal(directory, fsync_interval=0)
+        try:
+            assert journal.live_events() == {1: event(150), 3: event(300, "百合")}
+            journal.record_cancel(3)
+            assert read_lines(journal)[-1] == {"op": "cancel", "id": 3, "lsn": 6}
+        finally:
+            journal.close()
+
+        # 半行已被截掉，新记录没有接在它后面，再次恢复时不会丢失
+        journal = ReminderJournal(directory, fsync_interval=0)
+        journal.close()
+        assert journal.live_events() == {1: event(150)}
+
+
+def test_compaction_and_lsn_order():
+    """达到阈值时压缩：快照包含压缩前的全部记录，之后的记录lsn连续，重启后结果一致"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ReminderJournal(directory, fsync_interval=0, compact_every=4)
+        for event_id in range(1, 5):
+            journal.record_add(event_id, event(event_id * 100))
+        assert os.path.exists(journal.snapshot_path) and read_lines(journal) == []
+        with open(journal.snapshot_path, "r", encoding="utf-8") as f:
+            assert json.load(f)["lsn"] == 4
+
+        journal.record_cancel(2)
+        journal.record_fire(1, event(1100))
+        assert [record["lsn"] for record in read_lines(journal)] == [5, 6]
+        expected = journal.live_events()
+        journal.close()
+
+        journal = ReminderJournal(directory, fsync_interval=0, compact_every=4)
+        try:
+            assert journal.live_events() == expected == {1: event(1100), 3: event(300), 4: event(400)}
+            # 快照lsn之前的旧记录（例如截断前崩溃留下的）回放时被跳过
+            with open(journal.journal_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"lsn": 3, "op": "cancel", "id": 3}) + "\n")
+            assert ReminderJournal(directory, fsync_interval=0).live_events()[3] == event(300)
+        finally:
+            journal.close()
+
+
+def test_record_not_blocked_by_fsync():
+    """后台线程fsync时，record_*只需要内存锁，立即返回"""
+    with tempfile.TemporaryDirectory() as directory:
+        journal = ReminderJournal(directory, fsync_interval=0.01)
+        entered, release = threading.Event(), threading.Event()
+        fsync = journal_module.os.fsync
+
+        def slow_fsync(fd):
+            entered.set()
+            release.wait(2.0)
+            fsync(fd)
+
+        journal_module.os.fsync = slow_fsync
+        try:
+            journal.record_add(1, event(100))
+            assert entered.wait(1.0)
+            start = time.perf_counter()
+            journal.record_add(2, event(200))
+            journal.record_cancel(1)
+            assert time.perf_counter() - start < 0.5
+        finally:
+            release.set()
+            journal_module.os.fsync = fsync
+            journal.close()
+        assert [record["lsn"] for record in read_lines(journal)] == [1, 2, 3]
+
+
+if __name__ == "__main__":
+    for test in (test_replay_torn_last_line, test_compaction_and_lsn_order, test_record_not_blocked_by_fsync):
+        test()
+        print(f"{test.__name__} 通过")
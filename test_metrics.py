@@ -0,0 +1,93 @@
+"""
+@文件: test_metrics.py
+@描述: 运行指标测试
+    - Prometheus文本格式：直方图累计桶、+Inf、标签转义
+    - 队列深度：增量维护的计数与队列内容一致
+    - 回调耗时：lambda等匿名回调按注册时的标签或提醒类型区分
+@用法: python -m pytest -q test_metrics.py   或   python test_metrics.py
+"""
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from core.dispatchers import InlineDispatcher
+from core.metrics import Histogram, SchedulerMetrics, render_prometheus, METRIC_PREFIX
+from core.reminder_manager import ReminderManager
+from core.scheduler import QUEUE_BACKENDS
+
+
+def test_render_prometheus():
+    """快照渲染为Prometheus文本：计数器、累计桶、+Inf桶、sum/count，标签值中的引号和换行被转义"""
+    metrics = SchedulerMetrics()
+    metrics.fired_total = 3
+    for value in (0.0005, 0.02, 7200.0):
+        metrics.lateness.observe(value)
+    metrics.callback_histogram('show "popup"\n').observe(0.002)
+    text = render_prometheus(metrics.snapshot({"玫瑰": 2, "百合": 1}))
+    lines = text.splitlines()
+    p = METRIC_PREFIX
+
+    assert text.endswith("\n")
+    assert f"# TYPE {p}_fired_total counter" in lines and f"{p}_fired_total 3" in lines
+    assert f'{p}_fire_lateness_seconds_bucket{{le="0.001"}} 1' in lines
+    assert f'{p}_fire_lateness_seconds_bucket{{le="0.05"}} 2' in lines
+    assert f'{p}_fire_lateness_seconds_bucket{{le="3600.0"}} 2' in lines
+    assert f'{p}_fire_lateness_seconds_bucket{{le="+Inf"}} 3' in lines
+    assert f"{p}_fire_lateness_seconds_count 3" in lines
+    assert f"{p}_queue_size 3" in lines
+    assert lines.index(f'{p}_queue_depth{{flower="玫瑰"}} 2') < lines.index(f'{p}_queue_depth{{flower="百合"}} 1')
+    label = 'callback="show \\"popup\\"\\n"'
+    assert f'{p}_callback_duration_seconds_bucket{{{label},le="0.005"}} 1' in lines
+    assert f"{p}_callback_duration_seconds_count{{{label}}} 1" in lines
+    # 每个指标只有一组HELP/TYPE
+    types = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(types) == len(set(types)) == 7
+
+
+def test_histogram_snapshot():
+    """桶计数是累计的，恰好等于上界的值落在该桶"""
+    histogram = Histogram((1.0, 2.0))
+    for value in (1.0, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.snapshot() == {"buckets": [(1.0, 1), (2.0, 2), (float("inf"), 3)], "sum": 5.5, "count": 3}
+
+
+def test_queue_depth_counts():
+    """添加、取消、触发、重复后的队列深度与队列实际内容一致（不扫描队列计算）"""
+    for backend in QUEUE_BACKENDS:
+        manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher())
+        try:
+            soon = datetime.now() + timedelta(seconds=0.1)
+            later = datetime.now() + timedelta(hours=1)
+            handles = manager.add_reminders_bulk([("玫瑰", soon, 1, 1), ("百合", later, 1, 3), ("兰花", later, 1, 1)])
+            manager.snooze({"flower": "百合"}, timedelta(hours=2))
+            assert manager.get_metrics()["queue_depth"] == {"玫瑰": 1, "百合": 2, "兰花": 1}, backend
+            manager.cancel(handles[2][0])
+            time.sleep(0.4)
+            metrics = manager.get_metrics()
+            assert metrics["queue_depth"] == {"百合": 2} and metrics["queue_size"] == 2, backend
+            if backend != "sqlite":
+                assert metrics["queue_depth"] == dict(Counter(e.flower for e in manager.scheduler.event_heap.items()))
+        finally:
+            manager.cleanup()
+
+
+def test_callback_labels():
+    """匿名回调不再都记为<lambda>：给出label的按label统计，其余按提醒类型，批量回调为batch"""
+    manager = ReminderManager(dispatcher=InlineDispatcher())
+    try:
+        manager.register_callback(lambda event_data: None, label="popup")
+        manager.register_callback(lambda event_data: None)
+        manager.register_batch_callback(lambda batch: None)
+        manager.notify_batch([{"type": "care_reminder", "flower": "玫瑰"}, {"type": "snooze_reminder", "flower": "玫瑰"}])
+        durations = manager.get_metrics()["callback_duration_seconds"]
+        assert {name: snapshot["count"] for name, snapshot in durations.items()} == \
+            {"popup": 2, "care_reminder": 1, "snooze_reminder": 1, "batch": 1}
+    finally:
+        manager.cleanup()
+
+
+if __name__ == "__main__":
+    for test in (test_render_prometheus, test_histogram_snapshot, test_queue_depth_counts, test_callback_labels):
+        test()
+        print(f"{test.__name__} 通过")
@@ -0,0 +1,137 @@
+"""
+@文件: test_queue_backends.py
+@描述: 调度队列后端（core.scheduler.QUEUE_BACKENDS）的一致性测试，
+    每个后端执行同一组操作，结果应与IndexedMinHeap完全一致
+    （sqlite后端窗口外的事件从数据库重新读出，是新对象，因此按触发时间比较而不比较对象本身）
+@用法: python -m pytest -q test_queue_backends.py   或   python test_queue_backends.py
+"""
+import time
+import random
+
+from core.events import ReminderEvent, CARE_REMINDER
+from core.scheduler import QUEUE_BACKENDS
+
+BASE = int(time.time()) + 60
+
+
+def make_queue(name):
+    if name == "wheel":
+        return QUEUE_BACKENDS[name](start_time=BASE - 60)
+    return QUEUE_BACKENDS[name]()
+
+
+def event(offset, flower="玫瑰"):
+    return ReminderEvent(BASE + offset, CARE_REMINDER, flower, 1)
+
+
+def drain(queue):
+    """按顺序弹出全部元素，返回触发时间偏移列表"""
+    offsets = []
+    while not queue.is_empty():
+        offsets.append(queue.pop().when - BASE)
+    return offsets
+
+
+def test_pushpop():
+    """pushpop: 新元素较早时原样返回，否则弹出原最早元素"""
+    for name in QUEUE_BACKENDS:
+        queue = make_queue(name)
+        handles = queue.push_many([event(30), event(10), event(7200), event(90000)])
+
+        early = event(5)
+        handle, item = queue.pushpop(early)
+        assert item is early, name
+        assert handle not in queue and len(queue) == 4, name
+
+        late = event(20)
+        handle, item = queue.pushpop(late)
+        assert handle == handles[1] and item.when == BASE + 10, name
+        assert handle not in queue and len(queue) == 4, name
+        assert queue.peek().when == late.when, name
+
+        assert drain(queue) == [20, 30, 7200, 90000], name
+
+
+def test_pushpop_empty():
+    """空队列上pushpop直接返回item，队列保持为空"""
+    for name in QUEUE_BACKENDS:
+        queue = make_queue(name)
+        item = event(0)
+        assert queue.pushpop(item)[1] is item, name
+        assert queue.is_empty(), name
+
+
+def test_replace():
+    """replace: 替换最早元素，新元素沿用其句柄并按自己的触发时间排序"""
+    for name in QUEUE_BACKENDS:
+        queue = make_queue(name)
+        handles = queue.push_many([event(30), event(10), event(7200)])
+
+        later = event(86400 * 3)
+        handle, replaced = queue.replace(later)
+        assert handle == handles[1] and replaced.when == BASE + 10, name
+        assert len(queue) == 3 and queue.get(handle).when == later.when, name
+        assert queue.peek_handle() == handles[0], name
+
+        assert queue.remove(handle).when == later.when, name
+        assert drain(queue) == [30, 7200], name
+
+
+def test_replace_empty():
+    """空队列上replace只放入item并返回None"""
+    for name in QUEUE_BACKENDS:
+        queue = make_queue(name)
+        item = event(0)
+        assert queue.replace(item) is None, name
+        assert len(queue) == 1 and queue.peek().when == item.when, name
+
+
+def test_pop_until_order():
+    """pop_until按触发时间顺序取出到期元素，与IndexedMinHeap一致"""
+    offsets = [(i * 7919) % 200000 for i in range(500)]
+    expected = None
+    for name in QUEUE_BACKENDS:
+        queue = make_queue(name)
+        queue.push_many(event(offset) for offset in offsets)
+        result = [item.when - BASE for _, item in queue.pop_until(BASE + 100000)]
+        result += drain(queue)
+        if expected is None:
+            expected = result
+        assert result == expected == sorted(offsets), name
+
+
+def test_remove_update_by_handle():
+    """按句柄随机删除/修改后，队列顺序与参照模型一致，IndexedMinHeap的堆性质和位置索引保持正确"""
+    for name in QUEUE_BACKENDS:
+        rng = random.Random(5)
+        queue = make_queue(name)
+        offsets = [rng.randrange(200000) for _ in range(300)]
+        model = dict(zip(queue.push_many(event(offset) for offset in offsets), offsets))
+        for _ in range(400):
+            handle = rng.choice(list(model))
+            if rng.random() < 0.4:
+                assert queue.remove(handle).when == BASE + model.pop(handle), name
+                assert handle not in queue and queue.remove(handle) is None, name
+            else:
+                model[handle] = rng.randrange(200000)
+                assert queue.update(handle, event(model[handle])), name
+                assert queue.get(handle).when == BASE + model[handle], name
+            if name == "heap":
+                heap = queue._heap
+                assert all(not heap[i] < heap[(i - 1) // 2] for i in range(1, len(heap)))
+                assert all(queue._positions[h] == i for i, h in enumerate(queue._handles))
+        assert len(queue) == len(model), name
+        # 每个句柄只弹出一次，且按修改后的触发时间排序
+        popped = []
+        while not queue.is_empty():
+            handle, item = queue.pop_entry()
+            popped.append((item.when - BASE, handle))
+        assert [offset for offset, _ in popped] == sorted(model.values()), name
+        assert sorted(handle for _, handle in popped) == sorted(model), name
+
+
+if __name__ == "__main__":
+    for test in (test_pushpop, test_pushpop_empty, test_replace, test_replace_empty, test_pop_until_order,
+                 test_remove_update_by_handle):
+        test()
+        print(f"{test.__name__} 通过")
@@ -0,0 +1,280 @@
+"""
+@文件: test_reminder_manager.py
+@描述: ReminderManager测试
+    - 句柄：按句柄取消/改期后，每个事件只在新的时间触发一次
+    - 持久化：正常退出（cleanup）后重启，提醒应能从日志或SQLite队列中恢复
+    - 即将触发的提醒查询：各队列后端、启用/不启用有序索引的结果一致
+    - 错过补发："all"策略下错过的多次重复触发作为一批投递；
+      系统时钟向前跳变后all/latest/skip三种策略分别补发全部/每个花种最近一次/不补发
+    - 合并投递：合并窗口内到期的提醒作为一批投递；免打扰时段内到期的提醒推迟到时段结束一起投递
+    - 协程回调：在后台事件循环中运行，不阻塞分发回调的线程
+@用法: python -m pytest -q test_reminder_manager.py   或   python test_reminder_manager.py
+"""
+import os
+import time
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta, time as dtime
+
+from core import clock as clock_module
+from core.dispatchers import InlineDispatcher
+from core.events import ReminderEvent, CARE_REMINDER
+from core.clock import QuietHours
+from core.recurrence import RecurrenceRule
+from core.reminder_manager import ReminderManager
+from core.scheduler import QUEUE_BACKENDS
+from core.reminder_system import FlowerCareReminderSystem
+
+
+def add_flowers(manager, flowers, start=None):
+    start = start or datetime.now() + timedelta(hours=1)
+    for flower in flowers:
+        system = FlowerCareReminderSystem(manager, flower)
+        system.add_flower_reminder(start, 1)
+        manager.add_reminder(flower, system)
+
+
+def test_handles_fire_once():
+    """改期（提前/推后）的事件各触发一次，取消的事件和取消的稍后提醒不触发"""
+    for backend in QUEUE_BACKENDS:
+        manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher())
+        fired = []
+        manager.register_callback(lambda event_data: fired.append(event_data["flower"]))
+        try:
+            start = datetime.now() + timedelta(seconds=0.3)
+            handles = manager.add_reminders_bulk([(flower, start, 1, 1) for flower in ("玫瑰", "百合", "兰花")])
+            assert manager.reschedule(handles[0][0], start + timedelta(seconds=0.2))
+            assert manager.reschedule(handles[1][0], start - timedelta(seconds=0.2))
+            assert manager.cancel(handles[2][0]) and not manager.cancel(handles[2][0])
+            snoozed = manager.snooze({"flower": "茉莉"}, timedelta(seconds=0.1))
+            assert manager.cancel(snoozed)
+            deadline = time.time() + 2
+            while len(fired) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.2)
+            assert fired == ["百合", "玫瑰"], (backend, fired)
+            assert not manager.reschedule(handles[0][0], start) and len(manager.scheduler.event_heap) == 0
+        finally:
+            manager.cleanup()
+
+
+def test_sqlite_restart():
+    """SQLite队列: cleanup不删除数据库中的事件，重启后restore恢复全部花种"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "events.db")
+        manager = ReminderManager(queue_backend="sqlite", sqlite_path=path)
+        add_flowers(manager, ["玫瑰", "百合"])
+        size = len(manager.scheduler.event_heap)
+        manager.cleanup()
+
+        manager = ReminderManager(queue_backend="sqlite", sqlite_path=path)
+        try:
+            assert len(manager.scheduler.event_heap) == size == 2
+            assert sorted(manager.restore()) == ["玫瑰", "百合"]
+            assert len(manager.next_reminders(10)) == size
+        finally:
+            manager.cleanup()
+
+
+def test_journal_restart():
+    """日志: cleanup关闭日志时不记录取消，重启后restore恢复全部花种"""
+    with tempfile.TemporaryDirectory() as directory:
+        manager = ReminderManager(journal_dir=directory)
+        add_flowers(manager, ["玫瑰", "百合"])
+        manager.cleanup()
+
+        manager = ReminderManager(journal_dir=directory)
+        try:
+            assert sorted(manager.restore()) == ["玫瑰", "百合"]
+            assert len(manager.next_reminders(10)) == 2
+        finally:
+            manager.cleanup()
+
+
+def test_upcoming_queries():
+    """upcoming/next_reminders/next_reminders_per_flower在各后端、有无有序索引时结果一致"""
+    start = datetime.now() + timedelta(hours=1)
+    schedules = [(f"花种{i}", start + timedelta(minutes=7 * i), 1 + i % 3) for i in range(40)]
+    expected = None
+    for backend in QUEUE_BACKENDS:
+        for upcoming_index in (False, True):
+            manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher(),
+                                      upcoming_index=upcoming_index)
+            try:
+                handles = manager.add_reminders_bulk(schedules)
+                manager.cancel(handles[3][0])
+                manager.reschedule(handles[5][0], start + timedelta(days=2))
+                manager.remove_reminder("花种7")
+                result = (
+                    [(item["flower"], item["trigger_time"]) for item in manager.upcoming(timedelta(hours=3))],
+                    [(item["flower"], item["trigger_time"]) for item in manager.next_reminders(5, "花种5")],
+                    {flower: [item["trigger_time"] for item in items]
+                     for flower, items in manager.next_reminders_per_flower(2).items()},
+                )
+            finally:
+                manager.cleanup()
+            if expected is None:
+                expected = result
+            assert result == expected, (backend, upcoming_index)
+    upcoming, flower_next, per_flower = expected
+    assert upcoming and ("花种3", start + timedelta(minutes=21)) not in upcoming
+    assert all(flower != "花种7" for flower, _ in upcoming)
+    assert ("花种5", start + timedelta(days=2)) in flower_next
+    assert len(per_flower) == 38 and "花种7" not in per_flower
+
+
+def test_catchup_all_single_batch():
+    """"all"策略: 错过一个月的每日提醒，31次触发在一次唤醒中展开，作为一批投递"""
+    for backend in QUEUE_BACKENDS:
+        manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher(), catchup_policy="all")
+        batches = []
+        manager.register_batch_callback(batches.append)
+        try:
+            system = FlowerCareReminderSystem(manager, "玫瑰")
+            start = datetime.now() - timedelta(days=30, minutes=1)
+            rule = RecurrenceRule(start, timedelta(days=1))
+            system._register_event(
+                ReminderEvent(start.timestamp(), CARE_REMINDER, "玫瑰", 1, rule=rule, occurrence=0, owner=system))
+            manager.add_reminder("玫瑰", system)
+            deadline = time.time() + 2
+            while not batches and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.2)
+            assert [len(batch) for batch in batches] == [31], (backend, [len(batch) for batch in batches])
+            times = [event["trigger_time"] for event in batches[0]]
+            assert times == sorted(times) and times[-1] <= datetime.now()
+            assert len(manager.scheduler.event_heap) == 1
+            assert manager.scheduler.event_heap.peek().occurrence == 31
+        finally:
+            manager.cleanup()
+
+
+class ShiftedTime:
+    """替换core.clock中的time模块：墙上时钟比真实时间快shift秒，单调时钟不变"""
+
+    def __init__(self, shift):
+        self.shift = shift
+
+    def time(self):
+        return time.time() + self.shift
+
+    def monotonic(self):
+        return time.monotonic()
+
+
+def test_catchup_after_clock_jump():
+    """时钟向前跳3天后唤醒调度器：每个花种错过4次每日提醒，按策略补发，下一次触发在跳变后的将来"""
+    start = datetime.now() + timedelta(hours=1)
+    expected = {"all": 8, "latest": 2, "skip": 0}
+    for backend in QUEUE_BACKENDS:
+        for policy, count in expected.items():
+            manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher(), catchup_policy=policy)
+            batches = []
+            manager.register_batch_callback(batches.append)
+            try:
+                add_flowers(manager, ["玫瑰", "百合"], start)
+                clock_module.time = ShiftedTime(timedelta(days=3, hours=2).total_seconds())
+                with manager.scheduler.lock:
+                    manager.scheduler._wakeup.notify()
+                deadline = time.time() + 2
+                while manager.scheduler.clock.jumps == 0 and time.time() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.2)
+                fired = [event for batch in batches for event in batch]
+                assert len(fired) == count and len(batches) <= 1, (backend, policy, len(fired))
+                if policy == "latest":
+                    assert {event["trigger_time"] for event in fired} == {start + timedelta(days=3)}
+                now = manager.scheduler.clock.now()
+                assert len(manager.scheduler.event_heap) == 2
+                assert all(item["trigger_time"] == start + timedelta(days=4) and
+                           item["trigger_time"].timestamp() > now for item in manager.next_reminders(5))
+            finally:
+                clock_module.time = time
+                manager.cleanup()
+
+
+def wait_for_batches(batches, count, timeout=2.0):
+    deadline = time.time() + timeout
+    while len(batches) < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_batch_window():
+    """相隔0.15秒到期的两个提醒落在0.3秒的合并窗口内，作为同一批投递"""
+    for backend in QUEUE_BACKENDS:
+        manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher(), batch_window=0.3)
+        batches = []
+        manager.register_batch_callback(batches.append)
+        try:
+            start = datetime.now() + timedelta(seconds=0.1)
+            manager.add_reminders_bulk([("玫瑰", start, 1, 1), ("百合", start + timedelta(seconds=0.15), 1, 1)])
+            wait_for_batches(batches, 1)
+            time.sleep(0.3)
+            assert [[event["flower"] for event in batch] for batch in batches] == [["玫瑰", "百合"]], backend
+        finally:
+            manager.cleanup()
+
+
+def test_quiet_hours_deferral():
+    """免打扰时段内到期的提醒推迟到时段结束，与时段内其它提醒合并为一批；跨午夜的时段按天计算"""
+    quiet = QuietHours(dtime(22), dtime(7))
+    night = datetime(2026, 3, 1, 23, 30)
+    assert quiet.span_at(night.timestamp()) == (datetime(2026, 3, 1, 22).timestamp(),
+                                                 datetime(2026, 3, 2, 7).timestamp())
+    assert quiet.span_at(datetime(2026, 3, 2, 6, 59).timestamp())[1] == datetime(2026, 3, 2, 7).timestamp()
+    assert quiet.span_at(datetime(2026, 3, 2, 12).timestamp()) is None
+
+    for backend in QUEUE_BACKENDS:
+        now = datetime.now()
+        end = now + timedelta(seconds=0.8)
+        manager = ReminderManager(queue_backend=backend, dispatcher=InlineDispatcher(),
+                                  quiet_hours=((now - timedelta(minutes=1)).time(), end.time()))
+        batches = []
+        manager.register_batch_callback(batches.append)
+        try:
+            start = datetime.now() + timedelta(seconds=0.1)
+            manager.add_reminders_bulk([("玫瑰", start, 1, 1), ("百合", start + timedelta(seconds=0.2), 1, 1)])
+            time.sleep(max(0.0, (end - datetime.now()).total_seconds() - 0.2))
+            assert batches == [], backend
+            wait_for_batches(batches, 1)
+            assert datetime.now() >= end - timedelta(seconds=0.05), backend
+            assert [[event["flower"] for event in batch] for batch in batches] == [["玫瑰", "百合"]], backend
+        finally:
+            manager.cleanup()
+
+
+def test_coroutine_callback():
+    """协程回调提交到后台事件循环：分发线程不等待协程结束，事件循环正在运行时也不报错"""
+    manager = ReminderManager(dispatcher=InlineDispatcher())
+    started, release, done = threading.Event(), threading.Event(), []
+
+    async def notify(event_data):
+        started.set()
+        await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        done.append((event_data["flower"], threading.current_thread().name))
+
+    manager.register_callback(notify)
+    try:
+        async def fire():
+            # 在正在运行的事件循环中触发，InlineDispatcher直接在本线程执行回调
+            manager.notify_batch([{"flower": "玫瑰"}])
+
+        asyncio.run(fire())
+        assert started.wait(1.0) and not done
+        release.set()
+        deadline = time.time() + 1
+        while not done and time.time() < deadline:
+            time.sleep(0.01)
+        assert done == [("玫瑰", "ReminderCoroutines")]
+    finally:
+        release.set()
+        manager.cleanup()
+
+
+if __name__ == "__main__":
+    for test in (test_handles_fire_once, test_sqlite_restart, test_journal_restart, test_upcoming_queries,
+                 test_catchup_all_single_batch, test_catchup_after_clock_jump, test_batch_window,
+                 test_quiet_hours_deferral, test_coroutine_callback):
+        test()
+        print(f"{test.__name__} 通过")
@@ -0,0 +1,78 @@
+"""
+@文件: test_sharding.py
+@描述: ShardedReminderManager测试
+    - 往返：批量添加、查询、取消的结果经句柄换算后与各分片一致
+    - 失败路径：一个分片执行失败后，其余分片的回复也被取走，之后的调用结果仍然正确
+@用法: python -m pytest -q test_sharding.py   或   python test_sharding.py
+"""
+from datetime import datetime, timedelta
+
+from core.dispatchers import InlineDispatcher
+from core.sharding import ShardedReminderManager
+
+
+def flowers_per_shard(manager, count=2):
+    """为每个分片各挑选count个花种"""
+    chosen = {shard: [] for shard in range(manager.shard_count)}
+    index = 0
+    while any(len(flowers) < count for flowers in chosen.values()):
+        flower = f"花种{index}"
+        shard = manager.ring.shard_for(flower)
+        if len(chosen[shard]) < count:
+            chosen[shard].append(flower)
+        index += 1
+    return chosen
+
+
+def test_round_trip():
+    """批量添加 -> upcoming/pending_events/contains -> cancel，句柄在父进程与分片间正确换算"""
+    manager = ShardedReminderManager(shards=2, dispatcher=InlineDispatcher())
+    try:
+        start = datetime.now() + timedelta(hours=1)
+        flowers = [flower for items in flowers_per_shard(manager).values() for flower in items]
+        handles = manager.add_reminders_bulk([(flower, start, 1, 3) for flower in flowers])
+        # 重复规则按需展开，每个花种队列中只有下一次触发
+        assert [len(items) for items in handles] == [1] * len(flowers)
+        assert manager.pending_events() == len(flowers)
+        assert len(manager) == len(flowers) and all(flower in manager for flower in flowers)
+
+        upcoming = manager.upcoming(timedelta(hours=2))
+        assert sorted(item["flower"] for item in upcoming) == sorted(flowers)
+        assert {item["handle"] for item in upcoming} == {items[0] for items in handles}
+
+        assert manager.cancel(handles[0][0])
+        assert manager.pending_events() == len(flowers) - 1
+        assert handles[0][0] not in {item["handle"] for item in manager.next_reminders(100)}
+    finally:
+        manager.cleanup()
+
+
+def test_failure_keeps_replies_aligned():
+    """一个分片失败时调用抛出异常，但之后的调用不会读到错位的旧回复"""
+    manager = ShardedReminderManager(shards=2, dispatcher=InlineDispatcher())
+    try:
+        start = datetime.now() + timedelta(hours=1)
+        chosen = flowers_per_shard(manager)
+        manager.add_reminders_bulk([(chosen[0][0], start, 1, 1), (chosen[1][0], start, 1, 1)])
+        assert manager.pending_events() == 2
+
+        # 分片0收到无效的开始时间而失败，分片1正常执行
+        try:
+            manager.add_reminders_bulk([(chosen[0][1], "不是时间", 1, 1),
+                                        (chosen[1][0], start, 1, 1)])
+        except RuntimeError as e:
+            assert "分片 0" in str(e) and "分片 1" not in str(e)
+        else:
+            raise AssertionError("分片0应执行失败")
+
+        assert manager.pending_events() == 2
+        assert manager.next_reminders(5, chosen[1][0])[0]["flower"] == chosen[1][0]
+        assert len(manager) == 2
+    finally:
+        manager.cleanup()
+
+
+if __name__ == "__main__":
+    for test in (test_round_trip, test_failure_keeps_replies_aligned):
+        test()
+        print(f"{test.__name__} 通过")
@@ -0,0 +1,93 @@
+"""
+@文件: test_upcoming.py
+@描述: UpcomingIndex测试
+    - 写时复制：已发布的快照在之后的插入、删除、桶拆分后内容不变
+    - 并发：写入线程不断修改时，读取线程拿到的每个快照都是某次update之后的完整状态
+@用法: python -m pytest -q test_upcoming.py   或   python test_upcoming.py
+"""
+import time
+import random
+import threading
+
+from core.upcoming import UpcomingIndex, BUCKET_SIZE
+
+FLOWERS = ("玫瑰", "百合", "兰花")
+
+
+def make_entries(rng, handles):
+    return [(rng.randrange(100000), handle, FLOWERS[handle % 3], "care_reminder") for handle in handles]
+
+
+def test_snapshot_isolation():
+    """快照发布后写入方修改多个桶（含拆分和清空），旧快照的全部查询结果保持不变"""
+    rng = random.Random(20)
+    entries = make_entries(rng, range(BUCKET_SIZE * 3))
+    index = UpcomingIndex(entries)
+    old = index.snapshot()
+    expected = (list(old.all), old.between(20000, 60000), old.next(50, flower="百合"), old.next_per_flower(3))
+
+    added = make_entries(rng, range(BUCKET_SIZE * 3, BUCKET_SIZE * 3 + 700))
+    index.update(removed=entries[::2])
+    for entry in added:
+        index.update(added=(entry,))
+    new = index.snapshot()
+
+    assert (list(old.all), old.between(20000, 60000), old.next(50, flower="百合"), old.next_per_flower(3)) == expected
+    assert len(old) == len(entries) and list(old.all) == sorted(entries)
+    current = sorted(entries[1::2] + added)
+    assert list(new.all) == current and len(new) == len(current)
+    assert new.between(20000, 60000) == [entry for entry in current if 20000 <= entry[0] < 60000]
+    assert list(new.by_flower["百合"]) == [entry for entry in current if entry[2] == "百合"]
+    # 没有新的修改时重复取快照得到同一个对象
+    assert index.snapshot() is new
+
+
+def test_concurrent_snapshots():
+    """写入线程每次update删除一个条目并加入一个新条目（总数不变），读取线程的快照始终完整有序"""
+    rng = random.Random(21)
+    live = make_entries(rng, range(BUCKET_SIZE * 2))
+    index = UpcomingIndex(live)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        next_handle = len(live)
+        while not stop.is_set():
+            old = live.pop(rng.randrange(len(live)))
+            new = make_entries(rng, (next_handle,))[0]
+            next_handle += 1
+            live.append(new)
+            index.update(added=(new,), removed=(old,))
+
+    def reader():
+        try:
+            for _ in range(200):
+                snapshot = index.snapshot()
+                entries = list(snapshot.all)
+                assert len(entries) == len(snapshot) == BUCKET_SIZE * 2
+                assert entries == sorted(entries)
+                assert sum(len(flower_index) for flower_index in snapshot.by_flower.values()) == len(entries)
+                # 写入继续进行时，同一快照的查询结果不变
+                time.sleep(0.001)
+                assert snapshot.between(0, 50000) == [entry for entry in entries if entry[0] < 50000]
+                assert list(snapshot.all) == entries
+        except AssertionError as e:
+            errors.append(e)
+
+    writer_thread = threading.Thread(target=writer)
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    writer_thread.start()
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    stop.set()
+    writer_thread.join()
+    assert not errors, errors[0]
+    assert list(index.snapshot().all) == sorted(live)
+
+
+if __name__ == "__main__":
+    for test in (test_snapshot_isolation, test_concurrent_snapshots):
+        test()
+        print(f"{test.__name__} 通过")
@@ -0,0 +1,214 @@
+"""
+@文件: build_assets.py
+@描述: 资源构建步骤：为每个使用位置生成合适尺寸的背景图（含HiDPI @2x版本），打包为Qt二进制资源包
+@核心设计:
+    1. VARIANTS列出界面中每个使用位置的逻辑尺寸（与窗口中控件的setGeometry/resize一致），
+       按"cover"方式（等比缩放到铺满后居中裁剪）或"stretch"方式（拉伸到目标尺寸）生成版本
+    2. 每个版本生成1x和@2x两份（原图分辨率不够时不放大，跳过@2x，Qt在高DPI屏幕上放大1x版本），
+       JPEG使用 quality + optimize + progressive 压缩
+    3. 全部版本写入一个Qt二进制资源文件（rcc -binary格式，版本2），路径为 :/backgrounds/<版本名>[@2x].jpg；
+       运行时由 ui.assets.load_bundle 通过QResource.registerResource注册（Qt以mmap方式读取），
+       样式表按名称引用1x版本，Qt按屏幕设备像素比自动选用@2x版本
+    4. 只有构建时需要Pillow；没有构建资源包时界面退回使用原图
+    5. 资源包是构建产物（backgrounds/build/ 不纳入版本库），发布或本地运行界面前执行一次本工具；
+       --check 在构建后用Qt实际加载资源包（QResource.registerResource + ui.assets.AssetCache），
+       确认手写的rcc格式能被当前Qt版本读取
+@用法:
+    python tools/build_assets.py                       # 生成 backgrounds/build/assets.rcc
+    python tools/build_assets.py --check               # 生成后检查资源包能被Qt加载（需要PyQt6）
+    python tools/build_assets.py --quality 80 --files  # 同时把各版本写成单独的文件便于检查
+"""
+import io
+import os
+import sys
+import struct
+import argparse
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+SOURCE_DIR = os.path.join(ROOT, "backgrounds")
+OUTPUT_DIR = os.path.join(SOURCE_DIR, "build")
+BUNDLE_NAME = "assets.rcc"
+RESOURCE_DIR = "backgrounds"  # 资源包中的目录，运行时路径为 :/backgrounds/...
+
+# 使用位置: 版本名 -> (原图, 逻辑尺寸, 缩放方式)
+VARIANTS = {
+    "choice_frame": ("bg1.jpg", (311, 191), "cover"),       # 选择窗口主框架
+    "user_set_window": ("bg2.jpg", (800, 600), "cover"),    # 用户设置窗口背景
+    "user_set_frame": ("bg2.jpg", (501, 351), "cover"),     # 用户设置窗口主框架
+    "smart_window": ("bg3.jpg", (800, 600), "cover"),       # 智能提醒窗口背景
+    "smart_frame": ("bg3.jpg", (501, 351), "cover"),        # 智能提醒窗口主框架
+    "analysis_frame": ("bg4.jpg", (501, 401), "cover"),     # 数据分析窗口主框架
+    "popup_icon": ("bg1.jpg", (100, 100), "stretch"),       # 提醒弹窗图标
+}
+SCALES = (1, 2)
+
+# Qt资源树节点标志（本工具不压缩数据，JPEG本身已压缩）
+_DIRECTORY = 0x02
+_LANGUAGE_C = 1  # QLocale.Language.C，与rcc对没有指定语言的文件的处理一致
+_ANY_TERRITORY = 0
+
+
+def qt_hash(name: str) -> int:
+    """Qt资源文件中名称的哈希（qt_hash），同一目录下的子节点按它排序以便二分查找"""
+    encoded = name.encode("utf-16-be")
+    h = 0
+    for unit in struct.unpack(f">{len(encoded) // 2}H", encoded):
+        h = (h << 4) + unit
+        h ^= (h & 0xf0000000) >> 23
+        h &= 0x0fffffff
+    return h
+
+
+def write_rcc(path: str, files: dict, directory: str = RESOURCE_DIR) -> int:
+    """
+    把 {文件名: 字节} 写成Qt二进制资源文件（rcc -binary，格式版本2，数据不压缩），
+    资源路径为 :/<directory>/<文件名>。返回文件大小
+    """
+    names = bytearray()
+    name_offsets = {}
+
+    def name_offset(name):
+        if name not in name_offsets:
+            name_offsets[name] = len(names)
+            encoded = name.encode("utf-16-be")
+            names.extend(struct.pack(">HI", len(encoded) // 2, qt_hash(name)) + encoded)
+        return name_offsets[name]
+
+    data = bytearray()
+    entries = []
+    for name in sorted(files, key=qt_hash):
+        entries.append((name_offset(name), len(data)))
+        data.extend(struct.pack(">I", len(files[name])) + files[name])
+
+    # 树按广度优先排列：0号为根目录，1号为directory，之后是directory中的文件（按名称哈希排序）
+    # 每个节点22字节：名称偏移(4) 标志(2) 然后目录为 子节点数(4) 第一个子节点序号(4)，
+    # 文件为 地区(2) 语言(2) 数据偏移(4)；最后是修改时间(8，版本2起)
+    tree = bytearray()
+    tree += struct.pack(">IHIIq", 0, _DIRECTORY, 1, 1, 0)
+    tree += struct.pack(">IHIIq", name_offset(directory), _DIRECTORY, len(entries), 2, 0)
+    for offset, data_offset in entries:
+        tree += struct.pack(">IHhhIq", offset, 0, _ANY_TERRITORY, _LANGUAGE_C, data_offset, 0)
+
+    header_size = 20  # 魔数 版本 树偏移 数据偏移 名称偏移
+    data_offset = header_size
+    names_offset = data_offset + len(data)
+    tree_offset = names_offset + len(names)
+    with open(path, "wb") as f:
+        f.write(b"qres" + struct.pack(">iiii", 2, tree_offset, data_offset, names_offset))
+        f.write(data)
+        f.write(names)
+        f.write(tree)
+    return tree_offset + len(tree)
+
+
+def render(source, size, mode, scale, quality):
+    """生成一个版本的JPEG字节；原图分辨率不足（需要放大）时返回None"""
+    width, height = size[0] * scale, size[1] * scale
+    if mode == "cover":
+        if max(width / source.width, height / source.height) > 1:
+            return None
+        image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+    elif mode == "stretch":
+        if width > source.width or height > source.height:
+            return None
+        image = source.resize((width, height), Image.LANCZOS)
+    else:
+        raise ValueError(f"未知的缩放方式: {mode}")
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build(source_dir, output_dir, quality, scales, write_files):
+    sources = {}
+    files = {}
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"{'版本':<18} {'原图':<8} {'尺寸':>10} {'倍率':>4} {'大小':>9}")
+    for variant, (source_name, size, mode) in VARIANTS.items():
+        if source_name not in sources:
+            with Image.open(os.path.join(source_dir, source_name)) as image:
+                sources[source_name] = ImageOps.exif_transpose(image).convert("RGB")
+        for scale in scales:
+            encoded = render(sources[source_name], size, mode, scale, quality)
+            label = f"{size[0] * scale}x{size[1] * scale}"
+            if encoded is None:
+                print(f"{variant:<18} {source_name:<8} {label:>10} {scale:>3}x   原图太小，跳过")
+                continue
+            file_name = f"{variant}{'' if scale == 1 else f'@{scale}x'}.jpg"
+            files[file_name] = encoded
+            print(f"{variant:<18} {source_name:<8} {label:>10} {scale:>3}x {len(encoded) / 1024:7.1f}KB")
+            if write_files:
+                with open(os.path.join(output_dir, file_name), "wb") as f:
+                    f.write(encoded)
+
+    bundle_path = os.path.join(output_dir, BUNDLE_NAME)
+    bundle_size = write_rcc(bundle_path, files)
+    original_size = sum(os.path.getsize(os.path.join(source_dir, name)) for name in sources)
+    print(f"\n资源包: {bundle_path}")
+    print(f"  {len(files)} 个文件 {bundle_size / 1024:.1f}KB（原图 {len(sources)} 张共 {original_size / 1024:.1f}KB）")
+    return bundle_path
+
+
+def verify(bundle_path: str) -> list:
+    """
+    用Qt加载资源包：QResource.registerResource成功，AssetCache能从 :/ 路径解码出每个文件，
+    且尺寸与VARIANTS一致。返回资源包中的文件名列表，失败时抛出RuntimeError
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")  # 没有显示器的构建环境也能创建QGuiApplication
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    from PyQt6.QtCore import QDir, QResource
+    from PyQt6.QtGui import QGuiApplication
+    from ui.assets import AssetCache
+
+    # QPixmap需要GUI应用对象，检查期间保持引用
+    app = QGuiApplication.instance() or QGuiApplication([])
+    if not QResource.registerResource(bundle_path):
+        raise RuntimeError(f"Qt无法注册资源包: {bundle_path}")
+    try:
+        names = QDir(f":/{RESOURCE_DIR}").entryList()
+        if not names:
+            raise RuntimeError(f"资源包中没有 :/{RESOURCE_DIR} 目录")
+        cache = AssetCache()
+        for name in names:
+            pixmap = cache.pixmap(f":/{RESOURCE_DIR}/{name}")
+            if pixmap.isNull():
+                raise RuntimeError(f"无法从资源包解码 :/{RESOURCE_DIR}/{name}")
+            variant, _, scale = os.path.splitext(name)[0].partition("@")
+            factor = int(scale[:-1]) if scale else 1
+            width, height = VARIANTS[variant][1]
+            if (pixmap.width(), pixmap.height()) != (width * factor, height * factor):
+                raise RuntimeError(f":/{RESOURCE_DIR}/{name} 尺寸为 {pixmap.width()}x{pixmap.height()}，"
+                                   f"应为 {width * factor}x{height * factor}")
+    finally:
+        QResource.unregisterResource(bundle_path)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成各使用位置的背景图版本并打包为Qt资源文件")
+    parser.add_argument("--source", default=SOURCE_DIR, help="原图目录")
+    parser.add_argument("--output", default=OUTPUT_DIR, help="输出目录")
+    parser.add_argument("--quality", type=int, default=85, help="JPEG质量")
+    parser.add_argument("--scales", nargs="+", type=int, default=list(SCALES), help="生成的倍率")
+    parser.add_argument("--files", action="store_true", help="同时把各版本写成单独的文件")
+    parser.add_argument("--check", action="store_true", help="生成后用Qt加载资源包检查（需要PyQt6）")
+    args = parser.parse_args()
+    if Image is None:
+        sys.exit("构建资源需要Pillow: pip install Pillow")
+    bundle_path = build(args.source, args.output, args.quality, args.scales, args.files)
+    if args.check:
+        try:
+            names = verify(bundle_path)
+        except RuntimeError as e:
+            sys.exit(f"资源包检查失败: {e}")
+        print(f"  检查通过: Qt已加载全部 {len(names)} 个文件")
+
+
+if __name__ == "__main__":
+    main()
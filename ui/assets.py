@@ -0,0 +1,180 @@
+"""
+@文件: assets.py
+@描述: 界面图片资源缓存：每张图片（及其每种缩放尺寸）只解码一次
+@核心设计:
+    1. 进程级LRU缓存，按 (文件, 目标尺寸, 缩放方式) 保存解码后的QPixmap，按像素字节数计入预算，
+       超出预算时淘汰最久未使用的条目（QPixmapCache默认只有10MB，放不下几张全尺寸背景图）
+    2. 缩放尺寸未命中时：原图已在缓存中则由原图缩放；否则用QImageReader按目标尺寸解码，
+       JPEG可在解码阶段直接缩小（DCT缩放），不必先解码整张全分辨率图片
+    3. 样式表中 background-image: url(...) 由Qt通过QPixmap(文件名)加载，内部以QPixmapCache缓存；
+       reserve_qt_cache 把QPixmapCache上限提高到能容纳全部背景图，窗口重新解析样式表时不再重复解码
+    4. 只在GUI线程使用（QPixmap不能跨线程），不加锁
+    5. tools/build_assets.py 生成的资源包（各使用位置的1x/@2x版本）存在时，load_bundle注册后
+       background_url/icon 优先使用其中与设备像素比匹配的版本，否则退回原图
+"""
+import os
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt6.QtCore import Qt, QSize, QFile, QResource
+from PyQt6.QtGui import QGuiApplication, QImageReader, QPixmap, QPixmapCache
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backgrounds")
+# 缓存预算（字节）：全部背景图的全尺寸版本约20MB
+DEFAULT_BUDGET = 64 * 1024 * 1024
+# tools/build_assets.py 生成的资源包，及其中的资源目录
+BUNDLE_PATH = os.path.join(ASSETS_DIR, "build", "assets.rcc")
+RESOURCE_ROOT = ":/backgrounds"
+
+
+def asset_path(name: str) -> str:
+    """资源文件的绝对路径（name为backgrounds目录下的文件名、任意路径或 :/ 开头的Qt资源路径）"""
+    return name if name.startswith(":") or os.path.isabs(name) else os.path.join(ASSETS_DIR, name)
+
+
+class AssetCache:
+    """按字节预算淘汰的QPixmap LRU缓存"""
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self.budget = budget
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (路径, 宽, 高, 缩放方式) -> (QPixmap, 字节数)
+
+    def pixmap(self, name: str, size: Optional[QSize] = None,
+               aspect: Qt.AspectRatioMode = Qt.AspectRatioMode.IgnoreAspectRatio) -> QPixmap:
+        """
+        返回name的QPixmap，size为None时为原尺寸，否则缩放到size（aspect同QPixmap.scaled）。
+        文件不存在或无法解码时返回空QPixmap（与QPixmap(文件名)一致），不缓存
+        """
+        path = asset_path(name)
+        key = (path, -1, -1, None) if size is None else (path, size.width(), size.height(), aspect)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        pixmap = self._load(path, size, aspect)
+        if not pixmap.isNull():
+            self._put(key, pixmap)
+        return pixmap
+
+    def _load(self, path: str, size: Optional[QSize], aspect: Qt.AspectRatioMode) -> QPixmap:
+        original = self._entries.get((path, -1, -1, None))
+        if size is not None and original is not None:
+            return original[0].scaled(size, aspect, Qt.TransformationMode.SmoothTransformation)
+        reader = QImageReader(path)
+        reader.setAutoTransform(True)
+        if size is not None:
+            original_size = reader.size()  # 只读取文件头
+            if original_size.isValid():
+                reader.setScaledSize(original_size.scaled(size, aspect))
+        image = reader.read()
+        if image.isNull():
+            logger.warning("无法加载图片 %s: %s", path, reader.errorString())
+            return QPixmap()
+        return QPixmap.fromImage(image)
+
+    def _put(self, key, pixmap: QPixmap) -> None:
+        cost = pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+        self._entries[key] = (pixmap, cost)
+        self.bytes += cost
+        while self.bytes > self.budget and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.bytes, "budget": self.budget,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+_cache = AssetCache()
+
+
+def pixmap(name: str, size: Optional[QSize] = None,
+           aspect: Qt.AspectRatioMode = Qt.AspectRatioMode.IgnoreAspectRatio) -> QPixmap:
+    """从进程级缓存取图片，见AssetCache.pixmap"""
+    return _cache.pixmap(name, size, aspect)
+
+
+def cache() -> AssetCache:
+    return _cache
+
+
+def reserve_qt_cache(directory: str = ASSETS_DIR) -> int:
+    """
+    把QPixmapCache上限提高到 默认上限 + directory中全部图片全尺寸解码后的大小（只读取文件头），
+    样式表引用的背景图因此在进程内只解码一次。返回新的上限（KB）
+    """
+    total = 0
+    for name in sorted(os.listdir(directory)):
+        size = QImageReader(os.path.join(directory, name)).size()
+        if size.isValid():
+            total += size.width() * size.height() * 4
+    limit = max(QPixmapCache.cacheLimit(), 10240 + total // 1024)
+    QPixmapCache.setCacheLimit(limit)
+    return limit
+
+
+_bundle_loaded = None
+
+
+def load_bundle(path: str = BUNDLE_PATH) -> bool:
+    """注册构建生成的资源包（只注册一次，Qt以mmap方式读取）。资源包不存在或无效时返回False"""
+    global _bundle_loaded
+    if _bundle_loaded is None:
+        _bundle_loaded = os.path.exists(path) and QResource.registerResource(path)
+        if _bundle_loaded:
+            logger.info("已加载资源包: %s", path)
+        else:
+            logger.debug("没有可用的资源包 %s，使用原图", path)
+    return _bundle_loaded
+
+
+def variant_path(variant: str) -> Optional[str]:
+    """资源包中variant的1x版本路径，没有资源包或其中没有该版本时返回None"""
+    path = f"{RESOURCE_ROOT}/{variant}.jpg"
+    return path if load_bundle() and QFile.exists(path) else None
+
+
+def background_url(variant: str, fallback: str) -> str:
+    """
+    样式表url()使用的路径：资源包中的预缩放版本（Qt按设备像素比自动选用同名@2x文件），
+    没有时为原图fallback的绝对路径
+    """
+    return variant_path(variant) or asset_path(fallback).replace(os.sep, "/")
+
+
+def _device_pixel_ratio() -> float:
+    app = QGuiApplication.instance()
+    return app.devicePixelRatio() if app is not None else 1.0
+
+
+def icon(variant: str, fallback: str, size: QSize) -> QPixmap:
+    """
+    逻辑尺寸为size的图片：优先资源包中的variant（设备像素比大于1且有@2x版本时用@2x），
+    否则由原图fallback按 size×设备像素比 解码（缓存）。返回的QPixmap已设置设备像素比
+    """
+    ratio = _device_pixel_ratio()
+    path = variant_path(variant)
+    if path is not None:
+        scale = 1.0
+        if ratio > 1.0 and QFile.exists(path[:-len(".jpg")] + "@2x.jpg"):
+            path, scale = path[:-len(".jpg")] + "@2x.jpg", 2.0
+        result = _cache.pixmap(path)
+    else:
+        scale = ratio
+        result = _cache.pixmap(fallback, QSize(round(size.width() * ratio), round(size.height() * ratio)))
+    result.setDevicePixelRatio(scale)  # 缓存中同一条目的倍率总是相同，只有第一次会修改
+    return result
@@ -0,0 +1,60 @@
+"""
+@文件: async_bridge.py
+@描述: 让Qt界面与asyncio调度引擎共用同一个事件循环（qasync风格的桥接）
+@核心设计:
+    1. 安装了qasync时，直接使用qasync.QEventLoop：asyncio循环即Qt事件循环
+    2. 未安装qasync时退化为定时泵送：Qt定时器每隔pump_interval_ms毫秒
+       把asyncio循环中已就绪的回调和到期定时器执行一轮。
+       泵送定时器在界面运行期间一直工作（即使没有任何待执行的回调），
+       因此main.py只在HAVE_QASYNC时使用本桥接和asyncio调度引擎，否则使用线程引擎 + QtDispatcher
+    3. 两种方式下asyncio回调都在GUI线程执行，可以直接操作界面
+"""
+import asyncio
+from PyQt6.QtCore import QTimer
+
+try:
+    import qasync
+except ImportError:
+    qasync = None
+
+# 是否可以不靠定时泵送，直接让asyncio循环运行在Qt事件循环中
+HAVE_QASYNC = qasync is not None
+
+
+class QtAsyncioBridge:
+    def __init__(self, app, pump_interval_ms: int = 10):
+        """
+        创建共享事件循环:
+        - app: 已创建的QApplication
+        - pump_interval_ms: 未安装qasync时的泵送间隔（毫秒），决定提醒的最大延迟
+        """
+        self.app = app
+        self._pump_timer = None
+        if qasync is not None:
+            self.loop = qasync.QEventLoop(app)
+        else:
+            self.loop = asyncio.new_event_loop()
+            self._pump_timer = QTimer()
+            self._pump_timer.setInterval(pump_interval_ms)
+            self._pump_timer.timeout.connect(self._pump)
+        asyncio.set_event_loop(self.loop)
+
+    def _pump(self):
+        """执行一轮asyncio循环：处理已就绪的回调后立即返回Qt"""
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+    def exec(self) -> int:
+        """运行界面直到退出，返回退出码"""
+        if self._pump_timer is None:
+            with self.loop:
+                self.loop.run_forever()
+            return 0
+
+        self._pump_timer.start()
+        try:
+            return self.app.exec()
+        finally:
+            self._pump_timer.stop()
+            self._pump()  # 执行退出前最后投递的回调
+            self.loop.close()
@@ -1,13 +1,11 @@
 from PyQt6.QtWidgets import QMainWindow, QFrame, QLabel, QLineEdit, QComboBox, QPushButton
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QMouseEvent
-from core.data_analysis import FlowerDataAnalyzer
 
 class DataAnalysisWindow(QMainWindow):
     def __init__(self, app, flower_name=''):
         super().__init__()
         self.app = app
-        self.analyzer = app.analyzer  # 使用应用的数据分析器
         self.flower_name = flower_name  # 保存传入的鲜花名称
         self.setup_ui()
         self.drag_start_position = None
@@ -19,34 +17,18 @@ class DataAnalysisWindow(QMainWindow):
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         
         self.setWindowTitle("数据分析")
+        self.setObjectName("analysisWindow")  # 主题按窗口名选择背景图
         self.resize(800, 600)
         
         # 创建中央部件
         central_widget = QFrame()
         central_widget.setObjectName("centralwidget")
-        central_widget.setStyleSheet("""
-            QFrame#centralwidget {
-                background-color: #ecf0f1;
-                border-radius: 15px;
-            }
-        """)
         self.setCentralWidget(central_widget)
         
         # 创建返回按钮
         back_button = QPushButton(central_widget)
         back_button.setGeometry(20, 20, 80, 30)
-        back_button.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                font: bold 10pt "等线";
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
+        back_button.setProperty("role", "back")
         back_button.setText("返回")
         back_button.clicked.connect(self.go_back)
         
@@ -54,52 +36,23 @@ class DataAnalysisWindow(QMainWindow):
         frame = QFrame(central_widget)
         frame.setGeometry(150, 80, 501, 401)
         frame.setObjectName("frame")
-        frame.setStyleSheet("""
-            QFrame#frame {
-                border-radius: 30px;
-                background-image: url(backgrounds/bg4.jpg);
-                background-repeat: no-repeat;
-                background-position: center;
-                border: 2px solid #e0e0e0;
-            }
-        """)
         
         # 标题
         title_label = QLabel(frame)
         title_label.setGeometry(150, 30, 201, 41)
-        title_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: bold 16pt "等线";
-                border-radius:10px;
-                color: #2c3e50;
-                padding: 5px;
-            }
-        """)
+        title_label.setProperty("role", "title")
         title_label.setText("数据记录与统计分析")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # 鲜花种类设置
         flower_label = QLabel(frame)
         flower_label.setGeometry(50, 100, 101, 25)
-        flower_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11极 "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        flower_label.setProperty("role", "field")
         flower_label.setText("鲜花种类:")
         
         self.flower_combo = QComboBox(frame)
         self.flower_combo.setGeometry(160, 100, 171, 25)
-        self.flower_combo.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.flower_combo.setProperty("role", "input")
         self.flower_combo.addItems(self.app.flower_types)
         
         # 如果初始化时传入了flower_name，则设置当前选中
@@ -111,72 +64,48 @@ class DataAnalysisWindow(QMainWindow):
         # 影响因素选择
         factor_label = QLabel(frame)
         factor_label.setGeometry(50, 150, 101, 25)
-        factor_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11pt "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        factor_label.setProperty("role", "field")
         factor_label.setText("影响因素:")
         
         self.factor_combo = QComboBox(frame)
         self.factor_combo.setGeometry(160, 150, 171, 25)
-        self.factor_combo.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.factor_combo.setProperty("role", "input")
         self.factor_combo.addItems(["温度", "湿度", "光照", "土壤PH值"])
         
         # 结果显示区域
         result_label = QLabel(frame)
         result_label.setGeometry(50, 200, 101, 25)
-        result_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11pt "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        result_label.setProperty("role", "field")
         result_label.setText("分析结果:")
         
         self.result_text = QLabel(frame)
         self.result_text.setGeometry(160, 200, 281, 121)
-        self.result_text.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.85);
-                border: 1px solid #bdc3c7;
-                border-radius: 10px;
-                padding: 10px;
-                font: 11pt "等线";
-                color: #2c3e50;
-            }
-        """)
+        self.result_text.setProperty("role", "result")
         self.result_text.setText("等待分析...")
         self.result_text.setWordWrap(True)
         
         # 添加分析按钮
         analyze_button = QPushButton(frame)
         analyze_button.setGeometry(180, 340, 141, 31)
-        analyze_button.setStyleSheet("""
-            QPushButton {
-                background-color: #2ecc71;
-                color: white;
-                font: bold 12pt "等线";
-                border-radius: 10px;
-                padding: 8px 16px;
-            }
-            QPushButton:hover {
-                background-color: #27ae60;
-            }
-        """)
+        analyze_button.setProperty("role", "success")
         analyze_button.setText("开始分析")
         analyze_button.clicked.connect(self.perform_analysis)
     
+    def refresh(self, flower_name=None):
+        """窗口每次显示前调用：同步鲜花种类，传入flower_name时选中该种类"""
+        if flower_name is not None:
+            self.flower_name = flower_name
+        self.update_flower_list()
+        if self.flower_name:
+            self.flower_combo.setCurrentText(self.flower_name)
+    
+    def update_flower_list(self):
+        """更新鲜花种类下拉框"""
+        current_text = self.flower_combo.currentText()
+        self.flower_combo.clear()
+        self.flower_combo.addItems(self.app.flower_types)
+        self.flower_combo.setCurrentText(current_text)
+    
     def perform_analysis(self):
         """执行数据分析"""
         # 从组合框中获取当前选择的鲜花名称
@@ -189,7 +118,7 @@ class DataAnalysisWindow(QMainWindow):
         factor = self.factor_combo.currentText()
         
         # 执行数据分析
-        result = self.analyzer.analyze_flower_data(flower_name, factor)
+        result = self.app.analyzer.analyze_flower_data(flower_name, factor)  # 使用应用共享的数据分析器
         
         # 显示结果
         result_text = f"鲜花: {flower_name}\n"
@@ -201,10 +130,7 @@ class DataAnalysisWindow(QMainWindow):
     
     def go_back(self):
         """返回智能提醒窗口"""
-        from .smart_reminder_ui import SmartReminderWindow
-        self.smart_window = SmartReminderWindow(self.app)
-        self.smart_window.show()
-        self.hide()
+        self.app.show_window("smart")
     
     # 添加窗口拖动功能
     def mousePressEvent(self, event: QMouseEvent):
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QApplication, QFrame
-from PyQt6.QtCore import Qt, QTimer, QPoint
-from PyQt6.QtGui import QPixmap, QFont, QColor, QMouseEvent, QScreen
+from PyQt6.QtCore import Qt, QTimer, QPoint, QSize
+from PyQt6.QtGui import QFont, QColor, QMouseEvent, QScreen
+from ui import assets, theme
 
 class ReminderPopup(QDialog):
     def __init__(self, message, flower_type="鲜花", parent=None):
@@ -20,58 +21,31 @@ class ReminderPopup(QDialog):
         # 创建主框架
         self.main_frame = QFrame(self)
         self.main_frame.setGeometry(0, 0, 480, 320)  # 增加宽度
-        self.main_frame.setStyleSheet(f"""
-            QFrame {{
-                background-color: rgba(255, 255, 255, 0.95);
-                border-radius: 20px;
-                border: 3px solid #3498db;
-            }}
-        """)
+        self.main_frame.setObjectName("popupFrame")
         
         # 标题标签
         title_label = QLabel(f"{flower_type}养护提醒", self.main_frame)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         title_label.setGeometry(40, 20, 400, 50)  # 调整位置
-        title_label.setStyleSheet("""
-            QLabel {
-                background-color: #3498db;
-                color: white;
-                font: bold 18pt '等线';
-                border-radius: 10px;
-                padding: 5px;
-            }
-        """)
+        title_label.setObjectName("popupTitle")
         
         # 鲜花图标
         icon_label = QLabel(self.main_frame)
-        icon_label.setPixmap(QPixmap("backgrounds/bg1.jpg").scaled(100, 100))
+        icon_label.setPixmap(assets.icon("popup_icon", "bg1.jpg", QSize(100, 100)))  # 预缩放的版本（缓存），不再每次解码原图
         icon_label.setGeometry(190, 80, 100, 100)  # 居中位置
-        icon_label.setStyleSheet("""
-            QLabel {
-                border-radius: 50px;
-                border: 2px solid #2c3e50;
-            }
-        """)
+        icon_label.setObjectName("popupIcon")
         
         # 消息标签
         message_label = QLabel(message, self.main_frame)
         message_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         message_label.setGeometry(65, 190, 350, 70)  # 调整位置
-        message_label.setStyleSheet("""
-            QLabel {
-                background-color: rgba(236, 240, 241, 0.8);
-                color: #2c3e50;
-                font: 14pt '等线';
-                border-radius: 10px;
-                padding: 10px;
-            }
-        """)
+        message_label.setObjectName("popupMessage")
         message_label.setWordWrap(True)
         
         # 按钮容器（增加宽度）
         button_frame = QFrame(self.main_frame)
         button_frame.setGeometry(115, 270, 250, 40)  # 增加宽度
-        button_frame.setStyleSheet("background: transparent;")
+        button_frame.setObjectName("popupButtons")
         
         # 按钮布局
         button_layout = QHBoxLayout(button_frame)
@@ -81,41 +55,13 @@ class ReminderPopup(QDialog):
         # 确认按钮（保持原样）
         ok_button = QPushButton("知道了")
         ok_button.setFixedSize(90, 40)
-        ok_button.setStyleSheet("""
-            QPushButton {
-                background-color: #2ecc71;
-                color: white;
-                font: bold 12pt '等线';
-                border-radius: 10px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #27ae60;
-            }
-            QPushButton:pressed {
-                background-color: #1e8449;
-            }
-        """)
+        ok_button.setProperty("role", "success")
         ok_button.clicked.connect(self.accept)
         
         # 稍后提醒按钮（增加宽度以完整显示文字）
         later_button = QPushButton("10分钟后提醒")
         later_button.setFixedSize(120, 40)  # 增加宽度
-        later_button.setStyleSheet("""
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                font: bold 12pt '等线';
-                border-radius: 10px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #1d6fa5;
-            }
-        """)
+        later_button.setProperty("role", "primary")
         later_button.clicked.connect(self.snooze)
         
         button_layout.addWidget(ok_button)
@@ -191,29 +137,11 @@ class ReminderPopup(QDialog):
 
     
     def _flash_step(self):
-        """闪烁步骤"""
+        """闪烁步骤：切换主框架的flash属性（红色/蓝色边框），不替换样式表"""
         if self.flash_count <= 0:
             self.flash_timer.stop()
-            self.setStyleSheet("")  # 恢复默认样式
+            theme.set_state(self.main_frame, "flash", False)  # 恢复默认边框
             return
-            
-        if self.flash_count % 2 == 1:
-            # 设置为高亮边框
-            self.setStyleSheet("""
-                QFrame {
-                    border: 3px solid #ff0000;
-                    border-radius: 20px;
-                }
-            """)
-        else:
-            # 恢复默认边框
-            self.setStyleSheet("""
-                QFrame {
-                    border: 3px solid #3498db;
-                    border-radius: 20px;
-                }
-            """)
         
+        theme.set_state(self.main_frame, "flash", self.flash_count % 2 == 1)
         self.flash_count -= 1
-
-    
\ No newline at end of file
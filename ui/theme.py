@@ -0,0 +1,203 @@
+"""
+@文件: theme.py
+@描述: 应用级主题：全部界面样式集中在一份QSS中，启动时设置到QApplication上一次
+@核心设计:
+    1. 控件不再各自setStyleSheet，而是设置objectName（窗口、框架）或动态属性role（标题、输入框、按钮等），
+       主题用 #对象名 和 [role="..."] 选择器匹配；Qt只解析一次样式表，创建窗口时不再逐个控件解析QSS
+    2. 各窗口的背景图用窗口的objectName限定，例如 #userSetWindow QFrame#frame
+    3. 状态变化（状态标签的成功/错误、弹窗闪烁高亮）只切换动态属性（set_state），
+       只重新polish这一个控件，不替换样式表，不重新解析QSS，也不会重新polish整个子树
+    4. 背景图路径由ui.assets.background_url给出，apply前应先调用assets.load_bundle
+"""
+from PyQt6.QtWidgets import QWidget
+
+from ui import assets
+
+FONT = '"等线"'
+
+# 颜色
+TEXT = "#2c3e50"
+WINDOW_BG = "#ecf0f1"
+BORDER = "#bdc3c7"
+FRAME_BORDER = "#e0e0e0"
+BLUE, BLUE_HOVER, BLUE_PRESSED = "#3498db", "#2980b9", "#1d6fa5"
+GREEN, GREEN_HOVER, GREEN_PRESSED = "#2ecc71", "#27ae60", "#1e8449"
+GREY, GREY_HOVER = "#95a5a6", "#7f8c8d"
+SUCCESS, ERROR = "#27ae60", "#e74c3c"
+FLASH = "#ff0000"
+
+# 窗口objectName -> (中央部件背景图, 主框架背景图)，背景图为 (资源包中的版本名, 原图)
+WINDOW_BACKGROUNDS = {
+    "choiceWindow": (None, ("choice_frame", "bg1.jpg")),
+    "userSetWindow": (("user_set_window", "bg2.jpg"), ("user_set_frame", "bg2.jpg")),
+    "smartWindow": (("smart_window", "bg3.jpg"), ("smart_frame", "bg3.jpg")),
+    "analysisWindow": (None, ("analysis_frame", "bg4.jpg")),
+}
+
+
+def _backgrounds() -> str:
+    rules = []
+    for window, (central, frame) in WINDOW_BACKGROUNDS.items():
+        if central:
+            rules.append(f"""
+#{window} QFrame#centralwidget {{
+    border: 1px solid {BORDER};
+    background-image: url({assets.background_url(*central)});
+}}""")
+        rules.append(f"""
+#{window} QFrame#frame {{
+    background-image: url({assets.background_url(*frame)});
+    background-repeat: no-repeat;
+    background-position: center;
+}}""")
+    return "".join(rules)
+
+
+def build_stylesheet() -> str:
+    """生成应用级样式表"""
+    return f"""
+/* 窗口 */
+QFrame#centralwidget {{
+    background-color: {WINDOW_BG};
+    border-radius: 15px;
+}}
+QFrame#frame {{
+    border-radius: 30px;
+    border: 2px solid {FRAME_BORDER};
+}}
+#choiceWindow QFrame#frame {{
+    background-color: rgba(255, 255, 255, 0.8);
+}}
+{_backgrounds()}
+
+/* 文字 */
+QLabel[role="title"] {{
+    background-color: rgba(255, 255, 255, 0.7);
+    font: bold 14pt {FONT};
+    border-radius: 10px;
+    color: {TEXT};
+    padding: 5px;
+}}
+#analysisWindow QLabel[role="title"] {{
+    font: bold 16pt {FONT};
+}}
+QLabel[role="field"] {{
+    background-color: rgba(255, 255, 255, 0.7);
+    font: 11pt {FONT};
+    border-radius: 5px;
+    padding: 3px;
+}}
+QLabel[role="result"] {{
+    background-color: rgba(255, 255, 255, 0.85);
+    border: 1px solid {BORDER};
+    border-radius: 10px;
+    padding: 10px;
+    font: 11pt {FONT};
+    color: {TEXT};
+}}
+QLabel[role="status"] {{
+    font: 12pt {FONT};
+    color: {SUCCESS};
+    border-radius: 5px;
+    background-color: rgba(255, 255, 255, 0.7);
+    padding: 5px;
+}}
+QLabel[role="status"][error="true"] {{
+    color: {ERROR};
+}}
+
+/* 输入 */
+QComboBox[role="input"], QLineEdit[role="input"], QDateTimeEdit[role="input"] {{
+    background-color: rgba(255, 255, 255, 0.85);
+    border: 1px solid {BORDER};
+    border-radius: 5px;
+    padding: 5px;
+}}
+QCheckBox[role="choice"] {{
+    background-color: rgba(255, 255, 255, 0.85);
+    font: 12pt {FONT};
+    border-radius: 8px;
+    color: {TEXT};
+    padding: 5px;
+}}
+QCheckBox[role="choice"]::indicator {{
+    width: 20px;
+    height: 20px;
+}}
+
+/* 按钮 */
+QPushButton[role="primary"], QPushButton[role="success"] {{
+    color: white;
+    font: bold 12pt {FONT};
+    border-radius: 10px;
+    padding: 5px;
+}}
+QPushButton[role="primary"] {{ background-color: {BLUE}; }}
+QPushButton[role="primary"]:hover {{ background-color: {BLUE_HOVER}; }}
+QPushButton[role="primary"]:pressed {{ background-color: {BLUE_PRESSED}; }}
+QPushButton[role="success"] {{ background-color: {GREEN}; }}
+QPushButton[role="success"]:hover {{ background-color: {GREEN_HOVER}; }}
+QPushButton[role="success"]:pressed {{ background-color: {GREEN_PRESSED}; }}
+QPushButton[role="back"] {{
+    background-color: {GREY};
+    color: white;
+    font: bold 10pt {FONT};
+    border-radius: 5px;
+    padding: 5px;
+}}
+QPushButton[role="back"]:hover {{ background-color: {GREY_HOVER}; }}
+QPushButton[role="add"] {{
+    background-color: {BLUE};
+    color: white;
+    font: bold 10pt {FONT};
+    border-radius: 3px;
+}}
+QPushButton[role="add"]:hover {{ background-color: {BLUE_HOVER}; }}
+
+/* 提醒弹窗 */
+QFrame#popupFrame {{
+    background-color: rgba(255, 255, 255, 0.95);
+    border-radius: 20px;
+    border: 3px solid {BLUE};
+}}
+QFrame#popupFrame[flash="true"] {{
+    border-color: {FLASH};
+}}
+QLabel#popupTitle {{
+    background-color: {BLUE};
+    color: white;
+    font: bold 18pt {FONT};
+    border-radius: 10px;
+    padding: 5px;
+}}
+QLabel#popupIcon {{
+    border-radius: 50px;
+    border: 2px solid {TEXT};
+}}
+QLabel#popupMessage {{
+    background-color: rgba(236, 240, 241, 0.8);
+    color: {TEXT};
+    font: 14pt {FONT};
+    border-radius: 10px;
+    padding: 10px;
+}}
+QFrame#popupButtons {{
+    background: transparent;
+}}
+"""
+
+
+def apply(app) -> None:
+    """把主题设置到QApplication上（启动时调用一次）"""
+    app.setStyleSheet(build_stylesheet())
+
+
+def set_state(widget: QWidget, name: str, value) -> None:
+    """切换控件的状态属性（如error、flash）：只重新polish这一个控件，不替换样式表"""
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
@@ -1,6 +1,7 @@
 from PyQt6.QtWidgets import QMainWindow, QFrame, QLabel, QLineEdit, QPushButton, QDateTimeEdit, QComboBox
 from PyQt6.QtCore import Qt, QDateTime
 from PyQt6.QtGui import QMouseEvent
+from ui import theme
 from core.reminder_system import FlowerCareReminderSystem
 from datetime import datetime, timedelta  # 添加 datetime 和 timedelta 导入
 
@@ -18,36 +19,18 @@ class UserSetWindow(QMainWindow):
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         
         self.setWindowTitle("鲜花养护设置")
+        self.setObjectName("userSetWindow")  # 主题按窗口名选择背景图
         self.resize(800, 600)
         
         # 创建中央部件
         central_widget = QFrame()
         central_widget.setObjectName("centralwidget")
-        central_widget.setStyleSheet("""
-            QFrame#centralwidget {
-                background-color: #ecf0f1;
-                border-radius: 15px;
-                border: 1px solid #bdc3c7;
-                background-image: url(backgrounds/bg2.jpg);
-            }
-        """)
         self.setCentralWidget(central_widget)
         
         # 创建返回按钮
         back_button = QPushButton(central_widget)
         back_button.setGeometry(20, 20, 80, 30)
-        back_button.setStyleSheet("""
-            QPushButton {
-                background-color: #95a5a6;
-                color: white;
-                font: bold 10pt "等线";
-                border-radius: 5px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #7f8c8d;
-            }
-        """)
+        back_button.setProperty("role", "back")
         back_button.setText("返回")
         back_button.clicked.connect(self.go_back)
         
@@ -55,68 +38,29 @@ class UserSetWindow(QMainWindow):
         frame = QFrame(central_widget)
         frame.setGeometry(150, 100, 501, 351)
         frame.setObjectName("frame")
-        frame.setStyleSheet("""
-            QFrame#frame {
-                border-radius: 30px;
-                background-image: url(backgrounds/bg2.jpg);
-                background-repeat: no-repeat;
-                background-position: center;
-                border: 2px solid #e0e0e0;
-            }
-        """)
         
         # 标题
         title_label = QLabel(frame)
         title_label.setGeometry(200, 20, 101, 31)
-        title_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: bold 14pt "等线";
-                border-radius:10px;
-                color: #2c3e50;
-                padding: 5px;
-            }
-        """)
+        title_label.setProperty("role", "title")
         title_label.setText("用户设置")
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # 鲜花种类设置 - 使用选择框
         flower_label = QLabel(frame)
         flower_label.setGeometry(50, 70, 101, 25)
-        flower_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11pt "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        flower_label.setProperty("role", "field")
         flower_label.setText("选择鲜花种类")
         
         self.flower_combo = QComboBox(frame)
         self.flower_combo.setGeometry(160, 70, 171, 25)
-        self.flower_combo.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.flower_combo.setProperty("role", "input")
         self.flower_combo.addItems(self.app.flower_types)
 
         # 添加新种类按钮
         self.add_flower_button = QPushButton(frame)
         self.add_flower_button.setGeometry(340, 70, 31, 25)
-        self.add_flower_button.setStyleSheet("""
-            QPushButton {  # 修复这里：将 "Q极Button" 改为 "QPushButton"
-                background-color: #3498db;
-                color: white;
-                font: bold 10pt "等线";
-                border-radius: 3px;
-            }
-            QPushButton:hover {  # 修复这里：将 "Q极Button" 改为 "QPushButton"
-                background-color: #2980b9;
-            }
-        """)
+        self.add_flower_button.setProperty("role", "add")
         self.add_flower_button.setText("+")
         self.add_flower_button.clicked.connect(self.show_add_flower_dialog)
         
@@ -124,59 +68,30 @@ class UserSetWindow(QMainWindow):
         # 添加新种类输入框
         self.new_flower_input = QLineEdit(frame)
         self.new_flower_input.setGeometry(160, 100, 171, 25)
-        self.new_flower_input.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.new_flower_input.setProperty("role", "input")
         self.new_flower_input.setPlaceholderText("输入新鲜花种类...")
         self.new_flower_input.hide()
         
         # 时间设置
         time_label = QLabel(frame)
         time_label.setGeometry(50, 140, 101, 25)
-        time_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11pt "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        time_label.setProperty("role", "field")
         time_label.setText("起始时间:")
         
         self.time_edit = QDateTimeEdit(frame)
         self.time_edit.setGeometry(160, 140, 171, 25)
-        self.time_edit.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.time_edit.setProperty("role", "input")
         self.time_edit.setDateTime(QDateTime.currentDateTime())
         
         # 间隔天数设置
         interval_label = QLabel(frame)
         interval_label.setGeometry(50, 180, 101, 25)
-        interval_label.setStyleSheet("""
-            *{
-                background-color: rgba(255, 255, 255, 0.7);
-                font: 11pt "等线";
-                border-radius:5px;
-                padding: 3px;
-            }
-        """)
+        interval_label.setProperty("role", "field")
         interval_label.setText("间隔天数:")
         
         self.interval_combo = QComboBox(frame)
         self.interval_combo.setGeometry(160, 180, 171, 25)
-        self.interval_combo.setStyleSheet("""
-            background-color: rgba(255, 255, 255, 0.85);
-            border: 1px solid #bdc3c7;
-            border-radius: 5px;
-            padding: 5px;
-        """)
+        self.interval_combo.setProperty("role", "input")
         
         # 填充间隔天数选项
         for i in range(1, 31):
@@ -186,21 +101,7 @@ class UserSetWindow(QMainWindow):
         # 添加确定按钮
         self.confirm_button = QPushButton(frame)
         self.confirm_button.setGeometry(200, 240, 101, 31)
-        self.confirm_button.setStyleSheet("""
-            QPushButton {
-                background-color: #3498db;
-                color: white;
-                font: bold 12pt "等线";
-                border-radius: 10px;
-                padding: 5px;
-            }
-            QPushButton:hover {
-                background-color: #2980b9;
-            }
-            QPushButton:pressed {
-                background-color: #1d6fa5;
-            }
-        """)
+        self.confirm_button.setProperty("role", "primary")
         self.confirm_button.setText("保存设置")
         self.confirm_button.clicked.connect(self.save_settings)
         
@@ -208,17 +109,20 @@ class UserSetWindow(QMainWindow):
         self.status_label = QLabel(central_widget)
         self.status_label.setGeometry(150, 470, 500, 40)
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.status_label.setStyleSheet("""
-            *{
-                font: 12pt "等线";
-                color: #27ae60;
-                border-radius: 5px;
-                background-color: rgba(255, 255, 255, 0.7);
-                padding: 5px;
-            }
-        """)
+        self.status_label.setProperty("role", "status")
         self.status_label.hide()
     
+    def refresh(self):
+        """窗口每次显示前调用：同步其它窗口添加的鲜花种类"""
+        self.update_flower_list()
+    
+    def update_flower_list(self):
+        """更新鲜花种类下拉框"""
+        current_text = self.flower_combo.currentText()
+        self.flower_combo.clear()
+        self.flower_combo.addItems(self.app.flower_types)
+        self.flower_combo.setCurrentText(current_text)
+    
     def save_settings(self):
         """保存用户设置并添加到提醒系统"""
         print("[用户设置] 保存设置")
@@ -260,26 +164,8 @@ class UserSetWindow(QMainWindow):
     def show_status(self, message, is_error=False):
         """显示操作状态信息"""
         self.status_label.show()
-        if is_error:
-            self.status_label.setStyleSheet("""
-                *{
-                    font: 12pt "等线";
-                    color: #e74c3c;
-                    border-radius: 5px;
-                    background-color: rgba(255, 255, 255, 0.7);
-                    padding: 5px;
-                }
-            """)
-        else:
-            self.status_label.setStyleSheet("""
-                *{
-                    font: 12pt "等线";
-                    color: #27ae60;
-                    border-radius: 5px;
-                    background-color: rgba(255, 255, 255, 0.7);
-                    padding: 5px;
-                }
-            """)
+        # 只切换error属性，不重新设置样式表
+        theme.set_state(self.status_label, "error", bool(is_error))
         
         self.status_label.setText(message)
         
@@ -290,10 +176,7 @@ class UserSetWindow(QMainWindow):
     
     def go_back(self):
         """返回主窗口"""
-        from .reminder_choice_ui import ReminderChoiceWindow
-        self.main_window = ReminderChoiceWindow(self.app)
-        self.main_window.show()
-        self.hide()
+        self.app.show_window("choice")
     
     def mousePressEvent(self, event):
         """鼠标按下事件"""
@@ -326,7 +209,7 @@ class UserSetWindow(QMainWindow):
             new_flower = self.new_flower_input.text().strip()
             if new_flower:
                 if self.app.add_flower_type(new_flower):
-                    self.flower_combo.addItem(new_flower)
+                    # add_flower_type已刷新所有窗口的下拉框（包括本窗口）
                     self.flower_combo.setCurrentText(new_flower)
                     self.show_status(f"成功添加 {new_flower} 种类")
                 else: